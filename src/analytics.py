@@ -0,0 +1,149 @@
+# src/analytics.py
+
+import numpy as np
+import pandas as pd
+
+PERIODS = 252  # return observations per year
+WINDOW  = 63   # rolling-metric window (about three months of days)
+
+
+# Every function takes a wide DataFrame of periodic returns, one column per
+# strategy, and computes all columns at once. Columns may cover different
+# date ranges: NaN means "not running" and is left out of that column's stats.
+
+def _wealth(returns: pd.DataFrame) -> pd.DataFrame:
+    return (1 + returns.fillna(0)).cumprod()
+
+
+def drawdowns(returns: pd.DataFrame) -> pd.DataFrame:
+    """Drawdown from the running peak of each strategy's wealth (≤ 0)."""
+    wealth = _wealth(returns)
+    return (wealth / wealth.cummax() - 1).where(returns.notna())
+
+
+def performance(returns: pd.DataFrame, turnover: pd.DataFrame = None,
+                periods: int = PERIODS) -> pd.DataFrame:
+    """
+    One row per strategy: annualised return and volatility, Sharpe, Sortino
+    (downside deviation below 0), max drawdown, Calmar, and with `turnover`
+    (same shape, booked on rebalance days) the mean turnover per rebalance
+    and annual turnover.
+    """
+    r = returns.to_numpy(dtype=np.float64)
+    n = np.sum(~np.isnan(r), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(r, axis=0)
+        std = np.nanstd(r, axis=0, ddof=1)
+        downside = np.sqrt(np.nanmean(np.minimum(r, 0) ** 2, axis=0))
+        growth = np.prod(1 + np.nan_to_num(r), axis=0)
+        ann_return = np.where(n > 0, growth ** (periods / n) - 1, np.nan)
+        max_dd = np.nanmin(drawdowns(returns).to_numpy(), axis=0, initial=0.0)
+        out = pd.DataFrame({
+            "ann_return":   ann_return,
+            "ann_vol":      std * np.sqrt(periods),
+            "sharpe":       np.where(n > 1, mean / std * np.sqrt(periods), np.nan),
+            "sortino":      np.where(n > 1, mean / downside * np.sqrt(periods), np.nan),
+            "max_drawdown": np.where(n > 0, max_dd, np.nan),
+            "calmar":       np.where(max_dd < 0, ann_return / -max_dd, np.nan),
+            "days":         n,
+        }, index=returns.columns)
+        if turnover is not None:
+            t = turnover.reindex_like(returns)
+            tracked = t.notna().any().to_numpy()
+            t = t.fillna(0).to_numpy(dtype=np.float64)
+            rebalances = (t > 0).sum(axis=0)
+            out["avg_turnover"] = np.where(rebalances > 0, t.sum(axis=0) / rebalances, np.nan)
+            out["ann_turnover"] = np.where(tracked & (n > 0), t.sum(axis=0) / n * periods, np.nan)
+    return out
+
+
+def rolling_metrics(returns: pd.DataFrame, window: int = WINDOW,
+                    periods: int = PERIODS) -> pd.DataFrame:
+    """
+    Rolling annualised return, volatility and Sharpe over `window` periods.
+    Columns are (metric, strategy).
+    """
+    roll = returns.rolling(window, min_periods=window)
+    mean, std = roll.mean(), roll.std()
+    growth = np.exp(np.log1p(returns).rolling(window, min_periods=window).sum())
+    return pd.concat({
+        "return": growth ** (periods / window) - 1,
+        "vol":    std * np.sqrt(periods),
+        "sharpe": mean / std * np.sqrt(periods),
+    }, axis=1)
+
+
+def factor_attribution(returns: pd.DataFrame, factors: pd.DataFrame,
+                       periods: int = PERIODS) -> pd.DataFrame:
+    """
+    OLS of every strategy's excess return on the factor returns, all
+    strategies solved in one batch (each over the dates it has).
+    factors: factor returns at the same frequency; an 'RF' column, if
+    present, is subtracted from the strategy returns rather than regressed on.
+    One row per strategy: annualised alpha, R², the beta on each factor and
+    the annualised return attributed to it (beta × mean factor return).
+    A strategy whose loadings are not identified over its dates (too few
+    observations, or a factor that is constant or collinear there) gets a
+    row of NaN instead of failing the batch.
+    """
+    factors = factors.reindex(returns.index)
+    rf = factors.pop("RF") if "RF" in factors else pd.Series(0.0, index=returns.index)
+    names = list(factors.columns)
+    F = factors.to_numpy(dtype=np.float64)
+    Y = returns.sub(rf, axis=0).to_numpy(dtype=np.float64)
+
+    X = np.column_stack([np.ones(len(F)), F])                         # (T, 1+K)
+    mask = (~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]).astype(np.float64)
+    X0, Y0 = np.nan_to_num(X), np.nan_to_num(Y)
+    XtX = np.einsum("ts,ti,tj->sij", mask, X0, X0)                    # (S, 1+K, 1+K)
+    Xty = np.einsum("ts,ti,ts->si", mask, X0, Y0)
+    ok = mask.sum(axis=0) > X.shape[1]
+    ok[ok] = np.linalg.matrix_rank(XtX[ok]) == X.shape[1]
+    coef = np.full(Xty.shape, np.nan)
+    coef[ok] = np.linalg.solve(XtX[ok], Xty[ok][..., None])[..., 0]
+
+    n = mask.sum(axis=0)
+    fitted = np.einsum("ti,si->ts", X0, np.nan_to_num(coef))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ymean = (mask * Y0).sum(axis=0) / n
+        ss_res = (mask * (Y0 - fitted) ** 2).sum(axis=0)
+        ss_tot = (mask * (Y0 - ymean) ** 2).sum(axis=0)
+        r2 = np.where(ok, 1 - ss_res / ss_tot, np.nan)
+        fmean = np.einsum("ts,tk->sk", mask, np.nan_to_num(F)) / n[:, None]
+
+    out = pd.DataFrame({"alpha": coef[:, 0] * periods, "r2": r2},
+                       index=returns.columns)
+    for k, name in enumerate(names):
+        out[f"beta_{name}"] = coef[:, k + 1]
+    for k, name in enumerate(names):
+        out[f"contrib_{name}"] = coef[:, k + 1] * fmean[:, k] * periods
+    return out
+
+
+def plot_cumulative(returns: pd.DataFrame, path: str = None, show: bool = False,
+                    title: str = "Cumulative Returns"):
+    """
+    Cumulative returns of every strategy in one figure, saved to `path`
+    and/or shown. matplotlib is only imported here, so reporting without
+    plots never loads it.
+    """
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    cum = (_wealth(returns) - 1).where(returns.notna())
+    ax.plot(cum.index, cum.to_numpy())
+    if cum.shape[1] <= 10:
+        ax.legend(cum.columns)
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Cumulative Return")
+    ax.grid(True)
+    if path is not None:
+        fig.savefig(path)
+    if show:
+        plt.show()
+    plt.close(fig)
+    return path
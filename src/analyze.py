@@ -1,9 +1,9 @@
 # src/analyze.py
 
 import os
+import argparse
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from analytics import factor_attribution, performance, plot_cumulative, rolling_metrics
 
 # === Paths ===
 BASE_DIR = os.path.dirname(__file__)
@@ -14,51 +14,87 @@ DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
 CLUSTER_CSV   = os.path.join(DATA_DIR, 'backtest_cluster0_daily.csv')
 SENTIM_CSV    = os.path.join(DATA_DIR, 'backtest_sentiment_daily.csv')
 INTRA_CSV     = os.path.join(DATA_DIR, 'backtest_intraday.csv')
+OUT_PNG       = os.path.join(DATA_DIR, 'strategies_cumulative.png')
+OUT_CSV       = os.path.join(DATA_DIR, 'strategies_performance.csv')
 
-# Load data
-cluster = pd.read_csv(CLUSTER_CSV, index_col=0, parse_dates=True)
-cluster.index.name = 'Date'
-sent    = pd.read_csv(SENTIM_CSV, index_col=0, parse_dates=True)
-sent.index.name = 'Date'
-intra   = pd.read_csv(INTRA_CSV, index_col=0, parse_dates=True)
-intra.index.name = 'Date'
-
-# Standardize column names (in case they differ)
-cluster_return_col = [c for c in cluster.columns if 'cluster' in c or 'return' in c][0]
-sentiment_col      = [c for c in sent.columns if 'sentiment_return' in c or 'return' in c][0]
-intraday_col       = [c for c in intra.columns if 'strategy_ret' in c or 'return' in c][0]
-
-# Compute cumulative returns
-cluster['cum_ret'] = (1 + cluster[cluster_return_col]).cumprod() - 1
-sent['cum_ret']    = (1 + sent[sentiment_col]).cumprod() - 1
-intra['cum_ret']   = (1 + intra[intraday_col]).cumprod() - 1
-
-# Sharpe ratios (daily)
-sharpe = lambda x: x.mean() / x.std() * np.sqrt(252)
-stats = {
-    'Unsupervised': sharpe(cluster[cluster_return_col]),
-    'Sentiment':    sharpe(sent[sentiment_col]),
-    'Intraday':     sharpe(intra[intraday_col]),
+# Strategy name -> (daily CSV, return column, turnover column or None)
+STRATEGIES = {
+    'Unsupervised': (CLUSTER_CSV, 'return', 'turnover'),
+    'Sentiment':    (SENTIM_CSV, 'sentiment_return', 'turnover'),
+    'Intraday':     (INTRA_CSV, 'strategy_ret', None),
 }
 
-# Plot
-plt.figure(figsize=(10,6))
-plt.plot(cluster.index, cluster['cum_ret'], label='Cluster Strategy')
-plt.plot(sent.index,    sent['cum_ret'],    label='Sentiment Strategy')
-plt.plot(intra.index,   intra['cum_ret'],   label='Intraday Strategy')
-plt.legend()
-plt.title('Cumulative Returns')
-plt.xlabel('Date')
-plt.ylabel('Cumulative Return')
-plt.grid(True)
-out_png = os.path.join(DATA_DIR, 'strategies_cumulative.png')
-plt.savefig(out_png)
-print(f"Saved performance plot to {out_png}")
-
-# Print stats
-print("Sharpe Ratios:")
-for name, val in stats.items():
-    print(f"  {name}: {val:.2f}")
+
+def load_strategies(strategies=STRATEGIES):
+    """Daily returns and turnover of each strategy as wide Date × strategy frames."""
+    returns, turnover = {}, {}
+    for name, (path, ret_col, to_col) in strategies.items():
+        df = pd.read_csv(path, index_col=0, parse_dates=True)
+        returns[name] = df[ret_col]
+        # Results saved before turnover was tracked have no turnover column
+        if to_col is not None and to_col in df:
+            turnover[name] = df[to_col]
+    returns = pd.DataFrame(returns)
+    returns.index.name = 'Date'
+    return returns, pd.DataFrame(turnover).reindex(index=returns.index, columns=returns.columns)
+
+
+def load_results(path):
+    """
+    A batch of results as written by sweep.py / sentiment_signals.py: columns
+    ('return' | 'turnover', strategy...). Returns (returns, turnover).
+    """
+    df = pd.read_csv(path, index_col=0, parse_dates=True, header=[0, 1])
+    returns, turnover = df['return'], df['turnover']
+    return returns, turnover
+
+
+def report(returns, turnover=None, factors=None, out_csv=OUT_CSV, plot_path=None):
+    """Performance table (plus factor attribution) for any number of strategies."""
+    perf = performance(returns, turnover)
+    if factors is not None:
+        perf = perf.join(factor_attribution(returns, factors))
+    perf.to_csv(out_csv)
+    print(f"Saved performance table to {out_csv}")
+    if plot_path is not None:
+        print(f"Saved performance plot to {plot_cumulative(returns, plot_path)}")
+    return perf
+
+
+def _daily_factors(index):
+    # Only needed with --factors; pulls in pandas_datareader via factors.py
+    from factors import get_ff_factors
+    return get_ff_factors(index.min(), index.max(), freq="daily")
+
+
+def main(results=None, plot=True, show=False, factors=False, rolling=None):
+    if results is None:
+        returns, turnover = load_strategies()
+        out_csv = OUT_CSV
+    else:
+        returns, turnover = load_results(results)
+        out_csv = os.path.splitext(results)[0] + '_performance.csv'
+    ff = _daily_factors(returns.index) if factors else None
+    perf = report(returns, turnover, ff, out_csv, OUT_PNG if plot and results is None else None)
+    if show:
+        plot_cumulative(returns, show=True)
+    if rolling:
+        path = os.path.splitext(out_csv)[0] + '_rolling.csv'
+        rolling_metrics(returns, rolling).to_csv(path)
+        print(f"Saved {rolling}-day rolling metrics to {path}")
+
+    print(perf.sort_values('sharpe', ascending=False).head(20)
+              .to_string(float_format=lambda x: f"{x:.3f}"))
+
 
 if __name__ == '__main__':
-    plt.show()
+    parser = argparse.ArgumentParser(description="Performance report for the strategy backtests.")
+    parser.add_argument('results', nargs='?',
+                        help="batch results CSV (e.g. sweep_daily.csv) instead of the three strategies")
+    parser.add_argument('--no-plot', action='store_true', help="skip the cumulative-returns PNG")
+    parser.add_argument('--show', action='store_true', help="open the plot in a window")
+    parser.add_argument('--factors', action='store_true',
+                        help="add Fama–French factor attribution (downloads daily factors)")
+    parser.add_argument('--rolling', type=int, metavar='DAYS', help="also write rolling metrics")
+    args = parser.parse_args()
+    main(args.results, not args.no_plot, args.show, args.factors, args.rolling)
@@ -0,0 +1,295 @@
+# src/benchmark.py
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import warnings
+import tracemalloc
+import subprocess
+import contextlib
+import numpy as np
+import pandas as pd
+from analytics import performance, rolling_metrics
+from clustering import assign_clusters
+from engine import run_backtest
+from factors import compute_rolling_betas
+from features import compute_features
+from intraday import daily_open_close, predict_daily_volatility
+from live import LiveStrategy, replay, replay_file
+from optimizer import optimize_weights
+from robustness import bootstrap
+from sentiment_signals import backtest_variants
+from sentiment_store import append_rows, monthly_engagement, monthly_metrics, sync_csv
+from twitter_sentiment import sentiment_returns
+
+BASE_DIR         = os.path.dirname(__file__)
+OUT_DIR          = os.path.join(BASE_DIR, os.pardir, "data", "benchmarks")
+TICKERS          = [50, 500]  # universe sizes (up to 5,000)
+YEARS            = [1, 5]     # history lengths (up to 20)
+SEED             = 42
+END_DATE         = "2024-12-31"
+INTRADAY_SYMBOLS = 10   # symbols in the synthetic bar file
+BARS_PER_DAY     = 78   # 5-minute bars in a 6.5-hour session
+BOOTSTRAP_SERIES = 10   # return series resampled in the bootstrap stage
+BOOTSTRAP_PATHS  = 5000 # paths per series
+REGRESSION_RATIO = 1.2  # --compare flags stages slower than this
+
+
+# --- Synthetic data ---
+#
+# Everything is drawn from one seeded generator, so the same sizes always
+# produce the same data and timings are comparable between commits.
+
+def synthetic_prices(n_tickers: int, years: int, seed: int = SEED) -> pd.DataFrame:
+    """Daily OHLCV (+ adj close) for n_tickers over `years`, long [Date, Ticker]; 10% list late."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=END_DATE, periods=252 * years, name="Date")
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    T, N = len(dates), n_tickers
+
+    mu = rng.normal(0.0003, 0.0003, N)
+    sigma = rng.uniform(0.01, 0.03, N)
+    close = 50 * np.exp(np.cumsum(mu + sigma * rng.standard_normal((T, N)), axis=0))
+    open_ = np.vstack([close[:1], close[:-1]]) * (1 + 0.002 * rng.standard_normal((T, N)))
+    high = np.maximum(open_, close) * (1 + np.abs(0.005 * rng.standard_normal((T, N))))
+    low = np.minimum(open_, close) * (1 - np.abs(0.005 * rng.standard_normal((T, N))))
+    volume = np.round(rng.lognormal(13, 1, (T, N)))
+
+    listed = np.zeros(N, dtype=int)
+    late = rng.random(N) < 0.1
+    listed[late] = rng.integers(0, T // 2 + 1, late.sum())
+    alive = np.arange(T)[:, None] >= listed[None, :]
+
+    fields = {"open": open_, "high": high, "low": low, "close": close,
+              "adj close": close, "volume": volume}
+    idx = pd.MultiIndex.from_product([dates, tickers], names=["Date", "Ticker"])
+    mask = alive.ravel()
+    return pd.DataFrame({k: v.ravel()[mask] for k, v in fields.items()}, index=idx[mask])
+
+
+def synthetic_factors(dates: pd.DatetimeIndex, seed: int = SEED) -> pd.DataFrame:
+    """Monthly Fama–French 5-factor returns (decimals) covering `dates`."""
+    rng = np.random.default_rng(seed + 1)
+    months = pd.date_range(dates.min(), dates.max() + pd.offsets.MonthEnd(0), freq="ME")
+    cols = ["Mkt-RF", "SMB", "HML", "RMW", "CMA"]
+    ff = pd.DataFrame(rng.normal(0.005, 0.03, (len(months), len(cols))), index=months, columns=cols)
+    ff["RF"] = 0.002
+    return ff
+
+
+def synthetic_sentiment(tickers, dates: pd.DatetimeIndex, seed: int = SEED) -> pd.DataFrame:
+    """Daily Twitter engagement rows in the layout of data/raw/sentiment_data.csv."""
+    rng = np.random.default_rng(seed + 2)
+    idx = pd.MultiIndex.from_product([dates, tickers], names=["date", "symbol"])
+    n = len(idx)
+    scale = np.tile(rng.lognormal(0, 1.5, len(tickers)), len(dates))
+    return pd.DataFrame({
+        "twitterPosts":       np.round(rng.poisson(50, n) * scale),
+        "twitterComments":    np.round(rng.poisson(100, n) * scale),
+        "twitterLikes":       np.round(rng.poisson(1000, n) * scale),
+        "twitterImpressions": np.round(rng.poisson(100000, n) * scale),
+        "twitterSentiment":   rng.uniform(0, 1, n),
+    }, index=idx).reset_index()
+
+
+def synthetic_bars(n_symbols: int, days: int, seed: int = SEED) -> pd.DataFrame:
+    """5-minute OHLCV bars for n_symbols over `days` sessions, time-sorted."""
+    rng = np.random.default_rng(seed + 3)
+    sessions = pd.bdate_range(end=END_DATE, periods=days)
+    offsets = pd.timedelta_range("9h30min", periods=BARS_PER_DAY, freq="5min")
+    stamps = (sessions.values[:, None] + offsets.values[None, :]).ravel()
+    B = len(stamps)
+    close = 100 * np.exp(np.cumsum(0.001 * rng.standard_normal((B, n_symbols)), axis=0))
+    open_ = close * (1 + 0.0005 * rng.standard_normal((B, n_symbols)))
+    return pd.DataFrame({
+        "datetime": np.repeat(stamps, n_symbols),
+        "symbol":   np.tile([f"S{i:03d}" for i in range(n_symbols)], B),
+        "open":     open_.ravel(),
+        "high":     np.maximum(open_, close).ravel() * 1.0005,
+        "low":      np.minimum(open_, close).ravel() * 0.9995,
+        "close":    close.ravel(),
+        "volume":   rng.integers(100, 10000, B * n_symbols),
+    })
+
+
+# --- Measurement ---
+
+def measure(fn, memory: bool = True):
+    """
+    Run fn() with its printing and warnings silenced; returns (result, seconds, peak MB).
+    Peak memory comes from a second, tracemalloc-instrumented run so the
+    timing is not inflated by tracing. Work done in child processes is not
+    counted in the peak.
+    """
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        peak = float("nan")
+        if memory:
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _cluster_backtest(rets, clustered):
+    members = clustered[clustered["cluster"] == 0].reset_index()
+    universe = members.groupby("Date")["Ticker"].agg(list).to_dict()
+    weights = optimize_weights(rets, universe)
+    return run_backtest(weights, rets, horizon=pd.offsets.MonthEnd(1))
+
+
+def bench_universe(n_tickers: int, years: int, tmp: str, memory: bool = True):
+    """Benchmark the cross-sectional stages on one synthetic universe; yields result rows."""
+    prices = synthetic_prices(n_tickers, years)
+    dates = prices.index.get_level_values("Date").unique()
+    factors = synthetic_factors(dates)
+    rets = prices["adj close"].unstack("Ticker").pct_change(fill_method=None).dropna(how="all")
+    sent_csv = os.path.join(tmp, f"sentiment_{n_tickers}_{years}.csv")
+    sent_store = os.path.join(tmp, f"sentiment_{n_tickers}_{years}")
+    sent = synthetic_sentiment(rets.columns, dates)
+    sent.to_csv(sent_csv, index=False)
+    size = {"tickers": n_tickers, "years": years}
+
+    feats, s, m = measure(lambda: compute_features(prices), memory)
+    yield {"stage": "features", **size, "rows": len(prices), "seconds": s, "peak_mb": m}
+
+    betas, s, m = measure(lambda: compute_rolling_betas(prices[["close"]], factors), memory)
+    yield {"stage": "betas", **size, "rows": len(prices), "seconds": s, "peak_mb": m}
+
+    table = feats.join(betas, how="left")
+    labels, s, m = measure(lambda: assign_clusters(table, verbose=False), memory)
+    yield {"stage": "clustering", **size, "rows": len(table), "seconds": s, "peak_mb": m}
+
+    clustered = table.assign(cluster=labels)
+    _, s, m = measure(lambda: _cluster_backtest(rets, clustered), memory)
+    yield {"stage": "backtest_cluster", **size, "rows": rets.size, "seconds": s, "peak_mb": m}
+
+    def ingest():
+        shutil.rmtree(sent_store, ignore_errors=True)
+        return sync_csv(sent_csv, sent_store)
+    _, s, m = measure(ingest, memory)
+    yield {"stage": "sentiment_ingest", **size, "rows": len(sent), "seconds": s, "peak_mb": m}
+
+    # Re-appending the last day only rewrites its month
+    last_day = sent[sent["date"] == sent["date"].max()]
+    _, s, m = measure(lambda: append_rows(last_day, sent_store), memory)
+    yield {"stage": "sentiment_append", **size, "rows": len(last_day), "seconds": s, "peak_mb": m}
+
+    _, s, m = measure(lambda: sentiment_returns(monthly_engagement(sent_store), rets), memory)
+    yield {"stage": "backtest_sentiment", **size, "rows": rets.size, "seconds": s, "peak_mb": m}
+
+    # Every ticker's returns as a "strategy": batch reporting at universe scale
+    _, s, m = measure(lambda: (performance(rets), rolling_metrics(rets)), memory)
+    yield {"stage": "analytics", **size, "rows": rets.size, "seconds": s, "peak_mb": m}
+
+    sample = rets.iloc[:, :BOOTSTRAP_SERIES]
+    _, s, m = measure(lambda: bootstrap(sample, BOOTSTRAP_PATHS, n_jobs=1), memory)
+    yield {"stage": "bootstrap", **size, "rows": sample.size * BOOTSTRAP_PATHS, "seconds": s, "peak_mb": m}
+
+    metrics = monthly_metrics(sent_store)
+    _, s, m = measure(lambda: backtest_variants(metrics, rets), memory)
+    yield {"stage": "sentiment_variants", **size, "rows": rets.size, "seconds": s, "peak_mb": m}
+
+
+def bench_history(years: int, tmp: str, memory: bool = True):
+    """Benchmark the single-instrument / intraday stages, which scale with history only."""
+    size = {"tickers": INTRADAY_SYMBOLS, "years": years}
+    close = synthetic_prices(1, years)["close"].droplevel("Ticker")
+    daily = close.to_frame("Close")
+    _, s, m = measure(lambda: predict_daily_volatility(daily), memory)
+    yield {"stage": "garch", "tickers": 1, "years": years, "rows": len(daily), "seconds": s, "peak_mb": m}
+
+    bars_csv = os.path.join(tmp, f"bars_{years}.csv")
+    bars = synthetic_bars(INTRADAY_SYMBOLS, 252 * years)
+    bars.to_csv(bars_csv, index=False)
+    _, s, m = measure(lambda: daily_open_close(bars_csv), memory)
+    yield {"stage": "intraday_stream", **size, "rows": len(bars), "seconds": s, "peak_mb": m}
+
+    _, s, m = measure(lambda: replay(replay_file(bars_csv), LiveStrategy()), memory)
+    yield {"stage": "live_replay", **size, "rows": len(bars), "seconds": s, "peak_mb": m}
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(tickers=TICKERS, years=YEARS, memory: bool = True) -> dict:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for y in years:
+            for n in tickers:
+                print(f"Benchmarking {n} tickers × {y} years…")
+                for row in bench_universe(n, y, tmp, memory):
+                    print(f"  {row['stage']:<20}{row['seconds']:>9.2f}s{row['peak_mb']:>10.1f} MB")
+                    rows.append(row)
+            print(f"Benchmarking {y}-year single-instrument and intraday stages…")
+            for row in bench_history(y, tmp, memory):
+                print(f"  {row['stage']:<20}{row['seconds']:>9.2f}s{row['peak_mb']:>10.1f} MB")
+                rows.append(row)
+    return {
+        "commit": _commit(),
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": rows,
+    }
+
+
+def compare(old_path: str, new_path: str) -> pd.DataFrame:
+    """Per-stage time and memory ratios of two result files (new / old)."""
+    frames = []
+    for path in (old_path, new_path):
+        with open(path) as fh:
+            frames.append(pd.DataFrame(json.load(fh)["results"]).set_index(["stage", "tickers", "years"]))
+    old, new = frames
+    both = old.join(new, lsuffix="_old", rsuffix="_new", how="inner")
+    both["time_ratio"] = both["seconds_new"] / both["seconds_old"]
+    both["mem_ratio"] = both["peak_mb_new"] / both["peak_mb_old"]
+    both["regression"] = both["time_ratio"] > REGRESSION_RATIO
+    return both[["seconds_old", "seconds_new", "time_ratio", "peak_mb_old", "peak_mb_new",
+                 "mem_ratio", "regression"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every stage on synthetic data.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=TICKERS)
+    parser.add_argument("--years", type=int, nargs="+", default=YEARS)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--out", help="results file (default: data/benchmarks/bench_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        table = compare(*args.compare)
+        print(table.to_string(float_format=lambda x: f"{x:.2f}"))
+        sys.exit(1 if table["regression"].any() else 0)
+
+    results = run_benchmarks(args.tickers, args.years, memory=not args.no_memory)
+    out = args.out or os.path.join(OUT_DIR, f"bench_{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump(results, fh, indent=1)
+    print(f"Saved benchmark results to {out}")
+
+
+if __name__ == "__main__":
+    main()
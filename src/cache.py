@@ -0,0 +1,212 @@
+# src/cache.py
+
+import os
+import io
+import json
+import time
+import hashlib
+import pandas as pd
+
+BASE_DIR  = os.path.dirname(__file__)
+CACHE_DIR = os.path.join(BASE_DIR, os.pardir, "data", "cache")
+TTL_DAYS  = 30  # entries older than this are evicted and refetched in full
+LAG_DAYS  = 92  # no rows this long before the requested end: the series has ended (delisted)
+# Offline mode: serve only what is cached, never touch the network
+OFFLINE   = os.environ.get("ALGO_TRADING_OFFLINE", "") not in ("", "0")
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when the requested data was never cached."""
+
+
+# --- Layout ---
+#
+#   data/cache/objects/<sha256>.pkl   content-addressed frames
+#   data/cache/index/<key>.json       one entry per (source, symbol):
+#                                     covered date range, object hash, fetch time
+
+def _key(source: str, symbol: str) -> str:
+    return hashlib.sha1(f"{source}\x00{symbol}".encode()).hexdigest()
+
+
+def _index_path(source, symbol, cache_dir):
+    return os.path.join(cache_dir, "index", _key(source, symbol) + ".json")
+
+
+def _object_path(digest, cache_dir):
+    return os.path.join(cache_dir, "objects", digest + ".pkl")
+
+
+def _atomic_write(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _write_object(frame: pd.DataFrame, cache_dir) -> str:
+    """Pickle a frame under its content hash; identical content is stored once."""
+    buf = io.BytesIO()
+    frame.to_pickle(buf)
+    data = buf.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest, cache_dir)
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+    return digest
+
+
+def _write_entry(source, symbol, start, end, digest, fetched, cache_dir):
+    entry = {"source": source, "symbol": symbol, "start": start.isoformat(),
+             "end": end.isoformat(), "object": digest, "fetched": fetched}
+    _atomic_write(_index_path(source, symbol, cache_dir), json.dumps(entry).encode())
+
+
+def _is_stale(entry: dict, ttl_days) -> bool:
+    return ttl_days is not None and time.time() - entry["fetched"] > ttl_days * 86400
+
+
+def lookup(source: str, symbol: str, ttl_days=TTL_DAYS, cache_dir=CACHE_DIR) -> dict | None:
+    """Index entry for (source, symbol), or None if absent or past its TTL (ignored offline)."""
+    path = _index_path(source, symbol, cache_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        entry = json.load(fh)
+    if not OFFLINE and _is_stale(entry, ttl_days):
+        return None
+    return entry
+
+
+def load(source: str, symbol: str, start=None, end=None, ttl_days=TTL_DAYS,
+         cache_dir=CACHE_DIR) -> pd.DataFrame | None:
+    """Cached frame for (source, symbol), sliced to [start, end); None if not cached."""
+    entry = lookup(source, symbol, ttl_days, cache_dir)
+    if entry is None:
+        return None
+    frame = pd.read_pickle(_object_path(entry["object"], cache_dir))
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame.index < pd.Timestamp(end)]
+    return frame
+
+
+def missing_range(source: str, symbol: str, start, end, ttl_days=TTL_DAYS,
+                  cache_dir=CACHE_DIR):
+    """
+    The part of [start, end) not yet covered by the cache, as a (start, end)
+    pair, or None when fully covered. A gap at both ends returns the whole range.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    entry = lookup(source, symbol, ttl_days, cache_dir)
+    if entry is None:
+        return start, end
+    lo, hi = pd.Timestamp(entry["start"]), pd.Timestamp(entry["end"])
+    head, tail = start < lo, end > hi
+    if head and tail:
+        return start, end
+    if tail:
+        return hi, end
+    if head:
+        return start, lo
+    return None
+
+
+def store(source: str, symbol: str, frame: pd.DataFrame, start, end,
+          ttl_days=TTL_DAYS, cache_dir=CACHE_DIR) -> None:
+    """
+    Merge a freshly fetched frame covering [start, end) into the cache.
+    Coverage only extends to just past the last row the series has, so a
+    range that had no data yet (weekend, unpublished month) is asked for
+    again, unless that row is more than LAG_DAYS before `end`: the series
+    has ended (delisted symbol) and is covered up to `end`, so later runs
+    do not keep asking for its tail.
+    """
+    start = pd.Timestamp(start).normalize()
+    requested = pd.Timestamp(end).normalize()
+
+    # The TTL counts from the first full fetch, so appended tails do not
+    # keep an old entry alive forever
+    fetched = time.time()
+    old = lookup(source, symbol, ttl_days, cache_dir)
+    if old is not None:
+        prev = pd.read_pickle(_object_path(old["object"], cache_dir))
+        frame = pd.concat([prev, frame])
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        fetched = old["fetched"]
+
+    last = frame.index.max().normalize() if len(frame) else start - pd.Timedelta(days=1)
+    end = requested if requested - last > pd.Timedelta(days=LAG_DAYS) else last + pd.Timedelta(days=1)
+    if old is not None:
+        start = min(start, pd.Timestamp(old["start"]))
+        end = max(end, pd.Timestamp(old["end"]))
+    if end <= start and not len(frame):
+        return
+
+    _write_entry(source, symbol, start, end, _write_object(frame, cache_dir), fetched, cache_dir)
+
+
+def cached_frame(source: str, symbol: str, start, end, fetch, ttl_days=TTL_DAYS,
+                 cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """
+    Read-through cache for a date-indexed series.
+    fetch(start, end) is only called for the uncovered part of [start, end).
+    Offline, whatever is cached is returned and nothing is fetched.
+    """
+    if OFFLINE:
+        frame = load(source, symbol, start, end, ttl_days, cache_dir)
+        if frame is None:
+            raise CacheMissError(f"{source}:{symbol} is not cached (offline mode)")
+        return frame
+    fetched = None
+    gap = missing_range(source, symbol, start, end, ttl_days, cache_dir)
+    if gap is not None:
+        fetched = fetch(*gap)
+        store(source, symbol, fetched, *gap, ttl_days=ttl_days, cache_dir=cache_dir)
+    frame = load(source, symbol, start, end, ttl_days, cache_dir)
+    if frame is None:
+        # Nothing has ever been returned for this symbol
+        return fetched.iloc[:0] if fetched is not None else pd.DataFrame()
+    return frame
+
+
+def cached_snapshot(source: str, symbol: str, fetch, ttl_days=1,
+                    cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """
+    Read-through cache for data without a date axis (e.g. the constituents
+    table): fetch() is called only when the cached copy is older than ttl_days.
+    """
+    entry = lookup(source, symbol, ttl_days, cache_dir)
+    if entry is not None:
+        return pd.read_pickle(_object_path(entry["object"], cache_dir))
+    if OFFLINE:
+        raise CacheMissError(f"{source}:{symbol} is not cached (offline mode)")
+    frame = fetch()
+    today = pd.Timestamp.now().normalize()
+    _write_entry(source, symbol, today, today, _write_object(frame, cache_dir),
+                 time.time(), cache_dir)
+    return frame
+
+
+def evict(ttl_days=TTL_DAYS, cache_dir=CACHE_DIR) -> int:
+    """Drop index entries past their TTL and any objects no entry references."""
+    index_dir = os.path.join(cache_dir, "index")
+    object_dir = os.path.join(cache_dir, "objects")
+    if not os.path.isdir(index_dir):
+        return 0
+    removed, live = 0, set()
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        with open(path) as fh:
+            entry = json.load(fh)
+        if _is_stale(entry, ttl_days):
+            os.remove(path)
+            removed += 1
+        else:
+            live.add(entry["object"])
+    for name in os.listdir(object_dir) if os.path.isdir(object_dir) else []:
+        if name.endswith(".pkl") and name[:-4] not in live:
+            os.remove(os.path.join(object_dir, name))
+    return removed
@@ -0,0 +1,121 @@
+# src/cli.py
+
+import os
+import sys
+import json
+import runpy
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Command -> (module run as a script, description). Nothing here is imported
+# until its command runs, so `cli.py --help` costs an interpreter start only.
+COMMANDS = {
+    "data":       ("data", "download S&P 500 prices and build the price store"),
+    "features":   ("features", "monthly technical features"),
+    "factors":    ("factors", "rolling Fama–French betas"),
+    "clustering": ("clustering", "monthly KMeans regimes"),
+    "backtest":   ("backtest", "cluster max-Sharpe backtest"),
+    "sweep":      ("sweep", "K × cluster × estimator grid"),
+    "sentiment":  ("twitter_sentiment", "Twitter engagement backtest"),
+    "store":      ("sentiment_store", "sync / append the sentiment store"),
+    "signals":    ("sentiment_signals", "compare weighted sentiment signal variants"),
+    "intraday":   ("intraday", "GARCH + momentum backtest (or --grid)"),
+    "live":       ("live", "bar-by-bar replay of the intraday rule"),
+    "membership": ("membership", "point-in-time S&P 500 members (--asof DATE)"),
+    "strategies": ("strategies", "run registered strategies on one data load"),
+    "analyze":    ("analyze", "performance report and plot"),
+    "robustness": ("robustness", "bootstrap intervals, PSR and DSR"),
+    "pipeline":   ("pipeline", "run every out-of-date stage"),
+    "benchmark":  ("benchmark", "time every stage on synthetic data"),
+}
+
+# Importing a stage module may take at most IMPORT_BUDGET_S longer than a bare
+# `import pandas` (so the check holds on slow and fast machines alike) and
+# must not load any of these; they belong inside the functions that use them.
+IMPORT_BUDGET_S = 0.5
+HEAVY = ["yfinance", "pandas_datareader", "arch", "sklearn", "scipy.optimize",
+         "matplotlib", "pyinstrument", "ta", "pypfopt"]
+
+_PROBE = """
+import sys, time, json
+sys.path.insert(0, {base!r})
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def import_time(module: str, repeat: int = 3) -> dict:
+    """Fastest of `repeat` cold imports of `module`, each in a fresh interpreter."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(base=BASE_DIR, module=module, heavy=HEAVY)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return {"module": module, "seconds": float("nan"), "heavy": [],
+                    "error": out.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(out.stdout))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {"module": module, **best}
+
+
+def measure_imports(budget: float = IMPORT_BUDGET_S, repeat: int = 3) -> list[dict]:
+    """
+    Cold import of every stage module against the fastest of `repeat` bare
+    `import pandas`. Each module is imported once; only one that looks over
+    budget is re-timed (fastest of `repeat`), so a noisy run does not fail it.
+    Each result gains "extra" (seconds over the baseline) and "ok".
+    """
+    base = import_time("pandas", repeat)["seconds"]
+    results = []
+    for module in sorted({m for m, _ in COMMANDS.values()}):
+        r = import_time(module, 1)
+        if "error" not in r and not r["seconds"] - base <= budget:
+            r = import_time(module, repeat)
+        r["extra"] = r["seconds"] - base
+        r["ok"] = not r["heavy"] and "error" not in r and r["extra"] <= budget
+        results.append(r)
+    return results
+
+
+def check_imports(budget: float = IMPORT_BUDGET_S, repeat: int = 3) -> bool:
+    """Print the import table; False if any module is over budget, fails or loads a heavy library."""
+    results = measure_imports(budget, repeat)
+    print(f"{'module':<20}{'import s':>9}{'+pandas':>9}  heavy libraries loaded")
+    for r in results:
+        note = r.get("error") or ", ".join(r["heavy"]) or "-"
+        print(f"{r['module']:<20}{r['seconds']:>9.3f}{r['extra']:>+9.3f}  {note}{'' if r['ok'] else '  ✗'}")
+    ok = all(r["ok"] for r in results)
+    print(f"All imports within {budget:.2f}s of `import pandas` and free of heavy libraries" if ok
+          else f"Import budget ({budget:.2f}s over `import pandas`, no {', '.join(HEAVY)}) exceeded")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Run one stage of the trading pipeline.",
+        epilog="commands:\n" + "\n".join(f"  {k:<13}{d}" for k, (_, d) in COMMANDS.items())
+               + "\n  check-imports  enforce the import-time budget",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=[*COMMANDS, "check-imports"], metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="passed on to the stage")
+    args = parser.parse_args(argv)
+
+    if args.command == "check-imports":
+        sub = argparse.ArgumentParser(prog="cli.py check-imports")
+        sub.add_argument("--budget", type=float, default=IMPORT_BUDGET_S, help="seconds per module on top of `import pandas`")
+        sub.add_argument("--repeat", type=int, default=3, help="cold imports per module (fastest counts)")
+        opts = sub.parse_args(args.args)
+        sys.exit(0 if check_imports(opts.budget, opts.repeat) else 1)
+
+    # Run the stage exactly as `python src/<module>.py args…` would
+    module = COMMANDS[args.command][0]
+    sys.argv = [os.path.join(BASE_DIR, module + ".py"), *args.args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
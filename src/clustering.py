@@ -1,53 +1,110 @@
 # src/clustering.py
 
 import os
+import time
+import argparse
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.impute import SimpleImputer
+from instrument import span, timed
 
 BASE_DIR   = os.path.dirname(__file__)
 INPUT_CSV  = os.path.join(BASE_DIR, os.pardir, "data", "processed", "features_with_betas.csv")
 OUT_DIR    = os.path.join(BASE_DIR, os.pardir, "data", "processed")
 N_CLUSTERS = 4
+WARM_START = True   # seed each month with last month's centroids and keep cluster ids stable
 
 
-def main():
-    os.makedirs(OUT_DIR, exist_ok=True)
-    print("Loading feature+beta data…")
-    df = pd.read_csv(
-        INPUT_CSV,
-        index_col=["Date","Ticker"],
-        parse_dates=["Date"]
-    )
+def cluster_month(X_raw, n_clusters=N_CLUSTERS, init=None):
+    """
+    Impute, standardize and KMeans-cluster one month's feature matrix.
+    With `init` (previous centroids) a single seeded run replaces the
+    default multi-start fit. Returns (labels, centroids).
+    """
+    # sklearn takes over a second to import; load it on the first fit instead
+    from sklearn.cluster import KMeans
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    # 1) Impute missing values using column mean (all-NaN columns kept as
+    #    constants so the feature space is the same every month)
+    imputer = SimpleImputer(strategy='mean', keep_empty_features=True)
+    X_imp = imputer.fit_transform(X_raw)
+
+    # 2) Standardize features
+    scaler = StandardScaler()
+    Xs = scaler.fit_transform(X_imp)
 
-    records = []
+    # 3) K-Means clustering
+    if init is None:
+        km = KMeans(n_clusters=n_clusters, random_state=42)
+    else:
+        km = KMeans(n_clusters=n_clusters, init=init, n_init=1)
+    labels = km.fit_predict(Xs)
+    return labels, km.cluster_centers_
 
-    for date, group in df.groupby(level="Date"):
-        # Extract features matrix
-        X_raw = group.values
 
-        # 1) Impute missing values using column mean
-        imputer = SimpleImputer(strategy='mean')
-        X_imp = imputer.fit_transform(X_raw)
+def _match_clusters(centroids, prev):
+    """Permutation sending each new cluster id to the closest previous one."""
+    from scipy.optimize import linear_sum_assignment
+    cost = ((centroids[:, None, :] - prev[None, :, :]) ** 2).sum(axis=-1)
+    rows, cols = linear_sum_assignment(cost)
+    perm = np.empty(len(centroids), dtype=np.int64)
+    perm[rows] = cols
+    return perm
 
-        # 2) Standardize features
-        scaler = StandardScaler()
-        Xs = scaler.fit_transform(X_imp)
 
-        # 3) K-Means clustering
-        km = KMeans(n_clusters=N_CLUSTERS, random_state=42)
-        labels = km.fit_predict(Xs)
+@timed("assign_clusters")
+def assign_clusters(df: pd.DataFrame, n_clusters=N_CLUSTERS, verbose=True,
+                    warm_start=WARM_START) -> np.ndarray:
+    """
+    Cluster label for every row of df ([Date, Ticker] index), fitted month by month.
+    With warm_start, each month is seeded with the previous month's centroids
+    and its ids are matched to them, so a cluster id means the same regime
+    over time.
+    """
+    labels = np.empty(len(df), dtype=np.int64)
+    values = df.to_numpy()
+    prev = None
+    for date, pos in df.groupby(level="Date").indices.items():
+        with span("clustering.month", rows=len(pos), date=str(date.date())):
+            month, centroids = cluster_month(values[pos], n_clusters, init=prev)
+            if warm_start:
+                if prev is not None:
+                    perm = _match_clusters(centroids, prev)
+                    month = perm[month]
+                    centroids = centroids[np.argsort(perm)]
+                prev = centroids
+        labels[pos] = month
+        if verbose:
+            print(f"  clustered {len(pos)} tickers for {date.date()} → clusters 0–{n_clusters-1}")
+    return labels
 
-        temp = group.copy().reset_index()
-        temp['cluster'] = labels
-        records.append(temp)
 
-        print(f"  clustered {len(group)} tickers for {date.date()} → clusters 0–{N_CLUSTERS-1}")
+def label_stability(df: pd.DataFrame, labels: np.ndarray) -> float:
+    """Share of tickers present in consecutive months that keep their cluster id."""
+    wide = pd.Series(labels, index=df.index).unstack("Ticker")
+    cur, nxt = wide.iloc[:-1].to_numpy(), wide.iloc[1:].to_numpy()
+    both = ~np.isnan(cur) & ~np.isnan(nxt)
+    return float((cur[both] == nxt[both]).mean()) if both.any() else float("nan")
+
+
+def main(warm_start=WARM_START, n_clusters=N_CLUSTERS):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    print("Loading feature+beta data…")
+    df = pd.read_csv(
+        INPUT_CSV,
+        index_col=["Date","Ticker"],
+        parse_dates=["Date"]
+    )
+    df = df.sort_index(level="Date", sort_remaining=False)
 
-    # Concatenate all monthly results
-    full = pd.concat(records, ignore_index=True)
-    full = full.set_index(["Date","Ticker"])
+    t0 = time.perf_counter()
+    labels = assign_clusters(df, n_clusters=n_clusters, verbose=False, warm_start=warm_start)
+    elapsed = time.perf_counter() - t0
+    print(f"Clustered {df.index.get_level_values('Date').nunique()} months in {elapsed:.1f}s "
+          f"({'warm-started' if warm_start else 'independent'} fits); "
+          f"label stability {label_stability(df, labels):.1%}")
+    full = df.assign(cluster=labels)
 
     out_path = os.path.join(OUT_DIR, "features_clustered.csv")
     full.to_csv(out_path)
@@ -55,4 +112,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--warm-start", action=argparse.BooleanOptionalAction, default=WARM_START,
+                        help="seed each month with last month's centroids and keep cluster ids stable "
+                             "(--no-warm-start fits every month independently, with arbitrary ids)")
+    main(parser.parse_args().warm_start)
@@ -0,0 +1,87 @@
+# src/context.py
+
+import os
+import time
+import pandas as pd
+from price_store import available_fields, load_wide
+
+BASE_DIR  = os.path.dirname(__file__)
+CLUSTERED = os.path.join(BASE_DIR, os.pardir, "data", "processed", "features_clustered.csv")
+
+# Dataset name -> loader(ctx). Core datasets are defined here; strategy
+# modules add their own with @dataset.
+DATASETS = {}
+
+
+def dataset(name: str):
+    """Register a loader for `name`; it receives the context to pull what it depends on."""
+    def wrap(fn):
+        DATASETS[name] = fn
+        return fn
+    return wrap
+
+
+class DataContext:
+    """
+    Inputs shared by the strategies in one run. Each dataset is loaded on
+    first use and memoized, so strategies that need the same prices or
+    returns share one copy. Keyword arguments pre-seed datasets.
+    """
+
+    def __init__(self, **preloaded):
+        self._cache = dict(preloaded)
+        self.timings = {}
+
+    def get(self, name: str):
+        if name not in self._cache:
+            if name not in DATASETS:
+                raise KeyError(f"Unknown dataset {name!r}; known: {sorted(DATASETS)}")
+            start = time.perf_counter()
+            self._cache[name] = DATASETS[name](self)
+            self.timings[name] = time.perf_counter() - start
+        return self._cache[name]
+
+    def load(self, names) -> None:
+        """Load several datasets up front (e.g. everything a strategy declares)."""
+        for name in names:
+            self.get(name)
+
+    def loaded(self) -> list[str]:
+        return list(self._cache)
+
+
+# --- Core datasets ---
+
+@dataset("close")
+def _close(ctx):
+    return load_wide("close")
+
+
+@dataset("close_returns")
+def _close_returns(ctx):
+    return ctx.get("close").pct_change().dropna(how="all")
+
+
+@dataset("prices")
+def _prices(ctx):
+    # Adjusted close if available, else the close matrix already shared with others
+    return load_wide("adj close") if "adj close" in available_fields() else ctx.get("close")
+
+
+@dataset("returns")
+def _returns(ctx):
+    if "adj close" not in available_fields():
+        return ctx.get("close_returns")
+    return ctx.get("prices").pct_change().dropna(how="all")
+
+
+@dataset("clustered")
+def _clustered(ctx):
+    # With a constituents history, only the names in the index on each
+    # rebalance date are eligible. Prices and returns stay unmasked, so a
+    # name dropped from the index mid-month still books its losses and a
+    # new member keeps the history its covariance is estimated from.
+    import membership  # registers the "membership" dataset; it imports this module
+    feats = pd.read_csv(CLUSTERED, index_col=["Date", "Ticker"], parse_dates=["Date"])
+    members = ctx.get("membership")
+    return feats if members is None else members.mask_long(feats)
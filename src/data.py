@@ -2,17 +2,27 @@
 import os
 import datetime as dt
 import pandas as pd
-import yfinance as yf
+import cache
+from downloader import download_chunked
+from membership import HISTORY_CSV, load_membership
+from price_store import write_store
 
-RAW_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "raw")
+RAW_DIR   = os.path.join(os.path.dirname(__file__), os.pardir, "data", "raw")
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+# Resumable record of in-flight downloads, one per batch (missing date range)
+MANIFEST  = os.path.join(RAW_DIR, "download_{}.json")
+
+def _fetch_sp500_table() -> pd.DataFrame:
+    return pd.read_html(SP500_URL)[0]
 
 def get_sp500_tickers() -> list[str]:
     """Fetch the current S&P 500 tickers from Wikipedia, cleaning dots to hyphens."""
-    table = pd.read_html("https://en.wikipedia.org/wiki/List_of_S%26P_500_companies")[0]
+    table = cache.cached_snapshot("wikipedia", "sp500_constituents", _fetch_sp500_table)
     return table.Symbol.str.replace(r"\.", "-", regex=True).unique().tolist()
 
-def download_price_data(tickers, start, end) -> pd.DataFrame:
-    """Download daily OHLC+Adj Close and stack into a long DataFrame."""
+def _yf_download(tickers, start, end) -> pd.DataFrame:
+    """One yf.download call, stacked into a long [Date, Ticker] DataFrame."""
+    import yfinance as yf  # only when something is actually downloaded
     df = yf.download(tickers=tickers, start=start, end=end, group_by="ticker", auto_adjust=False)
     # If multiple tickers, stack so index = [Date, Ticker]
     if isinstance(df.columns, pd.MultiIndex):
@@ -22,17 +32,77 @@ def download_price_data(tickers, start, end) -> pd.DataFrame:
     df.columns = df.columns.str.lower()
     return df
 
-def main():
+def download_price_data(tickers, start, end, fetch=_yf_download) -> pd.DataFrame:
+    """
+    Download daily OHLC+Adj Close and stack into a long DataFrame.
+    Each symbol is served from the local cache; only the uncovered part of
+    [start, end) is downloaded, one batch per distinct missing range, so a
+    new or lagging symbol never widens the request for the others.
+    Each batch is fetched in concurrent chunks with retries, and every chunk
+    is written to the cache as soon as it arrives, so an interrupted run
+    picks up where it stopped. `fetch` can be swapped for a local source.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    batches = {}
+    if not cache.OFFLINE:
+        for t in tickers:
+            gap = cache.missing_range("yfinance", t, start, end)
+            if gap is not None:
+                batches.setdefault(gap, []).append(t)
+
+    for (lo, hi), batch in sorted(batches.items()):
+        print(f"  downloading {len(batch)} symbols from {lo.date()} to {hi.date()}…")
+
+        def sink(chunk, fetched, lo=lo, hi=hi):
+            have = set(fetched.index.get_level_values("Ticker"))
+            for t in chunk:
+                frame = fetched.xs(t, level="Ticker") if t in have else fetched.iloc[:0].droplevel("Ticker")
+                cache.store("yfinance", t, frame, lo, hi)
+
+        manifest = MANIFEST.format(f"{lo:%Y%m%d}_{hi:%Y%m%d}")
+        result = download_chunked(batch, lo, hi, fetch, sink, manifest)
+        if result["failed"]:
+            print(f"  [WARN] failed to download {len(result['failed'])} symbols: {result['failed']}")
+        else:
+            os.remove(manifest)
+
+    frames = {}
+    for t in tickers:
+        frame = cache.load("yfinance", t, start, end)
+        if frame is None or frame.empty:
+            print(f"  [WARN] no price data for {t}")
+            continue
+        frames[t] = frame
+    if not frames:
+        names = ", ".join(tickers[:10]) + (f" and {len(tickers) - 10} more" if len(tickers) > 10 else "")
+        if cache.OFFLINE:
+            raise cache.CacheMissError(f"ALGO_TRADING_OFFLINE is set and no prices are cached for {names}")
+        raise RuntimeError(f"No price data could be downloaded for {names}")
+    df = pd.concat(frames, names=["Ticker", "Date"]).swaplevel().sort_index()
+    return df
+
+def main(end=None):
+    """Download eight years of prices up to `end` (ISO date, default today)."""
     os.makedirs(RAW_DIR, exist_ok=True)
-    print("Fetching tickers…")
-    tickers = get_sp500_tickers()
-    end = dt.datetime.today()
+    end = dt.datetime.today() if end is None else dt.datetime.fromisoformat(end)
     start = end - dt.timedelta(days=365 * 8)
+    members = load_membership()
+    if members is not None:
+        # Everyone who was in the index at any point in the window, delisted names included
+        tickers = members.tickers_between(start, end)
+        print(f"Universe: {len(tickers)} past and present members from {HISTORY_CSV}")
+    else:
+        print(f"  [WARN] no constituents history at {HISTORY_CSV}; "
+              "using today's members for every year (survivorship bias)")
+        print("Fetching tickers…")
+        tickers = get_sp500_tickers()
     print(f"Downloading {len(tickers)} symbols from {start.date()} to {end.date()}…")
     prices = download_price_data(tickers, start, end)
     out_path = os.path.join(RAW_DIR, "sp500_prices.csv")
     prices.to_csv(out_path)
     print(f"Saved raw prices to {out_path}")
+    write_store(prices)
+    print("Wrote columnar price store")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+# src/downloader.py
+
+import os
+import json
+import time
+import random
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+
+CHUNK_SIZE  = 50    # symbols per request
+MAX_WORKERS = 4     # concurrent requests
+RETRIES     = 3     # attempts per request before splitting the chunk
+BACKOFF     = 2.0   # seconds; doubles after every failed attempt
+
+
+def _signature(tickers, start, end) -> str:
+    key = "|".join([pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat(), *tickers])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _load_manifest(path, signature, tickers, chunk_size) -> dict:
+    """Resume the manifest of an interrupted run over the same request, else plan a new one."""
+    if path and os.path.exists(path):
+        with open(path) as fh:
+            manifest = json.load(fh)
+        if manifest.get("signature") == signature:
+            return manifest
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    return {
+        "signature": signature,
+        "chunks": [{"tickers": c, "status": "pending", "attempts": 0, "failed": []}
+                   for c in chunks],
+    }
+
+
+def _save_manifest(path, manifest) -> None:
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, path)
+
+
+def _fetch_with_retry(fetch, tickers, start, end, retries, backoff):
+    """
+    Call fetch(tickers, start, end), retrying with exponential backoff and jitter.
+    If a multi-symbol request keeps failing, split it in half and retry each
+    half, so one bad symbol only loses itself.
+    Returns (frames, attempts, failed_tickers).
+    """
+    error = None
+    for attempt in range(retries):
+        try:
+            return [fetch(tickers, start, end)], attempt + 1, []
+        except Exception as exc:  # network/throttling errors vary by source
+            error = exc
+            if attempt + 1 < retries:
+                time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+    if len(tickers) == 1:
+        print(f"  [WARN] giving up on {tickers[0]}: {error}")
+        return [], retries, list(tickers)
+    mid = len(tickers) // 2
+    frames, attempts, failed = [], retries, []
+    for half in (tickers[:mid], tickers[mid:]):
+        f, a, bad = _fetch_with_retry(fetch, half, start, end, retries, backoff)
+        frames += f
+        attempts += a
+        failed += bad
+    return frames, attempts, failed
+
+
+def download_chunked(tickers, start, end, fetch, sink, manifest_path=None,
+                     chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS,
+                     retries=RETRIES, backoff=BACKOFF) -> dict:
+    """
+    Download `tickers` over [start, end) in chunks through a bounded thread pool.
+
+    fetch(chunk_tickers, start, end) -> long [Date, Ticker] DataFrame; any
+        callable works, e.g. a local fake source in tests.
+    sink(chunk_tickers, frame) is called in this thread as each chunk
+        finishes, so results can be written to disk without holding the
+        whole universe in memory.
+    manifest_path: JSON file recording each chunk's status. Re-running the
+        same request after an interruption or a failure skips the chunks
+        already done and only asks again for the symbols that failed.
+
+    Returns {"done": [...tickers], "failed": [...tickers]}.
+    """
+    tickers = list(tickers)
+    manifest = _load_manifest(manifest_path, _signature(tickers, start, end), tickers, chunk_size)
+    pending = [i for i, c in enumerate(manifest["chunks"]) if c["status"] != "done"]
+    skipped = len(manifest["chunks"]) - len(pending)
+    if skipped:
+        print(f"  resuming download: {skipped} of {len(manifest['chunks'])} chunks already done")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # A chunk that failed before only asks again for its failed symbols
+        todo = {i: manifest["chunks"][i]["failed"] or manifest["chunks"][i]["tickers"]
+                for i in pending}
+        futures = {
+            pool.submit(_fetch_with_retry, fetch, todo[i], start, end, retries, backoff): i
+            for i in pending
+        }
+        for fut in as_completed(futures):
+            i = futures[fut]
+            chunk = manifest["chunks"][i]
+            frames, attempts, failed = fut.result()
+            frame = pd.concat(frames) if frames else None
+            ok = [t for t in todo[i] if t not in failed]
+            if frame is not None:
+                sink(ok, frame)
+            chunk.update(status="failed" if failed else "done",
+                         attempts=chunk["attempts"] + attempts, failed=failed)
+            _save_manifest(manifest_path, manifest)
+
+    failed = [t for c in manifest["chunks"] for t in c["failed"]]
+    done = [t for c in manifest["chunks"] for t in c["tickers"] if t not in failed]
+    return {"done": done, "failed": failed}
+
+
+def local_source(prices: pd.DataFrame, fail=()):
+    """
+    A fetch function serving a long [Date, Ticker] frame from memory, for
+    tests and offline development. Requests including a symbol in `fail` raise.
+    """
+    dates = prices.index.get_level_values("Date")
+    names = prices.index.get_level_values("Ticker")
+
+    def fetch(tickers, start, end):
+        bad = set(tickers) & set(fail)
+        if bad:
+            raise ConnectionError(f"simulated failure for {sorted(bad)}")
+        mask = (dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end)) & names.isin(tickers)
+        return prices[mask]
+
+    return fetch
@@ -0,0 +1,92 @@
+# src/engine.py
+
+import numpy as np
+import pandas as pd
+
+COST_BPS = 0.0  # transaction cost per unit of turnover, in basis points
+
+
+def assign_periods(rebalance_dates, days, horizon=None) -> np.ndarray:
+    """
+    For each day, the index of the rebalance that holds it: the latest
+    rebalance strictly before the day, or -1 if there is none or the day is
+    past `horizon` (a DateOffset, e.g. MonthEnd(1)) from that rebalance.
+    """
+    rebalance_dates = pd.DatetimeIndex(rebalance_dates)
+    days = pd.DatetimeIndex(days)
+    k = rebalance_dates.searchsorted(days, side="left") - 1
+    ok = k >= 0
+    if horizon is not None:
+        limit = (rebalance_dates + horizon).values
+        ok &= days.values <= limit[np.clip(k, 0, None)]
+    return np.where(ok, k, -1)
+
+
+def simulate(weights: np.ndarray, returns: np.ndarray, period: np.ndarray,
+             drift: bool = False, cost_bps: float = COST_BPS) -> dict:
+    """
+    Daily portfolio returns for target weights set at each rebalance.
+
+    weights: (..., K, N) target weights per rebalance; leading axes are
+             independent variants simulated together. The remainder is cash.
+    returns: T×N daily asset returns, NaN treated as 0 (not trading).
+    period:  length-T rebalance index holding each day (see assign_periods),
+             -1 for days outside any holding period (dropped).
+    drift:   let positions drift with prices between rebalances instead of
+             holding constant weights.
+
+    Turnover (sum of absolute weight changes, from the drifted weights of the
+    previous holding day) and its cost are booked on the first day of each
+    holding period.
+    Returns {"live": T bool mask, "gross", "net", "turnover": (..., T') arrays}.
+    """
+    live = period >= 0
+    p = period[live]
+    r = np.nan_to_num(returns[live])
+    W = np.nan_to_num(weights)[..., p, :]                  # (..., T', N)
+    start = np.r_[True, p[1:] != p[:-1]]                   # first day held per period
+
+    if drift:
+        # Growth of every position since its period began, before / after day t
+        lr = np.log1p(np.maximum(r, -1 + 1e-12))
+        c = np.cumsum(lr, axis=0)
+        first = np.maximum.accumulate(np.where(start, np.arange(len(p)), 0))
+        base = c[first] - lr[first]
+        grow_prev = np.exp(c - lr - base)
+        grow = np.exp(c - base)
+        cash = 1 - W.sum(axis=-1)
+        nav_prev = (W * grow_prev).sum(axis=-1) + cash
+        gross = (W * grow_prev * r).sum(axis=-1) / nav_prev
+        end_w = W * grow / ((W * grow).sum(axis=-1) + cash)[..., None]
+    else:
+        gross = np.einsum("...tn,tn->...t", W, r)
+        end_w = W
+
+    prev = np.zeros_like(end_w)
+    prev[..., 1:, :] = end_w[..., :-1, :]
+    turnover = np.where(start, np.abs(W - prev).sum(axis=-1), 0.0)
+    net = gross - turnover * cost_bps / 1e4
+    return {"live": live, "gross": gross, "net": net, "turnover": turnover}
+
+
+def run_backtest(weights: pd.DataFrame, returns: pd.DataFrame, horizon=None,
+                 drift: bool = False, cost_bps: float = COST_BPS) -> pd.DataFrame:
+    """
+    Walk-forward backtest of a (rebalance date × ticker) weight matrix.
+    Each row is traded at its date's close and held over the following days,
+    until the next rebalance or `horizon` after its date. Rows that are all
+    NaN mean "not invested". Tickers missing from `returns` are ignored.
+
+    Returns a daily DataFrame with columns ['return', 'gross_return', 'turnover'].
+    """
+    weights = weights.sort_index()
+    w = weights.reindex(columns=returns.columns).to_numpy(dtype=np.float64)
+    period = assign_periods(weights.index, returns.index, horizon)
+    invested = weights.notna().any(axis=1).to_numpy()
+    period = np.where((period >= 0) & invested[np.clip(period, 0, None)], period, -1)
+
+    res = simulate(w, returns.to_numpy(dtype=np.float64), period, drift, cost_bps)
+    return pd.DataFrame(
+        {"return": res["net"], "gross_return": res["gross"], "turnover": res["turnover"]},
+        index=returns.index[res["live"]],
+    )
@@ -1,67 +1,130 @@
 # src/factors.py
 
 import os
+import argparse
+import numpy as np
 import pandas as pd
 import datetime as dt
-from pandas_datareader import data as web
+from cache import cached_frame
+from incremental import load_checkpoint, save_checkpoint, split_complete_months, write_tail
+from instrument import timed
+import price_store
+from price_store import load_panel, peak_rss_mb
+from rolling_ols import rolling_ols
 
 # Paths
 BASE_DIR     = os.path.dirname(__file__)
-RAW_PRICES   = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sp500_prices.csv")
 FEATURES_CSV = os.path.join(BASE_DIR, os.pardir, "data", "processed", "features_monthly.csv")
 OUT_DIR      = os.path.join(BASE_DIR, os.pardir, "data", "processed")
-WINDOW       = 12  # 12-month rolling window for beta
-
-def get_ff_factors(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+STATE_FILE   = os.path.join(OUT_DIR, "betas_state.npz")
+WINDOW       = 12         # rolling window for factor loadings, in FREQ periods
+FREQ         = "monthly"  # regression frequency: "monthly" or "daily"
+FF_MODEL     = 3          # Fama–French 3- or 5-factor model; 5 needs a longer WINDOW (or daily FREQ)
+
+FF_DATASETS = {
+    (3, "monthly"): "F-F_Research_Data_Factors",
+    (3, "daily"):   "F-F_Research_Data_Factors_daily",
+    (5, "monthly"): "F-F_Research_Data_5_Factors_2x3",
+    (5, "daily"):   "F-F_Research_Data_5_Factors_2x3_daily",
+}
+FACTORS = ["Mkt-RF", "SMB", "HML", "RMW", "CMA"]
+# Market loading keeps the historical "beta" column name
+BETA_COLUMNS = {"Mkt-RF": "beta", "SMB": "beta_smb", "HML": "beta_hml",
+                "RMW": "beta_rmw", "CMA": "beta_cma"}
+
+def get_ff_factors(start: pd.Timestamp, end: pd.Timestamp,
+                   model: int = FF_MODEL, freq: str = FREQ) -> pd.DataFrame:
     """
-    Download Fama–French 3 factors (Mkt–RF, SMB, HML, RF).
-    Returns a DataFrame indexed by month-end timestamps, in decimals.
+    Download Fama–French 3 factors (Mkt–RF, SMB, HML, RF), or the 5-factor
+    set (adds RMW, CMA), at monthly or daily frequency.
+    Returns a DataFrame indexed by month-end (or daily) timestamps, in decimals.
     """
-    ff = web.DataReader("F-F_Research_Data_Factors", "famafrench", start, end)[0]
-    # Convert index to month-end Timestamps
-    ff.index = ff.index.to_timestamp()
-    # Convert percentages to decimals
-    return ff.div(100)
-
-def compute_rolling_betas(prices: pd.DataFrame, factors: pd.DataFrame) -> pd.DataFrame:
+    dataset = FF_DATASETS[(model, freq)]
+
+    def fetch(lo, hi):
+        from pandas_datareader import data as web  # only on a cache miss
+        ff = web.DataReader(dataset, "famafrench", lo, hi)[0]
+        # Convert index to month-end Timestamps to line up with resample("M")
+        if isinstance(ff.index, pd.PeriodIndex):
+            ff.index = ff.index.to_timestamp(how="end").normalize()
+        # Convert percentages to decimals
+        return ff.div(100)
+
+    # Served from the local cache; only months not cached yet are downloaded
+    return cached_frame("famafrench", dataset, start, end + pd.Timedelta(days=1), fetch)
+
+def _period_closes(prices: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Closes (Date × Ticker) at the regression frequency."""
+    close = prices["close"].unstack("Ticker")
+    return close if freq == "daily" else close.resample("M").last()
+
+@timed("compute_rolling_betas")
+def compute_rolling_betas(prices: pd.DataFrame, factors: pd.DataFrame,
+                          history: pd.DataFrame = None, window: int = WINDOW,
+                          freq: str = FREQ) -> pd.DataFrame:
     """
     prices: daily DataFrame with MultiIndex [Date, Ticker], with 'close'.
-    factors: monthly DataFrame with columns ['Mkt-RF','SMB','HML','RF'].
-    Returns: DataFrame of rolling betas, indexed by [Date, Ticker].
+    factors: DataFrame at `freq` with columns ['Mkt-RF','SMB','HML',('RMW','CMA',)'RF'].
+    history: optional closes at `freq` (Date × Ticker) preceding `prices`,
+             used by incremental runs to fill the rolling window.
+    Returns: DataFrame of rolling factor loadings, alpha and R², indexed by
+             month-end [Date, Ticker] (daily estimates are sampled at month-end).
     """
-    # 1) Build monthly returns
-    monthly_close   = prices["close"].unstack("Ticker").resample("M").last()
-    monthly_ret     = monthly_close.pct_change().dropna()
-
-    # 2) Align factors to returns
-    ff   = factors.reindex(monthly_ret.index).dropna()
-    mkt  = ff["Mkt-RF"]
-    rf   = ff["RF"]
+    # 1) Build period returns
+    closes = _period_closes(prices, freq)
+    if history is not None:
+        closes = pd.concat([history, closes])
+    rets = closes.pct_change(fill_method=None).iloc[1:]
+
+    # 2) Align factors to returns, keeping periods the factors cover
+    ff   = factors.reindex(rets.index)
+    ff   = ff[ff.notna().all(axis=1)]
+    rets = rets.loc[ff.index]
+    cols = [c for c in FACTORS if c in ff.columns]
 
     # 3) Excess returns
-    excess_ret = monthly_ret.sub(rf, axis=0)
-
-    # 4) Rolling covariance / variance → beta
-    # cov(excess_ret, Mkt-RF) / var(Mkt-RF)
-    cov = excess_ret.rolling(WINDOW).cov(mkt)
-    var = mkt.rolling(WINDOW).var()
-    betas = cov.div(var, axis=0)
+    excess_ret = rets.sub(ff["RF"], axis=0)
+
+    # 4) Rolling OLS of excess returns on all factors at once
+    res = rolling_ols(excess_ret.to_numpy(), ff[cols].to_numpy(), window)
+    wide = {"alpha": res["alpha"], "r2": res["r2"]}
+    for k, c in enumerate(cols):
+        wide[BETA_COLUMNS[c]] = res["coef"][:, k]
+    order = [BETA_COLUMNS[c] for c in cols] + ["alpha", "r2"]
+    wide = {k: pd.DataFrame(wide[k], index=excess_ret.index, columns=excess_ret.columns)
+            for k in order}
+    if freq == "daily":
+        wide = {k: v.resample("M").last() for k, v in wide.items()}
 
     # 5) Melt to long form
-    beta_long = betas.stack().rename("beta").reset_index()
-    # beta_long columns: ['Date','Ticker','beta']
-    return beta_long.set_index(["Date","Ticker"])
-
-def main():
+    beta_long = pd.concat(wide, axis=1).stack("Ticker", future_stack=True).dropna(how="all")
+    beta_long.index = beta_long.index.set_names(["Date","Ticker"])
+    # beta_long columns: ['beta','beta_smb','beta_hml',...,'alpha','r2']
+    return beta_long
+
+def main(incremental: bool = False, low_memory: bool = False):
+    if low_memory:
+        price_store.LOW_MEMORY = True
     os.makedirs(OUT_DIR, exist_ok=True)
+    checkpoint = load_checkpoint(STATE_FILE) if incremental else None
+    start, offset, history = None, None, None
+    if checkpoint is not None:
+        asof = pd.Timestamp(checkpoint["asof"])
+        start = asof + pd.Timedelta(days=1)
+        offset = int(checkpoint["csv_offset"])
+        history = pd.DataFrame(
+            checkpoint["closes"],
+            index=pd.DatetimeIndex(checkpoint["close_dates"], name="Date"),
+            columns=pd.Index(checkpoint["tickers"], name="Ticker"),
+        )
+        print(f"Resuming from checkpoint at {start.date()}…")
 
     # Load inputs
     print("Loading raw prices…")
-    prices = pd.read_csv(
-        RAW_PRICES,
-        index_col=["Date","Ticker"],
-        parse_dates=["Date"]
-    )
+    prices = load_panel(fields=["close"], start=start)
+    if prices.empty:
+        print("No new prices since last run")
+        return
 
     print("Loading monthly features…")
     feats = pd.read_csv(
@@ -69,16 +132,20 @@ def main():
         index_col=["Date","Ticker"],
         parse_dates=["Date"]
     )
+    if start is not None:
+        feats = feats[feats.index.get_level_values("Date") >= start]
 
-    # Download FF factors
-    start = feats.index.get_level_values("Date").min()
+    # Download FF factors (the rolling window needs WINDOW periods of history)
+    start_ff = feats.index.get_level_values("Date").min()
+    if history is not None:
+        start_ff = history.index.min()
     end   = feats.index.get_level_values("Date").max()
-    print(f"Downloading Fama–French factors from {start.date()} to {end.date()}…")
-    ff = get_ff_factors(start, end)
+    print(f"Downloading Fama–French factors from {start_ff.date()} to {end.date()}…")
+    ff = get_ff_factors(start_ff, end)
 
     # Compute betas
-    print("Computing 12-month rolling betas…")
-    beta_df = compute_rolling_betas(prices, ff)
+    print(f"Computing {WINDOW}-period rolling {FREQ} FF{FF_MODEL} loadings…")
+    beta_df = compute_rolling_betas(prices, ff, history)
 
     # Merge into features
     print("Merging betas into features…")
@@ -88,10 +155,41 @@ def main():
         how="left"
     ).set_index(["Date","Ticker"])
 
+    # Months are final once their prices are complete and FF has published them
+    asof = split_complete_months(prices.index.get_level_values("Date"))
+    if asof is not None and len(ff):
+        asof = min(asof, ff.index.max().to_period("M").to_timestamp(how="end").normalize())
+    if asof is not None and start is not None and asof < start:
+        asof = None
+    dates = feats.index.get_level_values("Date")
+    complete = feats[dates <= asof] if asof is not None else feats.iloc[:0]
+    partial  = feats[dates > asof] if asof is not None else feats
+
     # Save
     out_path = os.path.join(OUT_DIR, "features_with_betas.csv")
-    feats.to_csv(out_path)
+    if asof is not None:
+        offset = write_tail(complete, out_path, offset)
+        closes = _period_closes(prices, FREQ)
+        if history is not None:
+            closes = pd.concat([history, closes])
+        closes = closes[closes.index <= asof].iloc[-(WINDOW + 1):]
+        save_checkpoint(
+            STATE_FILE,
+            asof=np.datetime64(asof, "ns"),
+            csv_offset=np.int64(offset),
+            tickers=closes.columns.to_numpy(dtype=str),
+            close_dates=closes.index.values,
+            closes=closes.to_numpy(dtype=np.float64),
+        )
+    write_tail(partial, out_path, offset)
     print(f"Saved features+betas to {out_path}")
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB" + (" (low-memory mode)" if price_store.LOW_MEMORY else ""))
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="only compute months after the last checkpoint and append them")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="load prices as float32 (same as ALGO_TRADING_LOW_MEMORY=1)")
+    args = parser.parse_args()
+    main(args.incremental, args.low_memory)
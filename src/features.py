@@ -1,90 +1,165 @@
 # src/features.py
 
 import os
+import argparse
 import pandas as pd
 import numpy as np
-from ta.volatility import BollingerBands, AverageTrueRange
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
+from indicators import compute_indicators, empty_state
+from incremental import (align_columns, load_checkpoint, save_checkpoint,
+                         split_complete_months, write_tail)
+from instrument import timed
+from membership import load_membership
+import price_store
+from price_store import load_panel, peak_rss_mb
 
 BASE_DIR = os.path.dirname(__file__)
-RAW_CSV = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sp500_prices.csv")
 OUT_DIR = os.path.join(BASE_DIR, os.pardir, "data", "processed")
 
-def compute_features(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Input: daily prices with MultiIndex [Date, Ticker].
-    Output: monthly feature DataFrame of top 50 by dollar volume.
-    """
-    # 1) Garman–Klass volatility
-    df["log_hl"] = np.log(df["high"] / df["low"])
-    df["log_co"] = np.log(df["close"] / df["open"])
-    df["gk_vol"] = 0.5 * df["log_hl"]**2 - (2 * np.log(2) - 1) * df["log_co"]**2
-
-    # 2) RSI (14) — use transform to keep alignment
-    df["rsi"] = (
-        df
-        .groupby(level="Ticker")["close"]
-        .transform(lambda x: RSIIndicator(x, window=14).rsi())
-    )
+FEATURES = ["gk_vol", "rsi", "bb_mavg", "bb_hband", "bb_lband", "atr", "macd_diff", "dollar_vol"]
+MONTHLY_AGG = {
+    "gk_vol": "mean", "rsi": "last", "bb_mavg": "last", "bb_hband": "last",
+    "bb_lband": "last", "atr": "mean", "macd_diff": "last", "dollar_vol": "mean",
+}
+TOP_N = 50
+
+
+PRICE_FIELDS = ["open", "high", "low", "close", "volume"]
+OUT_CSV    = os.path.join(OUT_DIR, "features_monthly.csv")
+STATE_FILE = os.path.join(OUT_DIR, "features_state.npz")
 
-    # 3) Bollinger Bands (20, 2)
-    bb = BollingerBands(close=df["close"], window=20, window_dev=2)
-    df["bb_mavg"] = bb.bollinger_mavg()
-    df["bb_hband"] = bb.bollinger_hband()
-    df["bb_lband"] = bb.bollinger_lband()
-
-    # 4) ATR (14)
-    df["atr"] = (
-        df
-        .groupby(level="Ticker")
-        .apply(lambda x: AverageTrueRange(
-            high=x["high"], low=x["low"], close=x["close"], window=14
-        ).average_true_range())
-        .reset_index(level=0, drop=True)
-    )
 
-    # 5) MACD diff (12, 26, 9)
-    macd = MACD(close=df["close"], window_slow=26, window_fast=12, window_sign=9)
-    df["macd_diff"] = macd.macd_diff()
+def _daily_indicators(df: pd.DataFrame, state=None, tickers=None):
+    """Pivot to date×ticker arrays and run the indicator engine once."""
+    # One field at a time, so only a single wide frame is alive at once
+    arrays = []
+    for f in PRICE_FIELDS:
+        wide = df[f].unstack("Ticker").sort_index()
+        if tickers is not None:
+            wide = wide.reindex(columns=tickers)
+        arrays.append(wide.to_numpy())
+    dates, tickers = wide.index, wide.columns
+    del wide
+    present = ~np.isnan(arrays[3])
+    # Daily outputs keep the input precision (float32 in low-memory mode)
+    daily, state = compute_indicators(*arrays, state=state, dtype=arrays[3].dtype)
+    return dates, tickers, daily, present, state
 
-    # 6) Dollar volume
-    df["dollar_vol"] = df["close"] * df["volume"]
 
-    # --- Monthly aggregation & top-50 filter ---
-    df = df.reset_index()
+def _aggregate_monthly(dates, tickers, daily: dict, present, members=None) -> pd.DataFrame:
+    """
+    Month-end aggregation of daily indicators, then the top-50 dollar-volume filter.
+    With a MembershipIndex, only tickers in the index at each month end are ranked.
+    Consumes `daily`: each array is released as soon as it has been aggregated.
+    """
+    months = {}
+    for name in FEATURES:
+        frame = pd.DataFrame(daily.pop(name), index=dates, columns=tickers, copy=False)
+        months[name] = frame.resample("M").agg(MONTHLY_AGG[name])
+        del frame
+    n_days = pd.DataFrame(present, index=dates, columns=tickers).resample("M").sum()
+    live = n_days > 0
+    if members is not None:
+        live &= members.mask(live.index, live.columns)
+
+    monthly = pd.concat(months, axis=1).stack("Ticker", future_stack=True)
+    monthly = monthly[live.stack().reindex(monthly.index, fill_value=False).to_numpy()]
+    monthly.index = monthly.index.set_names(["Date", "Ticker"])
     monthly = (
-        df
-        .groupby([pd.Grouper(key="Date", freq="M"), "Ticker"])
-        .agg(
-            gk_vol=("gk_vol", "mean"),
-            rsi=("rsi", "last"),
-            bb_mavg=("bb_mavg", "last"),
-            bb_hband=("bb_hband", "last"),
-            bb_lband=("bb_lband", "last"),
-            atr=("atr", "mean"),
-            macd_diff=("macd_diff", "last"),
-            dollar_vol=("dollar_vol", "mean"),
-        )
+        monthly[FEATURES]
         .sort_values(["Date", "dollar_vol"], ascending=[True, False])
         .groupby(level=0)
-        .head(50)
+        .head(TOP_N)
     )
     return monthly
 
-def main():
+
+@timed("compute_features")
+def compute_features(df: pd.DataFrame, members=None) -> pd.DataFrame:
+    """
+    Input: daily prices with MultiIndex [Date, Ticker].
+    Output: monthly feature DataFrame of top 50 by dollar volume
+    (among point-in-time index members if `members` is given).
+    """
+    # Garman–Klass, RSI, Bollinger, ATR, MACD, dollar volume in one pass,
+    # with every window confined to a single ticker's history
+    dates, tickers, daily, present, _ = _daily_indicators(df)
+    return _aggregate_monthly(dates, tickers, daily, present, members)
+
+
+def update_features(df: pd.DataFrame, checkpoint=None, members=None):
+    """
+    Incremental step: df holds only the daily rows after the checkpoint.
+    Returns (complete, partial, checkpoint) where `complete` are the rows for
+    fully observed months, `partial` the rows for the month still in progress,
+    and `checkpoint` the rolling state as of the last complete month (None
+    when no month completed since the previous checkpoint).
+    """
+    tickers = sorted(df.index.get_level_values("Ticker").unique())
+    state = None
+    if checkpoint is not None:
+        old = checkpoint["tickers"].tolist()
+        tickers = sorted(set(old) | set(tickers))
+        state = align_columns(checkpoint, old, tickers, empty_state(len(tickers)))
+
+    asof = split_complete_months(df.index.get_level_values("Date"))
+    if asof is None:
+        done, rest = df.iloc[:0], df
+    else:
+        cut = df.index.get_level_values("Date") <= asof
+        done, rest = df[cut], df[~cut]
+
+    complete = partial = None
+    if len(done):
+        dates, cols, daily, present, state = _daily_indicators(done, state, tickers)
+        complete = _aggregate_monthly(dates, cols, daily, present, members)
+    if len(rest):
+        dates, cols, daily, present, _ = _daily_indicators(rest, state, tickers)
+        partial = _aggregate_monthly(dates, cols, daily, present, members)
+
+    if asof is None:
+        return complete, partial, None
+    new_checkpoint = {**state, "tickers": np.array(tickers), "asof": np.datetime64(asof, "ns")}
+    return complete, partial, new_checkpoint
+
+
+def main(incremental: bool = False, low_memory: bool = False):
+    if low_memory:
+        price_store.LOW_MEMORY = True
     os.makedirs(OUT_DIR, exist_ok=True)
+    checkpoint = load_checkpoint(STATE_FILE) if incremental else None
+    start, offset = None, None
+    if checkpoint is not None:
+        start = pd.Timestamp(checkpoint["asof"]) + pd.Timedelta(days=1)
+        offset = int(checkpoint["csv_offset"])
+        print(f"Resuming from checkpoint at {start.date()}…")
+
     print("Loading raw prices…")
-    prices = pd.read_csv(
-        RAW_CSV,
-        index_col=["Date", "Ticker"],
-        parse_dates=["Date"]
-    )
+    prices = load_panel(fields=PRICE_FIELDS, start=start)
+    if prices.empty:
+        print("No new prices since last run")
+        return
+
+    members = load_membership()
+    if members is not None:
+        print(f"Ranking only point-in-time members ({len(members.tickers)} tickers in history)…")
     print("Computing features…")
-    feats = compute_features(prices)
-    out_path = os.path.join(OUT_DIR, "features_monthly.csv")
-    feats.to_csv(out_path)
-    print(f"Saved features to {out_path}")
+    complete, partial, new_checkpoint = update_features(prices, checkpoint, members)
+    del prices
+    if complete is not None:
+        offset = write_tail(complete, OUT_CSV, offset)
+    if new_checkpoint is not None:
+        save_checkpoint(STATE_FILE, csv_offset=np.int64(offset), **new_checkpoint)
+    if partial is not None:
+        write_tail(partial, OUT_CSV, offset)
+    print(f"Saved features to {OUT_CSV}")
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB" + (" (low-memory mode)" if price_store.LOW_MEMORY else ""))
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="only compute months after the last checkpoint and append them")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="load prices as float32 (same as ALGO_TRADING_LOW_MEMORY=1)")
+    args = parser.parse_args()
+    main(args.incremental, args.low_memory)
@@ -0,0 +1,66 @@
+# src/incremental.py
+
+import os
+import numpy as np
+import pandas as pd
+
+
+def load_checkpoint(path) -> dict | None:
+    """Load a stage checkpoint (.npz of arrays), or None if the stage never ran."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as z:
+        # 0-d arrays (dates, offsets) come back as plain scalars
+        return {k: z[k][()] if z[k].ndim == 0 else z[k] for k in z.files}
+
+
+def save_checkpoint(path, **arrays) -> None:
+    """Write the checkpoint atomically so an interrupted run leaves the old one intact."""
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def align_columns(state: dict, old_tickers, new_tickers, empty: dict) -> dict:
+    """
+    Re-key per-ticker state arrays (ticker = last axis) from old_tickers to
+    new_tickers. Tickers without history take their values from `empty`.
+    """
+    pos = {t: i for i, t in enumerate(old_tickers)}
+    idx = np.array([pos.get(t, -1) for t in new_tickers], dtype=np.int64)
+    found = idx >= 0
+    out = {}
+    for key, fresh in empty.items():
+        arr = fresh.copy()
+        arr[..., found] = state[key][..., idx[found]]
+        out[key] = arr
+    return out
+
+
+def write_tail(df: pd.DataFrame, path, offset=None) -> int:
+    """
+    Append rows to a CSV, first truncating it at byte `offset` (the end of the
+    last checkpointed row). offset=None rewrites the file with a header.
+    Returns the file size afterwards, to be stored as the next offset.
+    """
+    if offset is None or not os.path.exists(path):
+        df.to_csv(path)
+    else:
+        with open(path, "r+b") as fh:
+            fh.truncate(offset)
+        df.to_csv(path, mode="a", header=False)
+    return os.path.getsize(path)
+
+
+def split_complete_months(dates: pd.DatetimeIndex):
+    """
+    Month-end label of the last fully observed month: every month before the
+    one containing the latest date. Returns None when there is none.
+    """
+    if len(dates) == 0:
+        return None
+    last = dates.max().to_period("M")
+    done = dates[dates.to_period("M") < last]
+    if len(done) == 0:
+        return None
+    return done.max().to_period("M").to_timestamp(how="end").normalize()
@@ -0,0 +1,255 @@
+# src/indicators.py
+
+import numpy as np
+
+# Windows match the defaults compute_features has always used
+RSI_WINDOW  = 14
+BB_WINDOW   = 20
+BB_DEV      = 2
+ATR_WINDOW  = 14
+MACD_FAST   = 12
+MACD_SLOW   = 26
+MACD_SIGN   = 9
+
+
+# --- Compaction helpers ---
+#
+# Every kernel below works on date×ticker arrays. Tickers list and delist at
+# different dates, so a column may have NaN rows where the ticker has no bar.
+# The `ta` library sees each ticker as its own series with those rows absent,
+# so we "compact" each column (valid rows first, in date order), run the
+# kernels on contiguous histories, and scatter the results back.
+
+def _compact(valid: np.ndarray):
+    """Row order that moves each column's valid rows to the top, stably."""
+    order = np.argsort(~valid, axis=0, kind="stable")
+    nobs = valid.sum(axis=0)
+    live = np.arange(valid.shape[0])[:, None] < nobs[None, :]
+    return order, live
+
+
+def _take(a: np.ndarray, order: np.ndarray, live: np.ndarray) -> np.ndarray:
+    """Compacted float64 copy of `a` (any input dtype; kernels always run in float64)."""
+    out = np.take_along_axis(np.asarray(a), order, axis=0).astype(np.float64, copy=False)
+    out[~live] = np.nan
+    return out
+
+
+def _put(a: np.ndarray, order: np.ndarray, live: np.ndarray, dtype=np.float64) -> np.ndarray:
+    out = np.full(a.shape, np.nan, dtype=dtype)
+    np.put_along_axis(out, order, np.where(live, a, np.nan), axis=0)
+    return out
+
+
+# --- Rolling state ---
+#
+# Every recursion below can be resumed: the state holds, per ticker, what is
+# needed to continue the series (EMA levels, ATR level, last close, the last
+# BB_WINDOW-1 closes). Incremental runs seed compute_indicators with the
+# state from the previous run and only process the new rows.
+
+def empty_state(n_tickers: int) -> dict:
+    """State for tickers with no history yet."""
+    nan = np.full(n_tickers, np.nan)
+    return {
+        "nobs":       np.zeros(n_tickers, dtype=np.int64),
+        "last_close": nan.copy(),
+        "rsi_up":     nan.copy(),
+        "rsi_dn":     nan.copy(),
+        "ema_fast":   nan.copy(),
+        "ema_slow":   nan.copy(),
+        "ema_sign":   nan.copy(),
+        "atr":        nan.copy(),
+        "atr_sum":    np.zeros(n_tickers),
+        "bb_tail":    np.full((BB_WINDOW - 1, n_tickers), np.nan),
+    }
+
+
+# --- Kernels on compacted arrays (each column contiguous from row 0) ---
+
+def _shift(a: np.ndarray, first=np.nan) -> np.ndarray:
+    """Previous row's value; row 0 takes `first` (the carried-over last value)."""
+    out = np.empty(a.shape)
+    out[0] = first
+    out[1:] = a[:-1]
+    return out
+
+
+def _ewm(a: np.ndarray, alpha: float, min_periods: int, mean=None, nobs=None):
+    """
+    pandas ewm(alpha, adjust=False, min_periods).mean(), column-wise,
+    optionally resumed from a previous (mean, nobs). Returns (out, mean).
+    Rows with NaN input stay NaN so nothing leaks past the end of a history.
+    """
+    out = np.full(a.shape, np.nan)
+    mean = np.full(a.shape[1], np.nan) if mean is None else mean.copy()
+    nobs = np.zeros(a.shape[1], dtype=np.int64) if nobs is None else nobs.copy()
+    for t in range(a.shape[0]):
+        x = a[t]
+        valid = ~np.isnan(x)
+        mean = np.where(valid & np.isnan(mean), x,
+                        np.where(valid, (1 - alpha) * mean + alpha * x, mean))
+        nobs += valid
+        out[t] = np.where(valid & (nobs >= min_periods), mean, np.nan)
+    return out, mean
+
+
+def _rolling_mean_std(a: np.ndarray, window: int):
+    """Rolling mean and population std (ddof=0) with min_periods=window."""
+    # Centre each column on its first value to keep the sum-of-squares stable
+    first = np.argmax(~np.isnan(a), axis=0)
+    ref = np.nan_to_num(a[first, np.arange(a.shape[1])])
+    d = a - ref
+    s1 = np.cumsum(np.nan_to_num(d), axis=0)
+    s2 = np.cumsum(np.nan_to_num(d * d), axis=0)
+    cnt = np.cumsum(~np.isnan(a), axis=0)
+    for s in (s1, s2, cnt):
+        s[window:] = s[window:] - s[:-window].copy()
+    mean_d = s1 / window
+    var = np.maximum(s2 / window - mean_d ** 2, 0.0)
+    full = cnt == window
+    mean = np.where(full, mean_d + ref, np.nan)
+    std = np.where(full, np.sqrt(var), np.nan)
+    return mean, std
+
+
+def _bollinger(close, window: int, window_dev: float, state: dict, new: dict):
+    tail = state["bb_tail"]
+    ext = np.vstack([tail, close])
+    mavg, std = _rolling_mean_std(ext, window)
+    mavg, std = mavg[len(tail):], std[len(tail):]
+    # Keep the last window-1 valid closes of each column for the next run
+    nobs = (~np.isnan(close)).sum(axis=0)
+    rows = nobs[None, :] + np.arange(len(tail))[:, None]
+    new["bb_tail"] = np.take_along_axis(ext, rows, axis=0)
+    return mavg, mavg + window_dev * std, mavg - window_dev * std
+
+
+def _rsi(close: np.ndarray, window: int, state: dict, new: dict) -> np.ndarray:
+    diff = close - _shift(close, state["last_close"])
+    up = np.where(diff > 0, diff, 0.0)
+    dn = np.where(diff < 0, -diff, 0.0)
+    # ta treats the undefined first diff as 0; past the end of the history stays NaN
+    tail = np.isnan(close)
+    up[tail] = np.nan
+    dn[tail] = np.nan
+    emaup, new["rsi_up"] = _ewm(up, 1 / window, window, state["rsi_up"], state["nobs"])
+    emadn, new["rsi_dn"] = _ewm(dn, 1 / window, window, state["rsi_dn"], state["nobs"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = emaup / emadn
+        return np.where(emadn == 0, 100.0, 100 - 100 / (1 + rs))
+
+
+def _atr(high, low, close, window: int, state: dict, new: dict) -> np.ndarray:
+    prev = _shift(close, state["last_close"])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    out = np.zeros(tr.shape)
+    atr, total, nobs = state["atr"].copy(), state["atr_sum"].copy(), state["nobs"].copy()
+    for t in range(tr.shape[0]):
+        valid = ~np.isnan(close[t])
+        n = nobs + valid
+        # ta seeds ATR with the plain mean of the first `window` true ranges
+        total = np.where(valid & (n <= window), total + np.nan_to_num(tr[t]), total)
+        atr = np.where(valid & (n == window), total / window,
+                       np.where(valid & (n > window), (atr * (window - 1) + tr[t]) / window, atr))
+        out[t] = np.where(n >= window, atr, 0.0)
+        nobs = n
+    new["atr"], new["atr_sum"] = atr, total
+    return out
+
+
+def _macd_diff(close, fast: int, slow: int, sign: int, state: dict, new: dict) -> np.ndarray:
+    nobs = state["nobs"]
+    ema_fast, new["ema_fast"] = _ewm(close, 2 / (fast + 1), fast, state["ema_fast"], nobs)
+    ema_slow, new["ema_slow"] = _ewm(close, 2 / (slow + 1), slow, state["ema_slow"], nobs)
+    macd = ema_fast - ema_slow
+    # The signal line only counts observations once the slow EMA is defined
+    sign_nobs = np.maximum(nobs - (slow - 1), 0)
+    signal, new["ema_sign"] = _ewm(macd, 2 / (sign + 1), sign, state["ema_sign"], sign_nobs)
+    return macd - signal
+
+
+def _finish_state(close, state: dict, new: dict) -> dict:
+    nobs = (~np.isnan(close)).sum(axis=0)
+    last = close[np.maximum(nobs - 1, 0), np.arange(close.shape[1])]
+    new["last_close"] = np.where(nobs > 0, last, state["last_close"])
+    new["nobs"] = state["nobs"] + nobs
+    return new
+
+
+# --- Public API: wide date×ticker arrays in, wide arrays out ---
+
+def garman_klass(open_, high, low, close) -> np.ndarray:
+    log_hl = np.log(high / low)
+    log_co = np.log(close / open_)
+    return 0.5 * log_hl ** 2 - (2 * np.log(2) - 1) * log_co ** 2
+
+
+def dollar_volume(close, volume) -> np.ndarray:
+    return close * volume
+
+
+def rsi(close, window: int = RSI_WINDOW) -> np.ndarray:
+    """RSI per column, matching ta.momentum.RSIIndicator on each ticker's own history."""
+    close = np.asarray(close, dtype=np.float64)
+    order, live = _compact(~np.isnan(close))
+    out = _rsi(_take(close, order, live), window, empty_state(close.shape[1]), {})
+    return _put(out, order, live)
+
+
+def bollinger(close, window: int = BB_WINDOW, window_dev: float = BB_DEV):
+    """(mavg, hband, lband) per column, matching ta.volatility.BollingerBands."""
+    close = np.asarray(close, dtype=np.float64)
+    order, live = _compact(~np.isnan(close))
+    state = {"bb_tail": np.full((window - 1, close.shape[1]), np.nan)}
+    bands = _bollinger(_take(close, order, live), window, window_dev, state, {})
+    return tuple(_put(x, order, live) for x in bands)
+
+
+def atr(high, low, close, window: int = ATR_WINDOW) -> np.ndarray:
+    """ATR per column, matching ta.volatility.AverageTrueRange (zeros during warm-up)."""
+    high, low, close = (np.asarray(x, dtype=np.float64) for x in (high, low, close))
+    order, live = _compact(~np.isnan(close))
+    h, l, c = (_take(x, order, live) for x in (high, low, close))
+    return _put(_atr(h, l, c, window, empty_state(close.shape[1]), {}), order, live)
+
+
+def macd_diff(close, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+              sign: int = MACD_SIGN) -> np.ndarray:
+    """MACD histogram per column, matching ta.trend.MACD.macd_diff."""
+    close = np.asarray(close, dtype=np.float64)
+    order, live = _compact(~np.isnan(close))
+    out = _macd_diff(_take(close, order, live), fast, slow, sign,
+                     empty_state(close.shape[1]), {})
+    return _put(out, order, live)
+
+
+def compute_indicators(open_, high, low, close, volume, state=None, dtype=np.float64):
+    """
+    All compute_features indicators in one pass over date×ticker arrays.
+    Rows where close is NaN are treated as absent for that ticker.
+    state: rolling state from a previous call (see empty_state), whose columns
+    line up with the inputs; None starts every ticker from scratch.
+    dtype: dtype of the returned arrays (the arithmetic is float64 regardless).
+    Returns (dict of arrays shaped like the inputs, state after the last row).
+    """
+    close = np.asarray(close)
+    if state is None:
+        state = empty_state(close.shape[1])
+    order, live = _compact(~np.isnan(close))
+    o, h, l, c, v = (_take(x, order, live) for x in (open_, high, low, close, volume))
+
+    # Compacted inputs are dropped as soon as no kernel needs them
+    new = {}
+    out = {"gk_vol": garman_klass(o, h, l, c), "dollar_vol": dollar_volume(c, v)}
+    del o, v
+    out["atr"] = _atr(h, l, c, ATR_WINDOW, state, new)
+    del h, l
+    out["rsi"] = _rsi(c, RSI_WINDOW, state, new)
+    out["bb_mavg"], out["bb_hband"], out["bb_lband"] = _bollinger(c, BB_WINDOW, BB_DEV, state, new)
+    out["macd_diff"] = _macd_diff(c, MACD_FAST, MACD_SLOW, MACD_SIGN, state, new)
+    new = _finish_state(c, state, new)
+    del c
+
+    keys = ["gk_vol", "rsi", "bb_mavg", "bb_hband", "bb_lband", "atr", "macd_diff", "dollar_vol"]
+    return {k: _put(out.pop(k), order, live, dtype) for k in keys}, new
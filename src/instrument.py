@@ -0,0 +1,250 @@
+# src/instrument.py
+
+import os
+import sys
+import json
+import time
+import atexit
+import resource
+import functools
+import tracemalloc
+
+ENV_VAR     = "ALGO_TRADING_INSTRUMENT"         # "1": print a summary at exit; a path: also export there
+MEMORY_VAR  = "ALGO_TRADING_INSTRUMENT_MEMORY"  # set: per-span peak memory via tracemalloc
+PROFILE_VAR = "ALGO_TRADING_PROFILE"            # "cprofile" or "pyinstrument": profile the whole run
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "profiles")
+PROFILERS   = ("cprofile", "pyinstrument")
+
+# Spans are recorded only while enabled. Disabled, span() returns a shared
+# no-op and @timed functions call straight through, so instrumented hot
+# paths cost one global lookup.
+ENABLED   = False
+_memory   = False
+_profiler = None
+_events   = []
+_stack    = []
+_origin   = time.perf_counter_ns()
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Span:
+    """
+    One timed region. Records wall and CPU time, `rows` (settable inside the
+    block) and either the peak traced memory above the span's starting
+    usage (memory mode, nested spans included) or the process's max RSS.
+    """
+    __slots__ = ("name", "rows", "args", "_wall", "_cpu", "_base", "_peak")
+
+    def __init__(self, name: str, rows=None, args=None):
+        self.name, self.rows, self.args = name, rows, args
+
+    def __enter__(self):
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if _stack:
+                _stack[-1]._peak = max(_stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+            self._base = self._peak = current
+        _stack.append(self)
+        self._cpu = time.process_time_ns()
+        self._wall = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        wall, cpu = time.perf_counter_ns(), time.process_time_ns()
+        _stack.pop()
+        event = {"name": self.name, "start_us": (self._wall - _origin) / 1e3,
+                 "wall_s": (wall - self._wall) / 1e9, "cpu_s": (cpu - self._cpu) / 1e9,
+                 "rows": self.rows, "depth": len(_stack)}
+        if _memory:
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            event["peak_mb"] = (peak - self._base) / 2**20
+            if _stack:
+                _stack[-1]._peak = max(_stack[-1]._peak, peak)
+        else:
+            event["max_rss_mb"] = _max_rss_mb()
+        if self.args:
+            event["args"] = self.args
+        _events.append(event)
+        return False
+
+
+class _NullSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def span(name: str, rows=None, **args):
+    """Context manager timing a stage or one loop iteration; extra kwargs are kept as args."""
+    if not ENABLED:
+        return _NULL
+    return Span(name, rows, args)
+
+
+def timed(name: str = None, rows=None):
+    """
+    Decorator recording every call as a span named `name` (default
+    module.function). Rows are rows(result) if given, else the length of the
+    first argument when it has one.
+    """
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            n = len(args[0]) if args and hasattr(args[0], "__len__") else None
+            with Span(label, n) as sp:
+                out = fn(*args, **kwargs)
+                if rows is not None:
+                    sp.rows = rows(out)
+            return out
+        return inner
+    return wrap
+
+
+# --- Control ---
+
+def enable(memory: bool = False, profiler: str = None) -> None:
+    """Start recording spans; optionally trace memory and run a profiler until disable()."""
+    global ENABLED, _memory, _profiler
+    ENABLED, _memory = True, memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if profiler == "cprofile":
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    elif profiler == "pyinstrument":
+        from pyinstrument import Profiler  # optional: pip install pyinstrument
+        _profiler = Profiler()
+        _profiler.start()
+    elif profiler is not None:
+        raise ValueError(f"Unknown profiler {profiler!r}; choose from {PROFILERS}")
+
+
+def disable() -> None:
+    global ENABLED, _memory
+    stop_profiler()
+    if _memory:
+        tracemalloc.stop()
+    ENABLED, _memory = False, False
+
+
+def stop_profiler():
+    """Stop the profiler (if any) and return it."""
+    if _profiler is not None:
+        if hasattr(_profiler, "disable"):
+            _profiler.disable()
+        elif _profiler.is_running:
+            _profiler.stop()
+    return _profiler
+
+
+def save_profile(path: str) -> str:
+    """Write the captured profile: pstats for cProfile, HTML for pyinstrument."""
+    prof = stop_profiler()
+    if prof is None:
+        raise RuntimeError("No profiler was running")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if hasattr(prof, "dump_stats"):
+        prof.dump_stats(path)
+    else:
+        with open(path, "w") as fh:
+            fh.write(prof.output_html())
+    return path
+
+
+def events() -> list[dict]:
+    return list(_events)
+
+
+def reset() -> None:
+    _events.clear()
+
+
+# --- Reporting ---
+
+def summarize(evts=None) -> list[dict]:
+    """Totals per span name: calls, wall/CPU seconds, rows, slowest call and peak memory."""
+    out = {}
+    for e in _events if evts is None else evts:
+        s = out.setdefault(e["name"], {"name": e["name"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                       "rows": 0, "max_wall_s": 0.0, "peak_mb": 0.0})
+        s["calls"] += 1
+        s["wall_s"] += e["wall_s"]
+        s["cpu_s"] += e["cpu_s"]
+        s["rows"] += e["rows"] or 0
+        s["max_wall_s"] = max(s["max_wall_s"], e["wall_s"])
+        s["peak_mb"] = max(s["peak_mb"], e.get("peak_mb", e.get("max_rss_mb", 0.0)))
+    return sorted(out.values(), key=lambda s: -s["wall_s"])
+
+
+def format_summary(evts=None) -> str:
+    lines = [f"{'span':<36}{'calls':>7}{'wall s':>9}{'cpu s':>9}{'max s':>9}{'rows':>11}{'peak MB':>9}"]
+    for s in summarize(evts):
+        lines.append(f"{s['name'][:35]:<36}{s['calls']:>7}{s['wall_s']:>9.3f}{s['cpu_s']:>9.3f}"
+                     f"{s['max_wall_s']:>9.3f}{s['rows']:>11}{s['peak_mb']:>9.1f}")
+    return "\n".join(lines)
+
+
+def chrome_trace(evts=None, pid: int = 0, process: str = None) -> list[dict]:
+    """Spans as Chrome trace 'complete' events (chrome://tracing, Perfetto)."""
+    trace = []
+    if process is not None:
+        trace.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process}})
+    for e in _events if evts is None else evts:
+        args = {k: e[k] for k in ("rows", "cpu_s", "peak_mb", "max_rss_mb") if e.get(k) is not None}
+        trace.append({"name": e["name"], "ph": "X", "ts": e["start_us"], "dur": e["wall_s"] * 1e6,
+                      "pid": pid, "tid": 0, "args": {**args, **e.get("args", {})}})
+    return trace
+
+
+def export(path: str, evts=None, fmt: str = None) -> str:
+    """
+    Write spans to `path`: a Chrome trace for fmt="chrome" or a *.trace.json
+    path, otherwise JSON with the raw events and the per-name summary.
+    """
+    evts = _events if evts is None else evts
+    fmt = fmt or ("chrome" if path.endswith(".trace.json") else "json")
+    doc = ({"traceEvents": chrome_trace(evts)} if fmt == "chrome"
+           else {"events": evts, "summary": summarize(evts)})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(doc, fh, default=str)
+    return path
+
+
+def _report_at_exit(target: str) -> None:
+    if _events:
+        print(format_summary(), file=sys.stderr)
+    if target not in ("", "0", "1"):
+        print(f"Saved instrumentation to {export(target)}", file=sys.stderr)
+    if _profiler is not None:
+        script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        ext = ".prof" if hasattr(_profiler, "dump_stats") else ".html"
+        print(f"Saved profile to {save_profile(os.path.join(PROFILE_DIR, script + ext))}", file=sys.stderr)
+
+
+def _enable_from_env() -> None:
+    target = os.environ.get(ENV_VAR, "")
+    profiler = os.environ.get(PROFILE_VAR) or None
+    if target in ("", "0") and profiler is None:
+        return
+    enable(memory=os.environ.get(MEMORY_VAR, "") not in ("", "0"), profiler=profiler)
+    atexit.register(_report_at_exit, target)
+
+
+_enable_from_env()
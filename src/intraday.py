@@ -1,9 +1,14 @@
 # src/intraday.py
 
 import os
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from arch import arch_model
 import numpy as np
+from context import DataContext, dataset
+from instrument import timed
+from strategies import register, run_strategies
 
 # Paths
 BASE_DIR      = os.path.dirname(__file__)
@@ -11,20 +16,40 @@ PROJECT_ROOT  = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
 RAW_DAILY     = os.path.join(PROJECT_ROOT, "data", "raw", "simulated_daily_data.csv")
 RAW_INTRADAY  = os.path.join(PROJECT_ROOT, "data", "raw", "simulated_5min_data.csv")
 OUT_DIR       = os.path.join(PROJECT_ROOT, "data", "processed")
+OUT_CSV       = os.path.join(OUT_DIR, "backtest_intraday.csv")
 
 # GARCH settings
 ROLL_WINDOW   = 252  # days for rolling estimation
 VOL_PRED_DAYS = 1    # forecast horizon (days)
+REFIT_EVERY   = 1    # refit GARCH every N days, filtering the variance forward in between
+CHUNK_DAYS    = 250  # forecast days per worker task; warm starts only chain within a task
 
+# Intraday bar streaming
+CHUNK_ROWS    = 1_000_000  # bars held in memory at a time
+BAR_SIZE      = None       # resample bars to this size (e.g. "15min"); None keeps the file's bars
+SYMBOL        = "SIM"      # symbol for files without a 'symbol' column
 
-def load_data():
-    """Load daily and intraday CSVs into DataFrames."""
-    # Daily data
-    daily = pd.read_csv(
+# Signal settings
+VOL_QUANTILE  = 0.5   # trade when pred_vol is above this quantile of past forecasts
+VOL_WINDOW    = None  # days of past forecasts for the threshold; None = expanding
+VOL_MIN_DAYS  = 20    # past forecasts needed before the threshold is defined
+LOOKBACKS     = [1, 2, 5, 10, 20]             # grid: momentum lookbacks (days)
+QUANTILES     = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8]  # grid: vol threshold quantiles
+
+
+def load_daily():
+    """Load the daily CSV into a DataFrame."""
+    return pd.read_csv(
         RAW_DAILY,
         parse_dates=["Date"],
         index_col="Date"
     )
+
+
+def load_data():
+    """Load daily and intraday CSVs into DataFrames (the whole bar file in memory)."""
+    # Daily data
+    daily = load_daily()
     # Intraday data: column is 'datetime'
     intraday = pd.read_csv(
         RAW_INTRADAY,
@@ -34,71 +59,343 @@ def load_data():
     return daily, intraday
 
 
-def predict_daily_volatility(daily: pd.DataFrame) -> pd.Series:
+def fit_garch(window: np.ndarray, starting_values=None):
+    """
+    Fit GARCH(1,1) to one window of percent returns.
+    Returns the parameters (mu, omega, alpha, beta) and the one-step variance forecast.
+    """
+    # arch (and the scipy.optimize it pulls in) loads on the first fit, not on import
+    from arch import arch_model
+    from arch.utility.exceptions import StartingValueWarning
+    am = arch_model(window, vol="Garch", p=1, o=0, q=1, dist="normal")
+    with warnings.catch_warnings():
+        # arch falls back to its own grid when the previous fit sits on a boundary
+        warnings.simplefilter("ignore", StartingValueWarning)
+        res = am.fit(disp="off", starting_values=starting_values)
+    if starting_values is not None and res.convergence_flag != 0:
+        res = am.fit(disp="off")
+    return res.params.values, res.forecast(horizon=1).variance.values[-1, 0]
+
+
+def horizon_variance(params, var1: float) -> float:
+    """Multi-step GARCH(1,1) forecast: E[h_t+k] = omega + (alpha + beta) * E[h_t+k-1]."""
+    _, omega, alpha, beta = params
+    var = var1
+    for _ in range(VOL_PRED_DAYS - 1):
+        var = omega + (alpha + beta) * var
+    return var
+
+
+def _forecast_chunk(ret: np.ndarray, ends: range, refit_every: int,
+                    warm_start: bool = False) -> np.ndarray:
+    """
+    One-step GARCH(1,1) volatility forecasts for the windows ending at each
+    position in `ends` (contiguous, positions into `ret`).
+    Refits fall on every refit_every-th window counted from the first full
+    window, whatever the chunk; a chunk starting between refits first fits
+    at the refit day before it. Between refits the variance recursion is
+    filtered forward with the last fitted parameters. With warm_start, each
+    fit after the chunk's first starts from the previous fit's parameters.
+    """
+    vols = np.empty(len(ends))
+    params = None
+    for end in range(ends.start - (ends.start - ROLL_WINDOW) % refit_every, ends.stop):
+        if (end - ROLL_WINDOW) % refit_every == 0:
+            params, var1 = fit_garch(ret[end - ROLL_WINDOW + 1:end + 1],
+                                     params if warm_start else None)
+        else:
+            var1 = omega + alpha * (ret[end] - mu) ** 2 + beta * var1
+        mu, omega, alpha, beta = params
+        if end >= ends.start:
+            vols[end - ends.start] = np.sqrt(horizon_variance(params, var1))
+    return vols
+
+
+@timed("predict_daily_volatility")
+def predict_daily_volatility(daily: pd.DataFrame, refit_every: int = REFIT_EVERY,
+                             n_jobs: int = None, warm_start: bool = False) -> pd.Series:
     """
     Fit a rolling GARCH(1,1) to percent returns and forecast next-day volatility.
+    Windows are split into chunks of CHUNK_DAYS fitted in parallel across
+    n_jobs processes (default: all cores), so results do not depend on
+    n_jobs; refit_every > 1 refits only every N days.
+    warm_start=True starts each fit from the previous one's parameters
+    (faster, but forecasts can differ from the default cold fits).
     Returns a Series of predicted volatilities indexed by forecast date.
     """
     ret = daily["Close"].pct_change().dropna() * 100
-    vol_preds = []
-    dates = []
+    ends = range(ROLL_WINDOW, len(ret))
+    n_jobs = n_jobs or os.cpu_count() or 1
 
-    for end_date in ret.index[ROLL_WINDOW:]:
-        window = ret.loc[:end_date].iloc[-ROLL_WINDOW:]
-        am = arch_model(window, vol="Garch", p=1, o=0, q=1, dist="normal")
-        res = am.fit(disp="off")
-        f = res.forecast(horizon=VOL_PRED_DAYS)
-        vol = np.sqrt(f.variance.values[-1, -1])
-        vol_preds.append(vol)
-        dates.append(end_date + pd.Timedelta(days=1))
+    values = ret.to_numpy(dtype=np.float64)
+    chunks = [range(lo, min(lo + CHUNK_DAYS, ends.stop))
+              for lo in range(ends.start, ends.stop, CHUNK_DAYS)]
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        parts = [_forecast_chunk(values, c, refit_every, warm_start) for c in chunks]
+    else:
+        n = len(chunks)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_forecast_chunk, [values] * n, chunks,
+                                  [refit_every] * n, [warm_start] * n))
 
+    vol_preds = np.concatenate(parts) if parts else np.empty(0)
+    dates = ret.index[ROLL_WINDOW:] + pd.Timedelta(days=1)
     return pd.Series(vol_preds, index=dates, name="pred_vol")
 
 
+def _forecast_series(ret: np.ndarray, refit_every: int, warm_start: bool) -> np.ndarray:
+    """Forecasts for every full window of one symbol's returns (NaN before the first)."""
+    out = np.full(len(ret), np.nan)
+    if len(ret) > ROLL_WINDOW:
+        out[ROLL_WINDOW:] = _forecast_chunk(ret, range(ROLL_WINDOW, len(ret)), refit_every, warm_start)
+    return out
+
+
+def predict_volatility_panel(closes: pd.DataFrame, refit_every: int = REFIT_EVERY,
+                             n_jobs: int = None, warm_start: bool = False) -> pd.DataFrame:
+    """
+    Rolling GARCH(1,1) next-day volatility for every symbol of a Date × symbol
+    close table, one symbol per worker process.
+    Each forecast is placed on the trading day it is for (the row after the
+    last return it uses).
+    """
+    ret = closes.pct_change(fill_method=None) * 100
+    series = [ret[c].dropna() for c in ret.columns]
+    n = len(series)
+    args = ([r.to_numpy(dtype=np.float64) for r in series], [refit_every] * n, [warm_start] * n)
+    if n_jobs == 1 or n <= 1:
+        parts = list(map(_forecast_series, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_forecast_series, *args))
+    vol = pd.DataFrame({c: pd.Series(v, index=r.index) for c, r, v in zip(ret.columns, series, parts)})
+    return vol.reindex(closes.index).shift(1)
+
+
+def vol_threshold(pred_vol, q=VOL_QUANTILE, window=VOL_WINDOW, min_periods=VOL_MIN_DAYS):
+    """
+    Quantile q of the forecasts made before each day (expanding, or over the
+    last `window` days), so the threshold only uses information already known.
+    """
+    past = pred_vol.shift(1)
+    roll = past.expanding(min_periods) if window is None else past.rolling(window, min_periods=min_periods)
+    return roll.quantile(q)
+
+
+def _read_chunks(path, chunksize, usecols=None):
+    """Chunks of bars with a 'symbol' column, in file order (time-sorted per symbol)."""
+    header = pd.read_csv(path, nrows=0).columns
+    if usecols is not None:
+        usecols = [c for c in ["datetime", "symbol", *usecols] if c in header]
+    for chunk in pd.read_csv(path, parse_dates=["datetime"], usecols=usecols, chunksize=chunksize):
+        if "symbol" not in chunk:
+            chunk.insert(0, "symbol", SYMBOL)
+        yield chunk
+
+
+def _resample(bars: pd.DataFrame, bar_size: str) -> pd.DataFrame:
+    """Aggregate bars to bar_size bars per symbol, labelled by bar start."""
+    how = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    how = {c: f for c, f in how.items() if c in bars}
+    start = bars["datetime"].dt.floor(bar_size)
+    out = bars.groupby([bars["symbol"], start], sort=False).agg(how)
+    return out.reset_index()
+
+
+def iter_bars(path=RAW_INTRADAY, chunksize=CHUNK_ROWS, bar_size=BAR_SIZE):
+    """
+    Stream intraday bars from the CSV in chunks of about `chunksize` rows.
+    With bar_size, bars are resampled on the fly; the last, possibly
+    incomplete bar of each symbol is held back until the next chunk.
+    """
+    carry = None
+    for chunk in _read_chunks(path, chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if bar_size is None:
+            yield chunk
+            continue
+        start = chunk["datetime"].dt.floor(bar_size)
+        last = start.groupby(chunk["symbol"]).transform("max")
+        held = (start == last).to_numpy()
+        carry = chunk[held]
+        if (~held).any():
+            yield _resample(chunk[~held], bar_size)
+    if carry is not None and len(carry):
+        yield _resample(carry, bar_size)
+
+
+def daily_open_close(path=RAW_INTRADAY, chunksize=CHUNK_ROWS) -> pd.DataFrame:
+    """
+    First open and last close per symbol and day, in one streaming pass.
+    Only one chunk of bars plus the per-day results are held in memory.
+    Returns a DataFrame indexed by [Date, symbol] with columns open, close.
+    """
+    parts = []
+    for chunk in _read_chunks(path, chunksize, usecols=["open", "close"]):
+        day = chunk["datetime"].dt.normalize().rename("Date")
+        parts.append(chunk.groupby([day, chunk["symbol"]], sort=False)
+                          .agg(open=("open", "first"), close=("close", "last")))
+    # A day split across chunks appears in consecutive parts, in file order
+    days = pd.concat(parts)
+    return days.groupby(level=[0, 1]).agg(open=("open", "first"), close=("close", "last"))
+
+
 def compute_intraday_signal(intraday: pd.DataFrame) -> pd.Series:
     """
     Compute intraday momentum: last bar close / first bar open - 1.
     Returns a Series indexed by each date.
     """
-    df = intraday.copy()
-    df["Date"] = df.index.date
     # columns are lowercase 'open' and 'close'
-    first = df.groupby("Date")["open"].first()
-    last = df.groupby("Date")["close"].last()
-    signal = (last / first - 1).rename("intraday_mom")
+    days = intraday.groupby(intraday.index.normalize().rename("Date")).agg(
+        open=("open", "first"), close=("close", "last"))
+    signal = (days["close"] / days["open"] - 1).rename("intraday_mom")
     return signal
 
 
-def backtest(daily: pd.DataFrame, intraday: pd.DataFrame):
+def stream_intraday_signal(path=RAW_INTRADAY, chunksize=CHUNK_ROWS) -> pd.DataFrame:
+    """Intraday momentum per day (rows) and symbol (columns), streamed from the bar file."""
+    days = daily_open_close(path, chunksize)
+    return (days["close"] / days["open"] - 1).unstack("symbol")
+
+
+def strategy_returns(daily: pd.DataFrame, intr_sig: pd.Series) -> pd.DataFrame:
     """
-    Merge daily vol forecasts and intraday signal, generate positions,
-    and compute strategy returns.
+    Merge daily vol forecasts and an intraday momentum series, generate
+    positions, and compute strategy returns.
+    Each day's position uses only what is known at its open: the previous
+    session's momentum and a forecast from returns up to the previous close,
+    compared with the quantile of earlier forecasts.
     """
     # Forecast volatility
     vol_pred = predict_daily_volatility(daily)
-    # Intraday momentum
-    intr_sig = compute_intraday_signal(intraday)
-    # Align on date index
-    df = pd.concat([vol_pred, intr_sig], axis=1).dropna()
+    # Align on date index; prev_mom is the momentum of the session before each day
+    df = pd.concat([vol_pred, intr_sig.rename("intraday_mom"),
+                    intr_sig.shift(1).rename("prev_mom")], axis=1).dropna()
 
-    # Position: long if intraday_mom > 0 and pred_vol > median
-    median_vol = df["pred_vol"].median()
-    df["pos"] = np.where((df["intraday_mom"] > 0) & (df["pred_vol"] > median_vol), 1, 0)
+    # Position: long if yesterday's momentum > 0 and pred_vol above the median of past forecasts
+    threshold = vol_threshold(df["pred_vol"])
+    df["pos"] = np.where((df["prev_mom"] > 0) & (df["pred_vol"] > threshold), 1, 0)
 
     # Strategy return is simply pos * intraday return
     df["strategy_ret"] = df["pos"] * df["intraday_mom"]
+    return df
+
+
+@dataset("intraday_daily")
+def _intraday_daily(ctx):
+    return load_daily()
+
+
+@dataset("intraday_signal")
+def _intraday_signal(ctx):
+    return stream_intraday_signal()
+
+
+@register("intraday", requires=("intraday_daily", "intraday_signal"), output=OUT_CSV)
+def intraday_strategy(ctx, symbol: str = None):
+    """GARCH + momentum rule for one symbol of the bar file (default: the first)."""
+    signals = ctx.get("intraday_signal")
+    return strategy_returns(ctx.get("intraday_daily"), signals[symbol or signals.columns[0]])
+
+
+def backtest(daily: pd.DataFrame, intraday: pd.DataFrame = None, symbol: str = None):
+    """
+    Backtest on `daily` and save it to CSV.
+    Without `intraday` bars, the signal is streamed from RAW_INTRADAY.
+    """
+    if intraday is not None:
+        df = strategy_returns(daily, compute_intraday_signal(intraday))
+    else:
+        df = intraday_strategy(DataContext(intraday_daily=daily), symbol)
 
     # Save results
     os.makedirs(OUT_DIR, exist_ok=True)
-    out_csv = os.path.join(OUT_DIR, "backtest_intraday.csv")
-    df.to_csv(out_csv)
-    print(f"Saved intraday backtest to {out_csv}")
+    df.to_csv(OUT_CSV)
+    print(f"Saved intraday backtest to {OUT_CSV}")
+    return df
+
+
+def signal_grid(mom: pd.DataFrame, pred_vol: pd.DataFrame, lookbacks=LOOKBACKS,
+                quantiles=QUANTILES, vol_window=VOL_WINDOW) -> pd.DataFrame:
+    """
+    Daily returns of the GARCH + momentum rule for every (lookback, quantile)
+    pair, across all symbols at once.
+
+    mom:      Date × symbol intraday returns (close / open - 1).
+    pred_vol: Date × symbol volatility forecast for each day.
+    A symbol is held for the day when its summed intraday momentum over the
+    previous `lookback` days is positive and its forecast is above the
+    `quantile` of its own past forecasts. The portfolio splits capital
+    equally across symbols.
+
+    Returns a Date × (lookback, quantile) DataFrame of portfolio returns.
+    """
+    mom, pred_vol = mom.align(pred_vol, join="inner")
+    r = mom.to_numpy(dtype=np.float64)
+    r0 = np.nan_to_num(r)
+    T, N = r.shape
+
+    # Momentum over the previous L days for every lookback: (L, T, N)
+    c = np.vstack([np.zeros((1, N)), np.cumsum(r0, axis=0)])
+    lb = np.asarray(lookbacks)
+    t = np.arange(T)
+    hi = t[None, :]
+    lo = np.clip(hi - lb[:, None], 0, None)
+    momentum = c[hi] - c[lo]
+    momentum[hi.repeat(len(lb), 0) < lb[:, None]] = np.nan
+
+    # Volatility filter for every quantile: (Q, T, N)
+    v = pred_vol.to_numpy(dtype=np.float64)
+    thresholds = np.stack([vol_threshold(pred_vol, q, vol_window).to_numpy() for q in quantiles])
+    high_vol = v[None] > thresholds
+
+    pos = (momentum[:, None] > 0) & high_vol[None]                    # (L, Q, T, N)
+    port = np.einsum("lqtn,tn->lqt", pos.astype(np.float64), r0) / N
+    cols = pd.MultiIndex.from_product([lookbacks, quantiles], names=["lookback", "quantile"])
+    return pd.DataFrame(port.reshape(-1, T).T, index=mom.index, columns=cols)
+
+
+def summarize_grid(returns: pd.DataFrame) -> pd.DataFrame:
+    """Annualised return, volatility and Sharpe per grid configuration."""
+    ann_ret = returns.mean() * 252
+    ann_vol = returns.std() * np.sqrt(252)
+    return pd.DataFrame({
+        "ann_return": ann_ret,
+        "ann_vol":    ann_vol,
+        "sharpe":     ann_ret / ann_vol,
+        "active_days": (returns != 0).sum(),
+    })
+
+
+def run_grid(path=RAW_INTRADAY, chunksize=CHUNK_ROWS, n_jobs=None):
+    """Stream the bar file once, forecast every symbol's volatility and evaluate the grid."""
+    days = daily_open_close(path, chunksize)
+    closes = days["close"].unstack("symbol")
+    mom = (days["close"] / days["open"] - 1).unstack("symbol")
+    print(f"Forecasting volatility for {closes.shape[1]} symbols over {len(closes)} days…")
+    pred_vol = predict_volatility_panel(closes, n_jobs=n_jobs)
+    print(f"Evaluating {len(LOOKBACKS)}×{len(QUANTILES)} lookback × quantile grid…")
+    returns = signal_grid(mom, pred_vol)
+    summary = summarize_grid(returns)
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    out_csv = os.path.join(OUT_DIR, "backtest_intraday_grid.csv")
+    summary.to_csv(out_csv)
+    print(summary.sort_values("sharpe", ascending=False).head(10).to_string(float_format=lambda x: f"{x:.3f}"))
+    print(f"Saved intraday grid results to {out_csv}")
 
 
-def main():
-    daily, intraday = load_data()
-    backtest(daily, intraday)
+def main(grid: bool = False):
+    if grid:
+        run_grid()
+        return
+    run_strategies(["intraday"])
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grid", action="store_true",
+                        help="evaluate the lookback × vol-quantile grid across all symbols in the bar file")
+    main(parser.parse_args().grid)
@@ -0,0 +1,266 @@
+# src/live.py
+
+import os
+import time
+import bisect
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+import pandas as pd
+from intraday import (CHUNK_ROWS, RAW_INTRADAY, ROLL_WINDOW, VOL_MIN_DAYS, VOL_QUANTILE,
+                      VOL_WINDOW, fit_garch, horizon_variance, iter_bars)
+
+BASE_DIR          = os.path.dirname(__file__)
+OUT_DIR           = os.path.join(BASE_DIR, os.pardir, "data", "processed")
+OUT_CSV           = os.path.join(OUT_DIR, "live_intraday.csv")
+REFIT_DAYS        = None    # refit GARCH every N sessions at the close; None keeps the warm-up fit
+LATENCY_BUDGET_US = 500     # per-bar decision budget reported after a replay
+QUEUE_SIZE        = 10_000  # bars buffered between the feed and the strategy
+DAY_NS            = 86_400 * 10**9
+
+
+# --- Strategy state ---
+#
+# The batch backtest decides each day from the previous session. Live, the
+# position after every bar is: long while the running momentum (last close /
+# session open - 1) is positive and today's volatility forecast is above the
+# quantile of the forecasts of earlier days. The book is flat at every
+# session close. Everything a bar touches is a scalar; the daily return, the
+# variance recursion, any GARCH refit and the next session's threshold are
+# done once per session in close_session, outside the per-bar decision.
+
+def _quantile(values: list, q: float) -> float:
+    """Linearly interpolated quantile of a sorted list (pandas' default)."""
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class _SymbolState:
+    __slots__ = ("day", "day_open", "close", "prev_close", "returns", "seen", "params", "var",
+                 "since_fit", "vol", "threshold", "past", "recent", "pos", "closed")
+
+    def __init__(self, warmup: int):
+        self.day = None
+        self.day_open = self.close = self.prev_close = None
+        self.returns = deque(maxlen=warmup)  # last `warmup` daily percent returns
+        self.seen = 0                        # daily returns so far
+        self.params = self.var = None
+        self.since_fit = 0
+        self.vol = self.threshold = np.nan
+        self.past = []                       # sorted forecasts of earlier days
+        self.recent = deque()                # the same forecasts in arrival order
+        self.pos = 0
+        self.closed = True
+
+
+class LiveStrategy:
+    """
+    GARCH + momentum rule fed one bar at a time, with independent state per
+    symbol. A symbol trades once it has `warmup` daily returns for the first
+    GARCH fit (after the same first window as the batch forecasts) and
+    `min_days` forecasts for the volatility threshold.
+    """
+
+    def __init__(self, q=VOL_QUANTILE, vol_window=VOL_WINDOW, min_days=VOL_MIN_DAYS,
+                 warmup=ROLL_WINDOW, refit_days=REFIT_DAYS):
+        self.q, self.vol_window, self.min_days = q, vol_window, min_days
+        self.warmup, self.refit_days = warmup, refit_days
+        self.state = {}
+
+    def on_bar(self, symbol, ts: int, open_: float, close: float) -> int:
+        """Position (0 or 1) to hold after the bar at `ts` (ns since epoch)."""
+        s = self.state.get(symbol)
+        if s is None:
+            s = self.state[symbol] = _SymbolState(self.warmup)
+        day = ts // DAY_NS
+        if day != s.day:
+            if not s.closed:
+                self.close_session(symbol)  # the feed did not close it; do it here
+            s.day, s.day_open, s.closed = day, open_, False
+        s.close = close
+        # NaN forecast or threshold compares False, so the book stays flat until both exist
+        s.pos = int(close > s.day_open and s.vol > s.threshold)
+        return s.pos
+
+    def session_ended(self, symbol, ts: int) -> bool:
+        """True if a bar at `ts` starts a new session for `symbol` before the last one was closed."""
+        s = self.state.get(symbol)
+        return s is not None and not s.closed and ts // DAY_NS != s.day
+
+    def close_session(self, symbol) -> None:
+        """
+        Flatten `symbol` at the session close and prepare the next session:
+        the day's return moves the variance recursion on, GARCH is (re)fitted
+        when due, and the next forecast and threshold are set. Called by the
+        feed between sessions, so no bar's decision pays for a fit.
+        """
+        s = self.state[symbol]
+        s.pos, s.closed = 0, True
+        if s.prev_close is not None:
+            r = (s.close / s.prev_close - 1) * 100
+            s.returns.append(r)
+            s.seen += 1
+            if s.params is not None:
+                mu, omega, alpha, beta = s.params
+                s.var = omega + alpha * (r - mu) ** 2 + beta * s.var
+                s.since_fit += 1
+            refit = self.refit_days is not None and s.since_fit >= self.refit_days
+            # Like the batch forecasts, the first window starts at the second return
+            if s.seen > self.warmup and (s.params is None or refit):
+                s.params, s.var = fit_garch(np.asarray(s.returns))
+                s.since_fit = 0
+        s.prev_close = s.close
+
+        # The threshold only sees forecasts made for earlier sessions
+        if s.vol == s.vol:
+            bisect.insort(s.past, s.vol)
+            s.recent.append(s.vol)
+            if self.vol_window is not None and len(s.recent) > self.vol_window:
+                s.past.pop(bisect.bisect_left(s.past, s.recent.popleft()))
+        if s.params is not None:
+            s.vol = np.sqrt(horizon_variance(s.params, s.var))
+        s.threshold = _quantile(s.past, self.q) if len(s.past) >= self.min_days else np.nan
+
+
+# --- Feeds ---
+
+def replay_file(path=RAW_INTRADAY, chunksize=CHUNK_ROWS, bar_size=None, symbols=None):
+    """
+    Bars of a local file as (symbol, ts ns, open, close), one at a time in
+    file order; stands in for a market data feed. Only one chunk is parsed
+    at a time.
+    """
+    for chunk in iter_bars(path, chunksize, bar_size):
+        if symbols:
+            chunk = chunk[chunk["symbol"].isin(symbols)]
+        ts = chunk["datetime"].to_numpy(dtype="datetime64[ns]").view("i8")
+        yield from zip(chunk["symbol"].tolist(), ts.tolist(),
+                       chunk["open"].tolist(), chunk["close"].tolist())
+
+
+def _log_frame(log: dict) -> pd.DataFrame:
+    df = pd.DataFrame(log)
+    df["datetime"] = pd.to_datetime(df["datetime"], unit="ns")
+    df["latency_us"] = df.pop("latency_ns") / 1e3
+    if "queue_ns" in df:
+        df["queue_us"] = df.pop("queue_ns") / 1e3
+    # Bar P&L of the position held into each bar; the book is flat over the
+    # close, so the first bar of a session earns nothing from the last one
+    by_symbol = df.groupby("symbol")
+    same_session = df["datetime"].dt.normalize().eq(by_symbol["datetime"].shift(1).dt.normalize())
+    held = by_symbol["pos"].shift(1).where(same_session, 0)
+    df["bar_ret"] = held * df.groupby("symbol")["close"].pct_change()
+    return df
+
+
+def _new_log() -> dict:
+    return {"datetime": [], "symbol": [], "close": [], "pos": [], "latency_ns": []}
+
+
+def replay(bars, strategy: LiveStrategy) -> pd.DataFrame:
+    """
+    Push bars through the strategy synchronously, timing every decision.
+    A symbol's session is closed when its next session's first bar arrives,
+    before that bar is timed.
+    """
+    log = _new_log()
+    ts_, sym_, close_, pos_, lat_ = log.values()
+    clock = time.perf_counter_ns
+    on_bar = strategy.on_bar
+    for symbol, ts, open_, close in bars:
+        if strategy.session_ended(symbol, ts):
+            strategy.close_session(symbol)
+        start = clock()
+        pos = on_bar(symbol, ts, open_, close)
+        lat_.append(clock() - start)
+        ts_.append(ts); sym_.append(symbol); close_.append(close); pos_.append(pos)
+    return _log_frame(log)
+
+
+async def _feed(queue: asyncio.Queue, bars, speed):
+    """Put bars on the queue, sleeping out the gaps between them at `speed`× real time."""
+    prev = None
+    for bar in bars:
+        if speed and prev is not None and bar[1] > prev:
+            await asyncio.sleep((bar[1] - prev) / 1e9 / speed)
+        prev = bar[1]
+        await queue.put((bar, time.perf_counter_ns()))
+    await queue.put(None)
+
+
+async def _consume(queue: asyncio.Queue, strategy: LiveStrategy, log: dict):
+    ts_, sym_, close_, pos_, lat_, wait_ = log.values()
+    clock = time.perf_counter_ns
+    while (item := await queue.get()) is not None:
+        (symbol, ts, open_, close), arrived = item
+        if strategy.session_ended(symbol, ts):
+            strategy.close_session(symbol)
+        start = clock()
+        pos = strategy.on_bar(symbol, ts, open_, close)
+        lat_.append(clock() - start)
+        wait_.append(start - arrived)
+        ts_.append(ts); sym_.append(symbol); close_.append(close); pos_.append(pos)
+
+
+async def replay_async(bars, strategy: LiveStrategy, speed=None, maxsize=QUEUE_SIZE) -> pd.DataFrame:
+    """
+    Feed and strategy as two tasks joined by an asyncio queue, as against a
+    live feed. speed paces the replay (1 = real time, None = as fast as
+    possible). Besides the decision latency, the log records how long each
+    bar waited in the queue (queue_us).
+    """
+    queue = asyncio.Queue(maxsize)
+    log = {**_new_log(), "queue_ns": []}
+    await asyncio.gather(_feed(queue, bars, speed), _consume(queue, strategy, log))
+    return _log_frame(log)
+
+
+def latency_summary(latency_us: pd.Series, budget_us=LATENCY_BUDGET_US) -> dict:
+    """Per-bar latency percentiles (µs) and the share of bars over budget."""
+    lat = latency_us.to_numpy()
+    p50, p99, p999 = np.percentile(lat, [50, 99, 99.9])
+    return {"bars": len(lat), "p50_us": p50, "p99_us": p99, "p99.9_us": p999,
+            "max_us": lat.max(), "over_budget": float(np.mean(lat > budget_us))}
+
+
+def main(path=RAW_INTRADAY, bar_size=None, symbols=None, speed=None, use_queue=False,
+         refit_days=REFIT_DAYS, budget_us=LATENCY_BUDGET_US):
+    strategy = LiveStrategy(refit_days=refit_days)
+    bars = replay_file(path, bar_size=bar_size, symbols=symbols)
+    start = time.perf_counter()
+    if speed or use_queue:
+        log = asyncio.run(replay_async(bars, strategy, speed))
+    else:
+        log = replay(bars, strategy)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    log.to_csv(OUT_CSV, index=False)
+    stats = latency_summary(log["latency_us"], budget_us)
+    print(f"Replayed {stats['bars']} bars for {len(strategy.state)} symbols in {elapsed:.1f}s")
+    print(f"Per-bar latency: p50 {stats['p50_us']:.1f} µs, p99 {stats['p99_us']:.1f} µs, "
+          f"p99.9 {stats['p99.9_us']:.1f} µs, max {stats['max_us']:.0f} µs; "
+          f"{stats['over_budget']:.3%} over the {budget_us} µs budget")
+    if "queue_us" in log:
+        print(f"Queue wait: p50 {log['queue_us'].median():.1f} µs, max {log['queue_us'].max():.0f} µs")
+    print(f"Saved live replay to {OUT_CSV}")
+    return log
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay intraday bars through the live GARCH + momentum strategy.")
+    parser.add_argument("--file", default=RAW_INTRADAY, help="bar file to replay")
+    parser.add_argument("--bar-size", help="resample bars on the fly (e.g. 15min)")
+    parser.add_argument("--symbols", nargs="+", help="only replay these symbols")
+    parser.add_argument("--speed", type=float,
+                        help="pace the replay at this multiple of real time (implies --queue)")
+    parser.add_argument("--queue", action="store_true",
+                        help="run feed and strategy as asyncio tasks joined by a queue")
+    parser.add_argument("--refit-days", type=int, help="refit GARCH every N sessions")
+    parser.add_argument("--budget-us", type=float, default=LATENCY_BUDGET_US,
+                        help="per-bar latency budget in microseconds")
+    args = parser.parse_args()
+    main(args.file, args.bar_size, args.symbols, args.speed, args.queue, args.refit_days, args.budget_us)
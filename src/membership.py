@@ -0,0 +1,162 @@
+# src/membership.py
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from context import dataset
+
+BASE_DIR    = os.path.dirname(__file__)
+HISTORY_CSV = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sp500_constituents.csv")
+OPEN_END    = np.iinfo(np.int64).max  # end of a membership that is still current
+
+
+def _ns(dates) -> np.ndarray:
+    return pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]").view("i8")
+
+
+def _clean(tickers) -> pd.Index:
+    # Same convention as data.get_sp500_tickers (BRK.B -> BRK-B)
+    return pd.Index(tickers, dtype=str).str.strip().str.replace(".", "-", regex=False)
+
+
+# --- Index ---
+#
+# Membership is a set of half-open [start, end) intervals per ticker, kept
+# sorted by ticker then start. For as-of queries the index also stores the
+# member set between consecutive change dates (additions or removals) as one
+# flat array of ticker ids with offsets, so "members on D" is a binary search
+# over the change dates plus a slice. Masks for whole date×ticker grids are
+# built per interval with two binary searches and a cumulative sum, never a
+# Python loop over dates.
+
+class MembershipIndex:
+    """Point-in-time index membership built from (ticker, start, end) intervals."""
+
+    def __init__(self, tickers, starts, ends):
+        tickers = _clean(tickers)
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        keep = starts < ends
+        codes, self.tickers = pd.factorize(tickers[keep], sort=True)
+        order = np.lexsort((starts[keep], codes))
+        self.ticker_id = codes[order].astype(np.int32)
+        self.starts, self.ends = starts[keep][order], ends[keep][order]
+
+        # Member ids for every span between change dates
+        self.changes = np.unique(np.concatenate([self.starts, self.ends[self.ends != OPEN_END]]))
+        lo = np.searchsorted(self.changes, self.starts)
+        hi = np.searchsorted(self.changes, self.ends)
+        counts = hi - lo
+        span = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        ids = np.repeat(self.ticker_id, counts)
+        order = np.lexsort((ids, span))
+        span, ids = span[order], ids[order]
+        # Overlapping intervals of one ticker would list it twice in a span
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = (span[1:] != span[:-1]) | (ids[1:] != ids[:-1])
+        span, self.member_ids = span[first], ids[first]
+        self.offsets = np.searchsorted(span, np.arange(len(self.changes) + 1))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def members_asof(self, date) -> list[str]:
+        """Tickers in the index on `date`."""
+        k = np.searchsorted(self.changes, pd.Timestamp(date).as_unit("ns").value, side="right") - 1
+        if k < 0:
+            return []
+        return self.tickers[self.member_ids[self.offsets[k]:self.offsets[k + 1]]].tolist()
+
+    def tickers_between(self, start, end) -> list[str]:
+        """Every ticker that was a member at some point in [start, end]."""
+        lo, hi = _ns([start, end])
+        hit = (self.starts <= hi) & (self.ends > lo)
+        return self.tickers[np.unique(self.ticker_id[hit])].tolist()
+
+    def mask(self, dates, tickers) -> np.ndarray:
+        """Boolean (dates × tickers) array: True where the ticker was a member on that date."""
+        d = _ns(dates)
+        order = np.argsort(d, kind="stable")
+        col = pd.Index(tickers).get_indexer(self.tickers)[self.ticker_id]
+        ok = col >= 0
+        lo = np.searchsorted(d[order], self.starts[ok])
+        hi = np.searchsorted(d[order], self.ends[ok])
+        delta = np.zeros((len(d) + 1, len(tickers)), dtype=np.int32)
+        np.add.at(delta, (lo, col[ok]), 1)
+        np.add.at(delta, (hi, col[ok]), -1)
+        out = np.empty((len(d), len(tickers)), dtype=bool)
+        out[order] = np.cumsum(delta[:-1], axis=0) > 0
+        return out
+
+    def mask_long(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Rows of a [Date, Ticker] frame (features) whose ticker was a member on that date."""
+        index = frame.index.remove_unused_levels()
+        grid = self.mask(index.levels[0], index.levels[1])
+        return frame[grid[index.codes[0], index.codes[1]]]
+
+
+# --- Loading ---
+
+def _from_snapshots(df: pd.DataFrame):
+    """
+    Intervals from dated snapshots (columns date, tickers: one comma-separated
+    member list per date). A ticker's run of consecutive snapshots becomes one
+    interval ending at the first snapshot without it.
+    """
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    dates = _ns(df["date"])
+    pairs = df["tickers"].str.split(",").explode().dropna()
+    pairs = pd.DataFrame({"ticker": _clean(pairs.to_numpy()), "snap": pairs.index.to_numpy()})
+    pairs = pairs[pairs["ticker"] != ""].drop_duplicates().sort_values(["ticker", "snap"])
+    t, s = pairs["ticker"].to_numpy(), pairs["snap"].to_numpy()
+    new_run = np.ones(len(s), dtype=bool)
+    new_run[1:] = (t[1:] != t[:-1]) | (s[1:] != s[:-1] + 1)
+    last = np.append(new_run[1:], True)
+    ends = np.append(dates, OPEN_END)[s[last] + 1]
+    return t[new_run], dates[s[new_run]], ends
+
+
+def load_membership(path=HISTORY_CSV) -> MembershipIndex | None:
+    """
+    Membership index from a local constituents-history CSV, or None if there
+    is none. Two layouts are read: intervals (ticker, start, end; an empty
+    end means still a member) or snapshots (date, tickers).
+    """
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip().str.lower()
+    if {"ticker", "start"} <= set(df.columns):
+        ends = pd.to_datetime(df["end"] if "end" in df else pd.Series(pd.NaT, index=df.index))
+        ends = np.where(ends.isna(), OPEN_END, _ns(ends.fillna(pd.Timestamp(0))))
+        return MembershipIndex(df["ticker"], _ns(pd.to_datetime(df["start"])), ends)
+    if {"date", "tickers"} <= set(df.columns):
+        return MembershipIndex(*_from_snapshots(df.assign(date=pd.to_datetime(df["date"]))))
+    raise ValueError(f"{path}: expected columns (ticker, start, end) or (date, tickers), "
+                     f"got {list(df.columns)}")
+
+
+@dataset("membership")
+def _membership(ctx):
+    return load_membership()
+
+
+def main(asof=None, path=HISTORY_CSV):
+    members = load_membership(path)
+    if members is None:
+        print(f"No constituents history at {path}")
+        return
+    first, last = pd.to_datetime([members.changes[0], members.changes[-1]])
+    print(f"{len(members.tickers)} tickers, {len(members)} membership intervals, "
+          f"{len(members.changes)} change dates from {first.date()} to {last.date()}")
+    if asof is not None:
+        names = members.members_asof(asof)
+        print(f"{len(names)} members on {pd.Timestamp(asof).date()}: {' '.join(names)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the point-in-time S&P 500 membership index.")
+    parser.add_argument("--asof", help="list the members on this date")
+    parser.add_argument("--file", default=HISTORY_CSV, help="constituents-history CSV")
+    args = parser.parse_args()
+    main(args.asof, args.file)
@@ -0,0 +1,190 @@
+# src/optimizer.py
+
+import numpy as np
+import pandas as pd
+from instrument import span
+
+FREQUENCY      = 252       # trading days per year, for annualising
+ESTIMATOR      = "sample"  # covariance estimator: "sample" or "ledoit_wolf"
+WINDOW         = None      # None = expanding history, else rolling window in trading days
+RISK_FREE_RATE = 0.0
+
+
+# --- Incremental moments ---
+#
+# Every statistic is a sum over observed rows, so a rebalance only adds the
+# rows since the previous one (and, for a rolling window, subtracts the rows
+# that left it). Missing returns are handled pairwise, like DataFrame.cov().
+
+def empty_moments(n: int) -> dict:
+    return {
+        "pairs":   np.zeros((n, n)),   # rows where both i and j are observed
+        "sum":     np.zeros((n, n)),   # Σ r_i over rows where j is observed
+        "cross":   np.zeros((n, n)),   # Σ r_i r_j
+        "sum2":    np.zeros((n, n)),   # Σ r_i² over rows where j is observed
+        "cross21": np.zeros((n, n)),   # Σ r_i² r_j   (these three give the centred
+        "cross2":  np.zeros((n, n)),   # Σ r_i² r_j²   fourth moments for Ledoit–Wolf)
+        "log_sum": np.zeros(n),        # Σ log(1 + r_i), for the compounded mean
+    }
+
+
+def update_moments(state: dict, rows: np.ndarray, sign: float = 1.0) -> None:
+    """Add (sign=1) or remove (sign=-1) rows of daily returns (NaN = missing) in place."""
+    if not len(rows):
+        return
+    valid = ~np.isnan(rows)
+    v = valid.astype(np.float64)
+    r = np.where(valid, rows, 0.0)
+    r2 = r * r
+    state["pairs"]   += sign * (v.T @ v)
+    state["sum"]     += sign * (r.T @ v)
+    state["cross"]   += sign * (r.T @ r)
+    state["sum2"]    += sign * (r2.T @ v)
+    state["cross21"] += sign * (r2.T @ r)
+    state["cross2"]  += sign * (r2.T @ r2)
+    state["log_sum"] += sign * np.log1p(r).sum(axis=0)
+
+
+def _ledoit_wolf(state: dict, ix) -> np.ndarray:
+    """
+    Ledoit–Wolf shrinkage of the (biased) covariance towards a scaled
+    identity, as sklearn's ledoit_wolf (and pypfopt's CovarianceShrinkage).
+    The intensity needs the centred fourth moments Σ (r_i - m_i)² (r_j - m_j)²,
+    expanded here into the running raw sums; each pair uses the rows where
+    both are observed, so on complete data this is exactly sklearn's estimate.
+    """
+    n = state["pairs"][ix]
+    s = state["sum"][ix]
+    c21 = state["cross21"][ix]
+    q = state["sum2"][ix]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mi, mj = s / n, s.T / n                            # pairwise means of r_i and r_j
+        cross = state["cross"][ix] - mi * mj * n           # Σ (r_i - m_i)(r_j - m_j)
+        fourth = (state["cross2"][ix] - 2 * mj * c21 - 2 * mi * c21.T
+                  + mj ** 2 * q + mi ** 2 * q.T + 4 * mi * mj * state["cross"][ix]
+                  - 3 * n * mi ** 2 * mj ** 2)
+        emp = cross / n
+        beta = (fourth / n ** 2 - emp ** 2 / n).sum()
+    p = len(emp)
+    mu = np.trace(emp) / p
+    target = mu * np.eye(p)
+    delta = ((emp - target) ** 2).sum() / p
+    beta /= p
+    shrinkage = 0.0 if delta == 0 else min(max(beta, 0.0), delta) / delta
+    return (1 - shrinkage) * emp + shrinkage * target
+
+
+def _fix_psd(cov) -> np.ndarray:
+    """Clip negative eigenvalues, which pairwise estimates can produce."""
+    vals, vecs = np.linalg.eigh(cov)
+    if vals.min() >= 0:
+        return cov
+    return (vecs * np.clip(vals, 0, None)) @ vecs.T
+
+
+def estimate(state: dict, cols, estimator: str = ESTIMATOR, frequency: int = FREQUENCY):
+    """
+    Annualised expected returns (compounded historical mean, as pypfopt's
+    mean_historical_return) and covariance for the columns `cols`.
+    """
+    ix = np.ix_(cols, cols)
+    pairs = state["pairs"][ix]
+    s = state["sum"][ix]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (state["cross"][ix] - s * s.T / pairs) / (pairs - 1)
+        n = np.diag(pairs)
+        mu = np.exp(state["log_sum"][cols] / n * frequency) - 1
+    if estimator == "ledoit_wolf":
+        cov = _ledoit_wolf(state, ix)
+    elif estimator != "sample":
+        raise ValueError(f"unknown estimator {estimator!r}")
+    return mu, _fix_psd(cov * frequency)
+
+
+# --- Max-Sharpe ---
+
+def max_sharpe(mu: np.ndarray, cov: np.ndarray, risk_free_rate: float = RISK_FREE_RATE,
+               x0: np.ndarray = None) -> np.ndarray | None:
+    """
+    Long-only maximum Sharpe weights, solved as the convex problem
+    min y'Σy s.t. (μ - rf)'y = 1, y ≥ 0, then w = y / Σy.
+    x0 (e.g. last month's weights) warm-starts the solver.
+    Returns None when no asset beats the risk-free rate or the solve fails.
+    """
+    from scipy.optimize import minimize  # loaded with the first solve, not on import
+    excess = mu - risk_free_rate
+    if not (excess > 0).any():
+        return None
+    n = len(mu)
+    if x0 is not None and excess @ x0 > 0:
+        y0 = x0 / (excess @ x0)
+    else:
+        y0 = np.where(excess > 0, 1.0, 0.0)
+        y0 /= excess @ y0
+    res = minimize(
+        lambda y: y @ cov @ y,
+        y0,
+        jac=lambda y: 2 * cov @ y,
+        bounds=[(0, None)] * n,
+        constraints=[{"type": "eq", "fun": lambda y: excess @ y - 1, "jac": lambda y: excess}],
+        method="SLSQP",
+        options={"maxiter": 500, "ftol": 1e-12},
+    )
+    y = np.clip(res.x, 0, None)
+    if not res.success or y.sum() <= 0:
+        return None
+    return y / y.sum()
+
+
+def optimize_weights(returns: pd.DataFrame, universe: dict, estimator: str = ESTIMATOR,
+                     window: int = WINDOW, risk_free_rate: float = RISK_FREE_RATE,
+                     frequency: int = FREQUENCY) -> pd.DataFrame:
+    """
+    Max-Sharpe weights for each rebalance date.
+
+    returns:  daily returns (Date × Ticker).
+    universe: {rebalance date: tickers eligible on that date}.
+    Moments use returns up to and including each date, over an expanding
+    history or the last `window` days, updated incrementally so each month
+    costs the same however long the history. Each solve starts from the
+    previous month's weights; equal weights are used when it is infeasible.
+
+    Returns a (rebalance date × ticker) weight DataFrame.
+    """
+    cols = {t: i for i, t in enumerate(returns.columns)}
+    data = returns.to_numpy(dtype=np.float64)
+    state = empty_moments(len(cols))
+    lo = hi = 0
+    prev = pd.Series(dtype=np.float64)
+    targets = {}
+
+    for date in sorted(universe):
+        tickers = [t for t in universe[date] if t in cols]
+        if not tickers:
+            continue
+        with span("optimizer.month", rows=len(tickers)):
+            end = returns.index.searchsorted(date, side="right")
+            update_moments(state, data[hi:end])
+            hi = end
+            if window is not None and hi - lo > window:
+                update_moments(state, data[lo:hi - window], sign=-1.0)
+                lo = hi - window
+
+            # Tickers without two returns overlapping every other ticker cannot be estimated
+            idx = np.array([cols[t] for t in tickers])
+            ok = (state["pairs"][np.ix_(idx, idx)] > 1).all(axis=0)
+            w = None
+            if ok.any():
+                names = [t for t, k in zip(tickers, ok) if k]
+                mu, cov = estimate(state, idx[ok], estimator, frequency)
+                x0 = prev.reindex(names).fillna(0).to_numpy()
+                w = max_sharpe(mu, cov, risk_free_rate, x0 if x0.sum() > 0 else None)
+            if w is None:
+                print(f"  Warning: no expected return > risk-free on {pd.Timestamp(date).date()}, using equal weights")
+                weights = pd.Series(1 / len(tickers), index=tickers)
+            else:
+                weights = pd.Series(w, index=names)
+        targets[date] = weights
+        prev = weights
+
+    return pd.DataFrame.from_dict(targets, orient="index").sort_index()
@@ -0,0 +1,320 @@
+# src/pipeline.py
+
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import datetime as dt
+import importlib
+import resource
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+ROOT       = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+RAW        = os.path.join(ROOT, "data", "raw")
+PROCESSED  = os.path.join(ROOT, "data", "processed")
+STATE_FILE = os.path.join(PROCESSED, "pipeline_state.json")
+TRACE_FILE = os.path.join(PROCESSED, "pipeline.trace.json")
+N_JOBS     = 2  # stages run at once (independent branches only)
+
+# Stages in dependency order. Inputs are files or directories; a stage
+# depends on whichever stage lists an input among its outputs. `optional`
+# inputs are hashed when present but may be missing. `params` are passed to
+# the stage's entry point and are part of its cache key. The data stage has
+# no input files, so its download end date (today, unless pinned with
+# --set data.end=YYYY-MM-DD) is what makes a new day's run fetch again.
+STAGES = [
+    {"name": "data", "module": "data", "entry": "main", "params": {"end": dt.date.today().isoformat()},
+     "inputs": [], "optional": [os.path.join(RAW, "sp500_constituents.csv")],
+     "outputs": [os.path.join(RAW, "sp500_prices.csv"), os.path.join(RAW, "price_store")]},
+    {"name": "features", "module": "features", "entry": "main", "params": {},
+     "inputs": [os.path.join(RAW, "price_store")],
+     "optional": [os.path.join(RAW, "sp500_constituents.csv")],
+     "outputs": [os.path.join(PROCESSED, "features_monthly.csv")]},
+    {"name": "factors", "module": "factors", "entry": "main", "params": {},
+     "inputs": [os.path.join(RAW, "price_store"), os.path.join(PROCESSED, "features_monthly.csv")],
+     "outputs": [os.path.join(PROCESSED, "features_with_betas.csv")]},
+    {"name": "clustering", "module": "clustering", "entry": "main",
+     "params": {"n_clusters": 4, "warm_start": True},
+     "inputs": [os.path.join(PROCESSED, "features_with_betas.csv")],
+     "outputs": [os.path.join(PROCESSED, "features_clustered.csv")]},
+    {"name": "backtest", "module": "backtest", "entry": "main",
+     "params": {"estimator": "sample", "window": None},
+     "inputs": [os.path.join(RAW, "price_store"), os.path.join(PROCESSED, "features_clustered.csv")],
+     "outputs": [os.path.join(PROCESSED, "backtest_cluster0_daily.csv")]},
+    {"name": "sentiment", "module": "twitter_sentiment", "entry": "main", "params": {},
+     "inputs": [os.path.join(RAW, "price_store"), os.path.join(RAW, "sentiment_data.csv")],
+     "outputs": [os.path.join(RAW, "sentiment_store"),
+                 os.path.join(PROCESSED, "backtest_sentiment_daily.csv")]},
+    {"name": "intraday", "module": "intraday", "entry": "main", "params": {},
+     "inputs": [os.path.join(RAW, "simulated_daily_data.csv"),
+                os.path.join(RAW, "simulated_5min_data.csv")],
+     "outputs": [os.path.join(PROCESSED, "backtest_intraday.csv")]},
+    {"name": "analyze", "module": "analyze", "entry": "main", "params": {},
+     "inputs": [os.path.join(PROCESSED, "backtest_cluster0_daily.csv"),
+                os.path.join(PROCESSED, "backtest_sentiment_daily.csv"),
+                os.path.join(PROCESSED, "backtest_intraday.csv")],
+     "outputs": [os.path.join(PROCESSED, "strategies_performance.csv"),
+                 os.path.join(PROCESSED, "strategies_cumulative.png")]},
+]
+
+
+# --- Hashing ---
+
+def _file_hash(path, memo) -> str:
+    """Content hash of a file, reused while its size and mtime are unchanged."""
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    hit = memo.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    memo[path] = [stamp, h.hexdigest()]
+    return memo[path][1]
+
+
+def path_hash(path, memo) -> str | None:
+    """Hash of a file, or of every file under a directory; None if missing."""
+    if os.path.isfile(path):
+        return _file_hash(path, memo)
+    if not os.path.isdir(path):
+        return None
+    h = hashlib.sha256()
+    for dirpath, _, names in sorted(os.walk(path)):
+        for name in sorted(names):
+            full = os.path.join(dirpath, name)
+            h.update(os.path.relpath(full, path).encode())
+            h.update(_file_hash(full, memo).encode())
+    return h.hexdigest()
+
+
+def _local_modules(module, seen=None) -> set:
+    """The stage's module plus every src/ module it imports, transitively."""
+    seen = set() if seen is None else seen
+    path = os.path.join(BASE_DIR, module + ".py")
+    if module in seen or not os.path.exists(path):
+        return seen
+    seen.add(module)
+    with open(path) as fh:
+        tree = ast.parse(fh.read())
+    for node in ast.walk(tree):
+        names = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+                [node.module] if isinstance(node, ast.ImportFrom) and node.module else []
+        for name in names:
+            _local_modules(name.split(".")[0], seen)
+    return seen
+
+
+def stage_key(stage, memo) -> str | None:
+    """Hash of the stage's code, parameters and inputs; None if an input is missing."""
+    h = hashlib.sha256()
+    for module in sorted(_local_modules(stage["module"])):
+        h.update(_file_hash(os.path.join(BASE_DIR, module + ".py"), memo).encode())
+    h.update(json.dumps(stage["params"], sort_keys=True).encode())
+    for path in stage["inputs"]:
+        digest = path_hash(path, memo)
+        if digest is None:
+            return None
+        h.update(digest.encode())
+    for path in stage.get("optional", []):
+        h.update((path_hash(path, memo) or "missing").encode())
+    return h.hexdigest()
+
+
+# --- Running ---
+
+def _run_stage(module, entry, params, instrument=None) -> dict:
+    """
+    Run one stage in a fresh worker process; returns its timings and peak memory.
+    With `instrument` (kwargs for instrument.enable) the stage's spans are
+    returned under "events", and a profile is saved under PROFILE_DIR.
+    """
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    import instrument as inst
+    if instrument is not None:
+        inst.enable(**instrument)
+    wall, cpu = time.perf_counter(), time.process_time()
+    with inst.span(module):
+        mod = importlib.import_module(module)
+        if entry is not None:
+            getattr(mod, entry)(**params)
+    stats = {
+        "wall_s":  time.perf_counter() - wall,
+        "cpu_s":   time.process_time() - cpu,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if instrument is not None:
+        stats["events"] = inst.events()
+        if instrument.get("profiler"):
+            ext = ".prof" if instrument["profiler"] == "cprofile" else ".html"
+            inst.save_profile(os.path.join(inst.PROFILE_DIR, module + ext))
+    return stats
+
+
+def _load_state(path=STATE_FILE) -> dict:
+    if os.path.exists(path):
+        with open(path) as fh:
+            return json.load(fh)
+    return {"stages": {}, "hashes": {}}
+
+
+def _save_state(state, path=STATE_FILE) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh, indent=1)
+    os.replace(tmp, path)
+
+
+def dependencies(stages) -> dict:
+    """Stage name -> names of the stages producing its inputs."""
+    producer = {out: s["name"] for s in stages for out in s["outputs"]}
+    return {s["name"]: {producer[i] for i in s["inputs"] if i in producer} for s in stages}
+
+
+def run_pipeline(stages=STAGES, targets=None, force=(), n_jobs=N_JOBS, instrument=None) -> dict:
+    """
+    Run the stages needed for `targets` (default: all), skipping those whose
+    code, parameters and inputs hash to the same key as their last successful
+    run and whose outputs are unchanged. Independent stages run concurrently.
+    instrument: instrument.enable kwargs; each stage that runs then reports
+    its spans under "events".
+    Returns {stage: status dict}.
+    """
+    deps = dependencies(stages)
+    by_name = {s["name"]: s for s in stages}
+    wanted = set(targets or by_name)
+    frontier = list(wanted)
+    while frontier:
+        for d in deps[frontier.pop()]:
+            if d not in wanted:
+                wanted.add(d)
+                frontier.append(d)
+
+    state = _load_state(STATE_FILE)
+    memo = state["hashes"]
+    report, running = {}, {}
+    pending = [s["name"] for s in stages if s["name"] in wanted]
+
+    # A fresh process per stage, so peak memory is the stage's own
+    with ProcessPoolExecutor(max_workers=n_jobs, max_tasks_per_child=1) as pool:
+        while pending or running:
+            busy = set(pending) | {name for name, _ in running.values()}
+            for name in list(pending):
+                if deps[name] & busy:
+                    continue
+                pending.remove(name)
+                stage = by_name[name]
+                if any(report.get(d, {}).get("status") in ("failed", "blocked") for d in deps[name]):
+                    report[name] = {"status": "blocked"}
+                    continue
+                key = stage_key(stage, memo)
+                if key is None:
+                    report[name] = {"status": "failed", "error": "missing input"}
+                    print(f"[{name}] missing input, not run")
+                    continue
+                last = state["stages"].get(name, {})
+                outputs = {p: path_hash(p, memo) for p in stage["outputs"]}
+                if name not in force and last.get("key") == key and last.get("outputs") == outputs:
+                    report[name] = {"status": "up to date"}
+                    print(f"[{name}] up to date")
+                    continue
+                print(f"[{name}] running…")
+                running[pool.submit(_run_stage, stage["module"], stage["entry"], stage["params"],
+                                    instrument)] = (name, key)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, key = running.pop(fut)
+                try:
+                    stats = fut.result()
+                except Exception as exc:
+                    report[name] = {"status": "failed", "error": repr(exc)}
+                    print(f"[{name}] failed: {exc!r}")
+                    continue
+                outputs = {p: path_hash(p, memo) for p in by_name[name]["outputs"]}
+                events = stats.pop("events", None)
+                state["stages"][name] = {"key": key, "outputs": outputs, **stats}
+                report[name] = {"status": "ran", **stats}
+                if events is not None:
+                    report[name]["events"] = events
+                print(f"[{name}] done in {stats['wall_s']:.1f}s, peak {stats['peak_mb']:.0f} MB")
+                _save_state(state, STATE_FILE)
+    _save_state(state, STATE_FILE)
+    return report
+
+
+def write_trace(report, path=TRACE_FILE) -> str | None:
+    """One Chrome trace of every instrumented stage, one process row per stage."""
+    from instrument import chrome_trace
+    trace = []
+    for pid, (name, r) in enumerate(report.items()):
+        if "events" in r:
+            trace += chrome_trace(r["events"], pid=pid, process=name)
+    if not trace:
+        return None
+    with open(path, "w") as fh:
+        json.dump({"traceEvents": trace}, fh)
+    return path
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pipeline, skipping up-to-date stages.")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to rerun regardless")
+    parser.add_argument("--set", nargs="*", default=[], metavar="STAGE.PARAM=VALUE",
+                        help="override a stage parameter, e.g. clustering.n_clusters=6")
+    parser.add_argument("--jobs", type=int, default=N_JOBS, help="stages run at once")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record per-stage and per-iteration spans; writes pipeline.trace.json")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --instrument, record each span's peak memory via tracemalloc")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="with --instrument, also profile each stage into data/profiles/")
+    args = parser.parse_args(argv)
+
+    stages = [dict(s, params=dict(s["params"])) for s in STAGES]
+    by_name = {s["name"]: s for s in stages}
+    for item in args.set:
+        target, value = item.split("=", 1)
+        name, param = target.split(".", 1)
+        by_name[name]["params"][param] = _parse_value(value)
+
+    instrument = None
+    if args.instrument or args.profile:
+        instrument = {"memory": args.trace_memory, "profiler": args.profile}
+    report = run_pipeline(stages, args.targets or None, set(args.force), args.jobs, instrument)
+    print(f"\n{'stage':<12}{'status':<12}{'wall s':>8}{'cpu s':>8}{'peak MB':>9}")
+    for name, r in report.items():
+        print(f"{name:<12}{r['status']:<12}{r.get('wall_s', float('nan')):>8.1f}"
+              f"{r.get('cpu_s', float('nan')):>8.1f}{r.get('peak_mb', float('nan')):>9.0f}")
+    if instrument is not None:
+        from instrument import format_summary
+        for name, r in report.items():
+            if r.get("events"):
+                print(f"\n[{name}]\n{format_summary(r['events'])}")
+        path = write_trace(report)
+        if path is not None:
+            print(f"\nSaved Chrome trace to {path}")
+    if any(r["status"] in ("failed", "blocked") for r in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# src/price_store.py
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+BASE_DIR  = os.path.dirname(__file__)
+RAW_CSV   = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sp500_prices.csv")
+STORE_DIR = os.path.join(BASE_DIR, os.pardir, "data", "raw", "price_store")
+META_FILE = "meta.json"
+# Low-memory mode: prices load as float32 (computations still run in float64)
+# and CSV tickers as categoricals
+LOW_MEMORY = os.environ.get("ALGO_TRADING_LOW_MEMORY", "") not in ("", "0")
+CSV_CHUNK_ROWS = 500_000  # rows parsed at a time from the CSV in low-memory mode
+
+
+def _float_dtype(dtype=None):
+    if dtype is not None:
+        return dtype
+    return np.float32 if LOW_MEMORY else np.float64
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process so far, in MB."""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _field_file(field: str) -> str:
+    """Map a price column name ('adj close') to its matrix file ('adj_close.npy')."""
+    return field.replace(" ", "_") + ".npy"
+
+
+def store_exists(store_dir=STORE_DIR) -> bool:
+    """The store is complete once meta.json has been written (it is written last)."""
+    return os.path.exists(os.path.join(store_dir, META_FILE))
+
+
+def write_store(prices: pd.DataFrame, store_dir=STORE_DIR) -> None:
+    """
+    prices: long DataFrame with MultiIndex [Date, Ticker] (as written by data.py).
+    Writes one date×ticker float64 matrix per column, plus the shared date/ticker axes.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    wide = prices.unstack("Ticker").sort_index()
+    dates = wide.index
+    tickers = sorted(prices.index.get_level_values("Ticker").unique())
+
+    fields = []
+    for field in prices.columns:
+        mat = wide[field].reindex(columns=tickers).to_numpy(dtype=np.float64)
+        np.save(os.path.join(store_dir, _field_file(field)), mat)
+        fields.append(field)
+
+    np.save(os.path.join(store_dir, "dates.npy"), dates.values.astype("datetime64[ns]"))
+    meta = {"fields": fields, "tickers": tickers, "shape": [len(dates), len(tickers)]}
+    with open(os.path.join(store_dir, META_FILE), "w") as fh:
+        json.dump(meta, fh)
+
+
+def _read_meta(store_dir):
+    with open(os.path.join(store_dir, META_FILE)) as fh:
+        return json.load(fh)
+
+
+def available_fields(store_dir=STORE_DIR, csv_path=RAW_CSV) -> list[str]:
+    """Price columns available from the store, or from the CSV header as a fallback."""
+    if store_exists(store_dir):
+        return _read_meta(store_dir)["fields"]
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return [c for c in header if c not in ("Date", "Ticker")]
+
+
+def _filter_rows(df, tickers, start, end) -> pd.DataFrame:
+    if tickers is not None:
+        df = df[df["Ticker"].isin(tickers)]
+    if start is not None:
+        df = df[df["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Date"] <= pd.Timestamp(end)]
+    return df
+
+
+def _read_csv(fields, tickers, start, end, csv_path, dtype=None) -> pd.DataFrame:
+    """
+    Fallback: parse only the requested columns of the raw CSV, then filter rows.
+    In low-memory mode the file is parsed in chunks, each filtered before the
+    next is read, with tickers as a categorical shared across chunks.
+    """
+    usecols = None if fields is None else ["Date", "Ticker", *fields]
+    # Only pass dtypes when they differ from what the parser infers: an explicit
+    # float64 mapping makes read_csv's peak memory several times larger
+    dtypes = None
+    if _float_dtype(dtype) != np.float64:
+        header = pd.read_csv(csv_path, nrows=0).columns if fields is None else fields
+        dtypes = {f: _float_dtype(dtype) for f in header if f not in ("Date", "Ticker")}
+    if not LOW_MEMORY:
+        df = pd.read_csv(csv_path, usecols=usecols, parse_dates=["Date"], dtype=dtypes)
+        df = _filter_rows(df, tickers, start, end)
+    else:
+        dtypes = {**(dtypes or {}), "Ticker": "category"}
+        reader = pd.read_csv(csv_path, usecols=usecols, parse_dates=["Date"], dtype=dtypes,
+                             chunksize=CSV_CHUNK_ROWS)
+        chunks = [_filter_rows(c, tickers, start, end) for c in reader]
+        categories = union_categoricals([c["Ticker"] for c in chunks]).categories
+        for c in chunks:
+            c["Ticker"] = c["Ticker"].cat.set_categories(categories)
+        df = pd.concat(chunks, ignore_index=True)
+        del chunks
+    return df.set_index(["Date", "Ticker"]).sort_index()
+
+
+def load_wide(field: str, tickers=None, start=None, end=None,
+              store_dir=STORE_DIR, csv_path=RAW_CSV, dtype=None) -> pd.DataFrame:
+    """
+    Load one price field as a date×ticker DataFrame.
+    Only the requested date range and ticker columns are read from the
+    memory-mapped matrix; falls back to the CSV when no store exists.
+    dtype defaults to float64, or float32 in low-memory mode.
+    """
+    dtype = _float_dtype(dtype)
+    if not store_exists(store_dir):
+        long = _read_csv([field], tickers, start, end, csv_path, dtype)
+        wide = long[field].unstack("Ticker")
+        return wide if tickers is None else wide.reindex(columns=list(tickers))
+
+    meta = _read_meta(store_dir)
+    if field not in meta["fields"]:
+        raise KeyError(f"Field {field!r} not in price store (have {meta['fields']})")
+
+    dates = pd.DatetimeIndex(np.load(os.path.join(store_dir, "dates.npy")))
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side="left")
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side="right")
+
+    all_tickers = meta["tickers"]
+    mat = np.load(os.path.join(store_dir, _field_file(field)), mmap_mode="r")
+    if tickers is None:
+        cols = all_tickers
+        data = np.array(mat[lo:hi], dtype=dtype)
+    else:
+        pos = {t: i for i, t in enumerate(all_tickers)}
+        cols = list(tickers)
+        idx = np.array([pos.get(t, -1) for t in cols], dtype=np.int64)
+        data = np.full((hi - lo, len(cols)), np.nan, dtype=dtype)
+        found = idx >= 0
+        data[:, found] = mat[lo:hi][:, idx[found]]
+
+    wide = pd.DataFrame(data, index=dates[lo:hi], columns=pd.Index(cols, name="Ticker"))
+    wide.index.name = "Date"
+    return wide
+
+
+def load_panel(fields=None, tickers=None, start=None, end=None,
+               store_dir=STORE_DIR, csv_path=RAW_CSV, dtype=None) -> pd.DataFrame:
+    """
+    Load prices in the long [Date, Ticker] layout the pipeline stages expect.
+    Rows where every requested field is missing are dropped, matching the CSV.
+    The long frame is built straight from the matrices (no stack), so each
+    field is held at most twice while loading.
+    """
+    if not store_exists(store_dir):
+        return _read_csv(fields, tickers, start, end, csv_path, dtype)
+
+    if fields is None:
+        fields = _read_meta(store_dir)["fields"]
+    wides = {f: load_wide(f, tickers, start, end, store_dir, csv_path, dtype) for f in fields}
+    first = next(iter(wides.values()))
+    present = np.zeros(first.shape, dtype=bool)
+    for w in wides.values():
+        present |= ~np.isnan(w.to_numpy())
+    rows, cols = np.nonzero(present)
+
+    index = pd.MultiIndex(levels=[first.index, first.columns], codes=[rows, cols],
+                          names=["Date", "Ticker"])
+    data = {}
+    for f in fields:
+        data[f] = wides.pop(f).to_numpy()[rows, cols]
+    long = pd.DataFrame(data, index=index)
+    if tickers is not None:
+        long = long.sort_index()
+        long.index = long.index.remove_unused_levels()
+    return long
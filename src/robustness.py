@@ -0,0 +1,234 @@
+# src/robustness.py
+
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from analytics import PERIODS
+
+N_PATHS     = 20_000  # resampled paths per strategy
+BLOCK       = 20      # (mean) block length in days; keeps about a month of autocorrelation
+METHOD      = "stationary"  # "stationary" (random block lengths) or "block" (fixed, circular)
+CHUNK_PATHS = 1_000   # paths per task; bounds memory at CHUNK_PATHS × days per strategy
+CONFIDENCE  = 0.95
+SEED        = 42
+STATS       = ["sharpe", "ann_return", "ann_vol", "max_drawdown"]
+EULER_GAMMA = 0.5772156649015329
+
+
+# --- Resampling ---
+#
+# A chunk of paths is one (paths × days) index matrix into the strategy's
+# own return history; every statistic is then a reduction along the day
+# axis, so a chunk costs a handful of array passes and no Python loop over
+# paths. Chunks get independent child seeds, so results do not depend on
+# how many processes run them.
+
+def _wrap(idx: np.ndarray, T: int) -> np.ndarray:
+    # Indices are below 2T by construction, so one conditional subtract replaces a modulo
+    idx[idx >= T] -= T
+    return idx
+
+
+def block_indices(rng, T: int, n_paths: int, block: int = BLOCK) -> np.ndarray:
+    """Circular moving-block bootstrap: fixed-length blocks from uniform starts."""
+    n_blocks = -(-T // block)
+    starts = rng.integers(0, T, (n_paths, n_blocks), dtype=np.int32)
+    idx = starts[:, :, None] + np.arange(block, dtype=np.int32)
+    return _wrap(idx.reshape(n_paths, -1)[:, :T], T)
+
+
+def stationary_indices(rng, T: int, n_paths: int, block: int = BLOCK) -> np.ndarray:
+    """
+    Stationary bootstrap (Politis & Romano): blocks of geometric length with
+    mean `block`, each from a uniform start, wrapping around the history.
+    """
+    # Enough blocks to cover T days in all but astronomically unlikely draws;
+    # a path that still falls short just continues its last block
+    n_blocks = 2 * -(-T // block) + 16
+    bounds = np.cumsum(rng.geometric(1.0 / block, (n_paths, n_blocks)), axis=1)
+    starts = rng.integers(0, T, (n_paths, n_blocks), dtype=np.int32)
+
+    new = np.zeros((n_paths, T), dtype=np.int32)
+    rows, k = np.nonzero(bounds[:, :-1] < T)
+    new[rows, bounds[rows, k]] = 1
+    block_id = np.cumsum(new, axis=1, dtype=np.int32)               # block of every day
+    first = np.zeros((n_paths, n_blocks), dtype=np.int64)
+    first[:, 1:] = bounds[:, :-1]
+    offset = (starts - np.minimum(first, T)).astype(np.int32)       # index = day + offset
+    idx = np.take_along_axis(offset, block_id, axis=1) + np.arange(T, dtype=np.int32)
+    return _wrap(idx, T)
+
+
+SAMPLERS = {"stationary": stationary_indices, "block": block_indices}
+
+
+def path_stats(r: np.ndarray, idx: np.ndarray, periods: int = PERIODS) -> np.ndarray:
+    """
+    STATS of the paths r[idx] for a (paths × days) index matrix; shape
+    (len(STATS), paths). Sums and log-wealth gather from precomputed r, r²
+    and log(1 + r), so no transcendental runs on the path matrix.
+    """
+    T = idx.shape[1]
+    s1 = r[idx].sum(axis=1)
+    s2 = (r * r)[idx].sum(axis=1)
+    mean = s1 / T
+    std = np.sqrt(np.maximum(s2 - T * mean ** 2, 0) / (T - 1))
+    log_wealth = np.cumsum(np.log1p(r)[idx], axis=1)
+    growth = log_wealth[:, -1].copy()
+    log_wealth -= np.maximum.accumulate(log_wealth, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = mean / std * np.sqrt(periods)
+    return np.stack([
+        sharpe,
+        np.expm1(growth * periods / T),
+        std * np.sqrt(periods),
+        np.minimum(np.expm1(log_wealth.min(axis=1)), 0),
+    ])
+
+
+def _chunk(series: list, n_paths: int, block: int, method: str, seed) -> np.ndarray:
+    """Statistics of n_paths resampled paths of every series: (strategies, STATS, paths)."""
+    rng = np.random.default_rng(seed)
+    sample = SAMPLERS[method]
+    out = np.full((len(series), len(STATS), n_paths), np.nan)
+    for s, r in enumerate(series):
+        if len(r) > 1:
+            out[s] = path_stats(r, sample(rng, len(r), n_paths, block))
+    return out
+
+
+def bootstrap(returns: pd.DataFrame, n_paths: int = N_PATHS, block: int = BLOCK,
+              method: str = METHOD, n_jobs: int = None, chunk: int = CHUNK_PATHS,
+              seed: int = SEED) -> np.ndarray:
+    """
+    Resample every strategy's daily returns (each over the dates it has) and
+    return the path statistics as an array (strategies, STATS, n_paths).
+    Chunks of `chunk` paths run across n_jobs processes (default: all cores).
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown method {method!r}; choose from {sorted(SAMPLERS)}")
+    series = [returns[c].dropna().to_numpy(dtype=np.float64) for c in returns.columns]
+    sizes = [min(chunk, n_paths - lo) for lo in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    args = ([series] * len(sizes), sizes, [block] * len(sizes), [method] * len(sizes), seeds)
+    if n_jobs == 1 or len(sizes) <= 1:
+        parts = list(map(_chunk, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_chunk, *args))
+    return np.concatenate(parts, axis=2)
+
+
+def confidence_intervals(stats: np.ndarray, columns, confidence: float = CONFIDENCE) -> pd.DataFrame:
+    """Median and two-sided interval of each statistic, plus the share of paths with Sharpe ≤ 0."""
+    alpha = (1 - confidence) / 2
+    q = np.nanquantile(stats, [alpha, 0.5, 1 - alpha], axis=2)      # (3, strategies, STATS)
+    out = {}
+    for k, stat in enumerate(STATS):
+        out[f"{stat}_lo"], out[f"{stat}_median"], out[f"{stat}_hi"] = q[0, :, k], q[1, :, k], q[2, :, k]
+    with np.errstate(invalid="ignore"):
+        out["p_sharpe_le_0"] = np.where(np.isnan(stats[:, 0]).all(axis=1), np.nan,
+                                        np.mean(stats[:, 0] <= 0, axis=1))
+    return pd.DataFrame(out, index=columns)
+
+
+# --- Sharpe ratio tests (Bailey & López de Prado) ---
+
+def _moments(returns: pd.DataFrame):
+    """Per-period Sharpe, skewness, (non-excess) kurtosis and observations per column."""
+    r = returns.to_numpy(dtype=np.float64)
+    n = np.sum(~np.isnan(r), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(r, axis=0)
+        d = r - mean
+        m2 = np.nanmean(d ** 2, axis=0)
+        skew = np.nanmean(d ** 3, axis=0) / m2 ** 1.5
+        kurt = np.nanmean(d ** 4, axis=0) / m2 ** 2
+        sr = mean / np.nanstd(r, axis=0, ddof=1)
+    return sr, skew, kurt, n
+
+
+def probabilistic_sharpe(returns: pd.DataFrame, benchmark: float = 0.0,
+                         periods: int = PERIODS) -> pd.Series:
+    """
+    Probability that each strategy's true Sharpe exceeds `benchmark`
+    (annualised), given its track length, skewness and fat tails.
+    """
+    sr, skew, kurt, n = _moments(returns)
+    return pd.Series(_psr(sr, benchmark / np.sqrt(periods), skew, kurt, n),
+                     index=returns.columns, name="psr")
+
+
+def _psr(sr, sr_star, skew, kurt, n):
+    from scipy.special import ndtr
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (sr - sr_star) * np.sqrt(n - 1) / np.sqrt(1 - skew * sr + (kurt - 1) / 4 * sr ** 2)
+    return np.where(n > 2, ndtr(z), np.nan)
+
+
+def deflated_sharpe(returns: pd.DataFrame, n_trials: int = None) -> pd.DataFrame:
+    """
+    Deflated Sharpe ratio: the PSR against the Sharpe the best of `n_trials`
+    unskilled strategies would reach by luck, with the trials' Sharpe
+    variance taken from the columns of `returns` (default: one trial per
+    column). Returns the expected maximum Sharpe (annualised) and the DSR.
+    """
+    from scipy.special import ndtri
+    sr, skew, kurt, n = _moments(returns)
+    N = n_trials or int(np.sum(~np.isnan(sr)))
+    var = np.nanvar(sr, ddof=1) if np.sum(~np.isnan(sr)) > 1 else 0.0
+    if N > 1:
+        sr_star = np.sqrt(var) * ((1 - EULER_GAMMA) * ndtri(1 - 1 / N)
+                                  + EULER_GAMMA * ndtri(1 - 1 / (N * np.e)))
+    else:
+        sr_star = 0.0
+    return pd.DataFrame({"expected_max_sharpe": np.full(len(sr), sr_star * np.sqrt(PERIODS)),
+                         "dsr": _psr(sr, sr_star, skew, kurt, n)}, index=returns.columns)
+
+
+def robustness_report(returns: pd.DataFrame, n_paths: int = N_PATHS, block: int = BLOCK,
+                      method: str = METHOD, n_jobs: int = None, n_trials: int = None,
+                      confidence: float = CONFIDENCE, seed: int = SEED) -> pd.DataFrame:
+    """Bootstrap intervals, PSR (vs 0) and DSR for every strategy column."""
+    stats = bootstrap(returns, n_paths, block, method, n_jobs, seed=seed)
+    return (confidence_intervals(stats, returns.columns, confidence)
+            .join(probabilistic_sharpe(returns))
+            .join(deflated_sharpe(returns, n_trials)))
+
+
+def main(results=None, n_paths=N_PATHS, block=BLOCK, method=METHOD, n_jobs=None, n_trials=None):
+    # analyze.py owns the strategy file list and the batch-results format
+    from analyze import OUT_CSV, load_results, load_strategies
+    if results is None:
+        returns, _ = load_strategies()
+        out_csv = os.path.join(os.path.dirname(OUT_CSV), "strategies_robustness.csv")
+    else:
+        returns, _ = load_results(results)
+        out_csv = os.path.splitext(results)[0] + "_robustness.csv"
+
+    print(f"Resampling {n_paths} {method}-bootstrap paths (block {block}) "
+          f"for {returns.shape[1]} strategies…")
+    report = robustness_report(returns, n_paths, block, method, n_jobs, n_trials)
+    report.to_csv(out_csv)
+    cols = ["sharpe_lo", "sharpe_median", "sharpe_hi", "p_sharpe_le_0",
+            "max_drawdown_lo", "psr", "dsr"]
+    print(report[cols].sort_values("dsr", ascending=False).head(20)
+                      .to_string(float_format=lambda x: f"{x:.3f}"))
+    print(f"Saved robustness report to {out_csv}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals and Sharpe tests.")
+    parser.add_argument("results", nargs="?",
+                        help="batch results CSV (e.g. sweep_daily.csv) instead of the three strategies")
+    parser.add_argument("--paths", type=int, default=N_PATHS, help="resampled paths per strategy")
+    parser.add_argument("--block", type=int, default=BLOCK, help="(mean) block length in days")
+    parser.add_argument("--method", choices=sorted(SAMPLERS), default=METHOD)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--trials", type=int,
+                        help="strategies tried, for the deflated Sharpe (default: one per column)")
+    args = parser.parse_args()
+    main(args.results, args.paths, args.block, args.method, args.jobs, args.trials)
@@ -0,0 +1,59 @@
+# src/rolling_ols.py
+
+import numpy as np
+
+
+def _window_sum(a: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum over the first axis via cumulative sums (rows < window-1 are partial)."""
+    s = np.cumsum(a, axis=0)
+    s[window:] = s[window:] - s[:-window].copy()
+    return s
+
+
+def rolling_ols(y: np.ndarray, X: np.ndarray, window: int) -> dict:
+    """
+    Rolling OLS of every column of y on the same regressors X, plus an intercept.
+
+    y: T×N array of dependent series (e.g. excess returns per ticker), NaN = missing.
+    X: T×K array of regressors shared by all columns (e.g. factor returns), no NaNs.
+    window: number of rows per regression.
+
+    The cross-products Z'Z (shared) and Z'y (per column) are maintained as
+    rolling sums, so all T×N regressions are solved in one batched pass.
+    A column gets estimates only where its whole window is observed.
+
+    Returns {"alpha": T×N, "coef": T×K×N, "r2": T×N}.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    X = np.asarray(X, dtype=np.float64)
+    T, N = y.shape
+    Z = np.column_stack([np.ones(T), X])           # T×P, intercept first
+    P = Z.shape[1]
+
+    valid = ~np.isnan(y)
+    y0 = np.where(valid, y, 0.0)
+
+    zz = _window_sum(Z[:, :, None] * Z[:, None, :], window)    # T×P×P
+    zy = _window_sum(Z[:, :, None] * y0[:, None, :], window)   # T×P×N
+    yy = _window_sum(y0 * y0, window)                          # T×N
+    cnt = _window_sum(valid.astype(np.int64), window)          # T×N
+
+    coef = np.full((T, P, N), np.nan)
+    r2 = np.full((T, N), np.nan)
+    if T < window:
+        return {"alpha": coef[:, 0], "coef": coef[:, 1:], "r2": r2}
+
+    rows = slice(window - 1, None)
+    b = np.linalg.pinv(zz[rows]) @ zy[rows]                    # T'×P×N
+    # Residual and total sums of squares from the same cross-products
+    ssr = (yy[rows]
+           - 2 * np.einsum("tpn,tpn->tn", b, zy[rows])
+           + np.einsum("tpn,tpq,tqn->tn", b, zz[rows], b))
+    sst = yy[rows] - zy[rows, 0] ** 2 / window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fit = 1 - ssr / sst
+
+    full = cnt[rows] == window
+    coef[rows] = np.where(full[:, None, :], b, np.nan)
+    r2[rows] = np.where(full, fit, np.nan)
+    return {"alpha": coef[:, 0], "coef": coef[:, 1:], "r2": r2}
@@ -0,0 +1,187 @@
+# src/sentiment_signals.py
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import sentiment_store  # registers the sentiment datasets
+from analytics import performance
+from context import DataContext
+from engine import assign_periods, simulate
+
+BASE_DIR = os.path.dirname(__file__)
+OUT_DIR  = os.path.join(BASE_DIR, os.pardir, "data", "processed")
+TOP_N    = 20
+
+# Signals, in the order of the z-score panel's first axis. Count metrics are
+# z-scored on log1p (they are heavy-tailed); momentum is the month-over-month
+# change in log1p(engagement); sentiment is the raw twitterSentiment mean.
+SIGNALS = ["posts", "comments", "likes", "impressions", "momentum", "sentiment"]
+COUNTS  = {"posts": "twitterPosts", "comments": "twitterComments",
+           "likes": "twitterLikes", "impressions": "twitterImpressions"}
+
+# Composite = weighted mean of the available z-scores. Equal weights on the
+# z-scored counts stop impressions from dominating the way the raw sum does.
+DEFAULT_WEIGHTS = {"posts": 1, "comments": 1, "likes": 1, "impressions": 1}
+VARIANTS = {
+    "counts":         DEFAULT_WEIGHTS,
+    "no_impressions": {"posts": 1, "comments": 1, "likes": 1},
+    "impressions":    {"impressions": 1},
+    "momentum":       {"momentum": 1},
+    "sentiment":      {"sentiment": 1},
+    "blend":          {**DEFAULT_WEIGHTS, "momentum": 2, "sentiment": 2},
+}
+
+
+def top_n_mask(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    Boolean mask of the n largest values in each row of a months×tickers
+    matrix (NaN = not ranked), from a single partial sort (np.partition)
+    across all months at once. Ties at the cut go to the earlier column, as
+    with a stable descending sort.
+    """
+    v = np.where(np.isnan(values), -np.inf, values)
+    k = min(n, v.shape[1])
+    if k == 0:
+        return np.zeros(v.shape, dtype=bool)
+    kth = -np.partition(-v, k - 1, axis=1)[:, k - 1:k]
+    above = v > kth
+    at = v == kth
+    tie = at & (np.cumsum(at, axis=1) <= k - above.sum(axis=1, keepdims=True))
+    return (above | tie) & ~np.isnan(values)
+
+
+def _zscore(x: np.ndarray) -> np.ndarray:
+    """Cross-sectional z-score along the last (ticker) axis; NaN where undefined."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(x, axis=-1, keepdims=True)
+        std = np.nanstd(x, axis=-1, keepdims=True)
+        return np.where(std > 0, (x - mean) / std, np.nan)
+
+
+def signal_panel(metrics: pd.DataFrame) -> dict:
+    """
+    All sentiment signals as cross-sectional z-scores in one pass.
+    metrics: monthly means per (Month, Ticker), as from sentiment_store.monthly_metrics.
+    Returns {"months", "tickers", "z": (len(SIGNALS), months, tickers) array}.
+    """
+    fields = [*COUNTS.values(), "engagement", "twitterSentiment"]
+    wide = metrics[fields].unstack("Ticker")
+    # Calendar-complete months so momentum never spans a gap
+    months = pd.date_range(wide.index.min(), wide.index.max(), freq="M")
+    wide = wide.reindex(months)
+    tickers = wide["engagement"].columns
+    X = wide.to_numpy(dtype=np.float64).reshape(len(months), len(fields), len(tickers))
+    X = np.moveaxis(X, 1, 0)                                  # (field, month, ticker)
+
+    counts = np.log1p(np.maximum(X[:4], 0))
+    log_eng = np.log1p(np.maximum(X[4], 0))
+    momentum = np.full_like(log_eng, np.nan)
+    momentum[1:] = log_eng[1:] - log_eng[:-1]
+    raw = np.concatenate([counts, momentum[None], X[5][None]])
+    return {"months": months, "tickers": tickers, "z": _zscore(raw)}
+
+
+def weight_matrix(variants) -> np.ndarray:
+    """(V, len(SIGNALS)) weights from a list of {signal: weight} dicts."""
+    W = np.zeros((len(variants), len(SIGNALS)))
+    for v, weights in enumerate(variants):
+        for name, w in weights.items():
+            W[v, SIGNALS.index(name)] = w
+    return W
+
+
+def composite(z: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """
+    (V, months, tickers) scores: for each variant, the weighted mean of the
+    z-scores a ticker has that month (NaN when it has none with weight).
+    """
+    avail = ~np.isnan(z)
+    num = np.einsum("vs,stn->vtn", W, np.nan_to_num(z))
+    den = np.einsum("vs,stn->vtn", np.abs(W), avail.astype(np.float64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def portfolios(scores: np.ndarray, top_n: int = TOP_N, long_short: bool = False) -> np.ndarray:
+    """
+    Target weights shaped like `scores`: the top N per month in equal weights
+    (summing to 1), and with long_short the bottom N short (summing to -1).
+    """
+    flat = scores.reshape(-1, scores.shape[-1])
+    long = top_n_mask(flat, top_n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = long / long.sum(axis=1, keepdims=True)
+        if long_short:
+            short = top_n_mask(np.where(long, np.nan, -flat), top_n)
+            w = w - short / short.sum(axis=1, keepdims=True)
+    return np.nan_to_num(w).reshape(scores.shape)
+
+
+def backtest_variants(metrics: pd.DataFrame, rets: pd.DataFrame, variants=VARIANTS,
+                      top_n: int = TOP_N, long_short=(False, True)) -> pd.DataFrame:
+    """
+    Daily returns of every (variant, long_short) portfolio, simulated together.
+    Only tickers with price data are ranked. Each month's portfolio is held
+    over the following month.
+    Returns a DataFrame with columns (variant, 'long' | 'long_short').
+    """
+    panel = signal_panel(metrics)
+    tradable = panel["tickers"].isin(rets.columns)
+    scores = composite(panel["z"][..., tradable], weight_matrix(list(variants.values())))
+    tickers = panel["tickers"][tradable]
+
+    W = np.concatenate([portfolios(scores, top_n, ls) for ls in long_short])
+    W = pd.DataFrame(W.reshape(-1, len(tickers)), columns=tickers) \
+          .reindex(columns=rets.columns, fill_value=0.0).to_numpy().reshape(*W.shape[:2], -1)
+
+    period = assign_periods(panel["months"], rets.index, pd.offsets.MonthEnd(1))
+    invested = (W != 0).any(axis=(0, 2))
+    period = np.where((period >= 0) & invested[np.clip(period, 0, None)], period, -1)
+    res = simulate(W, rets.to_numpy(dtype=np.float64), period)
+
+    columns = pd.MultiIndex.from_product(
+        [["long_short" if ls else "long" for ls in long_short], list(variants)],
+        names=["book", "variant"]).swaplevel()
+    daily = pd.DataFrame(res["net"].T, index=rets.index[res["live"]], columns=columns)
+    turnover = pd.DataFrame(res["turnover"].T, index=daily.index, columns=columns)
+    return pd.concat({"return": daily, "turnover": turnover}, axis=1)
+
+
+def signal_returns(metrics: pd.DataFrame, rets: pd.DataFrame, weights=DEFAULT_WEIGHTS,
+                   top_n: int = TOP_N, long_short: bool = False) -> pd.DataFrame:
+    """One variant's daily returns in the layout of twitter_sentiment.sentiment_returns."""
+    res = backtest_variants(metrics, rets, {"signal": weights}, top_n, (long_short,))
+    allr = pd.DataFrame({"sentiment_return": res["return"].iloc[:, 0],
+                         "turnover": res["turnover"].iloc[:, 0]})
+    allr.index.name = "Date"
+    return allr
+
+
+def summarize_variants(results: pd.DataFrame) -> pd.DataFrame:
+    """Sharpe, return, drawdown and turnover per (variant, book), see analytics.performance."""
+    perf = performance(results["return"], results["turnover"])
+    return perf.rename_axis(["variant", "book"]).reset_index()
+
+
+def main(top_n: int = TOP_N):
+    ctx = DataContext()
+    metrics = ctx.get("sentiment_metrics")
+    rets = ctx.get("close_returns")
+    print(f"Backtesting {len(VARIANTS)} signal variants × long / long-short…")
+    results = backtest_variants(metrics, rets, top_n=top_n)
+    summary = summarize_variants(results)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    out_file = os.path.join(OUT_DIR, "sentiment_variants.csv")
+    summary.to_csv(out_file, index=False)
+    # Daily series with flat "<variant>_<book>" names, readable by analyze.py
+    results.columns = pd.MultiIndex.from_tuples([(f, f"{v}_{b}") for f, v, b in results.columns])
+    results.to_csv(os.path.join(OUT_DIR, "sentiment_variants_daily.csv"))
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"Saved sentiment variants to {out_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-n", type=int, default=TOP_N, help="names per leg")
+    main(parser.parse_args().top_n)
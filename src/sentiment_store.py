@@ -0,0 +1,322 @@
+# src/sentiment_store.py
+
+import io
+import os
+import glob
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from context import dataset
+from incremental import load_checkpoint, save_checkpoint
+
+BASE_DIR   = os.path.dirname(__file__)
+RAW_CSV    = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sentiment_data.csv")
+ALT_CSV    = "/mnt/data/sentiment_data.csv"  # fallback if the CSV lives under /mnt/data
+STORE_DIR  = os.path.join(BASE_DIR, os.pardir, "data", "raw", "sentiment_store")
+META_FILE  = "meta.json"
+AGG_FILE   = "monthly.npz"
+EXTRA_FILE = "appended.npz"  # rows merged with --append; survive rebuilds from the CSV
+CHUNK_ROWS = 200_000  # CSV rows parsed at a time while syncing
+SCAN_BYTES = 1 << 16  # block size when looking for the last complete CSV line
+
+# Raw columns kept per (date, symbol) row; engagement is the sum of the first four
+ENGAGEMENT = ["twitterPosts", "twitterComments", "twitterLikes", "twitterImpressions"]
+METRICS    = ENGAGEMENT + ["twitterSentiment"]
+
+
+def find_csv() -> str:
+    """RAW_CSV, else the /mnt/data fallback; checked when the data is needed, not on import."""
+    for path in (RAW_CSV, ALT_CSV):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"Could not find sentiment_data.csv at {RAW_CSV} or {ALT_CSV}")
+
+
+# --- Layout ---
+#
+# One .npz per calendar month (YYYY-MM.npz) holding the month's rows column by
+# column: date, symbol and each metric. Appending a day rewrites only that
+# day's month. monthly.npz keeps per-(month, symbol) row counts and metric
+# sums/counts, so monthly means never need the raw rows; only the months an
+# append touched are re-aggregated. Rows that do not come from the CSV are
+# also kept in appended.npz. They take precedence over CSV rows for the same
+# (date, symbol), whether the CSV is synced incrementally or rebuilt.
+
+def _partition(store_dir, month: str) -> str:
+    return os.path.join(store_dir, f"{month}.npz")
+
+
+def _month_end(dates) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(dates).to_period("M").to_timestamp("M")
+
+
+def _read_meta(store_dir) -> dict | None:
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_meta(store_dir, meta) -> None:
+    tmp = os.path.join(store_dir, META_FILE + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, os.path.join(store_dir, META_FILE))
+
+
+def _load_partition(path) -> pd.DataFrame:
+    z = load_checkpoint(path)
+    return pd.DataFrame({"date": z["date"], "symbol": z["symbol"],
+                         **{m: z[m] for m in METRICS}})
+
+
+def _save_partition(path, rows: pd.DataFrame) -> None:
+    save_checkpoint(path, date=rows["date"].to_numpy(dtype="datetime64[ns]"),
+                    symbol=rows["symbol"].to_numpy(dtype=str),
+                    **{m: rows[m].to_numpy(dtype=np.float64) for m in METRICS})
+
+
+def _merge(old: pd.DataFrame | None, new: pd.DataFrame) -> pd.DataFrame:
+    """New rows over old ones, one row per (date, symbol), sorted."""
+    rows = new if old is None else pd.concat([old, new], ignore_index=True)
+    return (rows.drop_duplicates(["date", "symbol"], keep="last")
+                .sort_values(["date", "symbol"], kind="stable"))
+
+
+def _clean_rows(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[["date", "symbol", *METRICS]].copy()
+    df["date"] = pd.to_datetime(df["date"])
+    df[METRICS] = df[METRICS].astype(np.float64)
+    return df
+
+
+def _aggregate(rows: pd.DataFrame) -> dict:
+    """Per-symbol row count, engagement sum and metric sums/counts for one month."""
+    g = rows.groupby("symbol", sort=True)
+    agg = {
+        "symbol":     g.size().index.to_numpy(dtype=str),
+        "rows":       g.size().to_numpy(dtype=np.int64),
+        "engagement": g["engagement"].sum().to_numpy(dtype=np.float64),
+    }
+    for m in METRICS:
+        agg[f"sum_{m}"] = g[m].sum().to_numpy(dtype=np.float64)
+        agg[f"cnt_{m}"] = g[m].count().to_numpy(dtype=np.int64)
+    return agg
+
+
+# --- Writing ---
+
+def append_rows(df: pd.DataFrame, store_dir=STORE_DIR) -> list[str]:
+    """
+    Merge raw rows (columns date, symbol and METRICS) into their month
+    partitions. A (date, symbol) already stored is replaced by the new row.
+    Returns the months ('YYYY-MM') that were rewritten.
+    """
+    if df.empty:
+        return []
+    os.makedirs(store_dir, exist_ok=True)
+    df = _clean_rows(df)
+    months = df["date"].dt.strftime("%Y-%m")
+
+    aggs = {}
+    for month, new in df.groupby(months, sort=True):
+        path = _partition(store_dir, month)
+        rows = _merge(_load_partition(path) if os.path.exists(path) else None, new)
+        _save_partition(path, rows)
+        rows["engagement"] = rows[ENGAGEMENT].sum(axis=1)
+        aggs[month] = _aggregate(rows)
+
+    # Swap the touched months' aggregates into monthly.npz
+    agg_path = os.path.join(store_dir, AGG_FILE)
+    old = load_checkpoint(agg_path)
+    touched = _month_end(pd.to_datetime(list(aggs))).to_numpy(dtype="datetime64[ns]")
+    parts = []
+    if old is not None:
+        keep = ~np.isin(old["month"], touched)
+        parts.append({k: v[keep] for k, v in old.items()})
+    for month, agg in aggs.items():
+        label = _month_end(pd.to_datetime([month]))[0].to_datetime64()
+        parts.append({"month": np.full(len(agg["symbol"]), label, dtype="datetime64[ns]"), **agg})
+    merged = {k: np.concatenate([p[k] for p in parts]) for k in parts[-1]}
+    order = np.lexsort((merged["symbol"], merged["month"]))
+    save_checkpoint(agg_path, **{k: v[order] for k, v in merged.items()})
+    return list(aggs)
+
+
+def append_external(df: pd.DataFrame, store_dir=STORE_DIR) -> list[str]:
+    """
+    Merge rows that are not in the CSV (e.g. a file of one day's rows) into
+    the store, like append_rows. They are also recorded in EXTRA_FILE, so a
+    rebuild from the CSV puts them back instead of dropping them.
+    """
+    if df.empty:
+        return []
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, EXTRA_FILE)
+    _save_partition(path, _merge(_load_partition(path) if os.path.exists(path) else None,
+                                 _clean_rows(df)))
+    return append_rows(df, store_dir)
+
+
+class _Bounded(io.RawIOBase):
+    """The next `size` bytes of an open binary file, as a stream of its own."""
+
+    def __init__(self, fh, size: int):
+        self.fh, self.left = fh, size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        n = self.fh.readinto(memoryview(buf)[:min(len(buf), self.left)])
+        self.left -= n
+        return n
+
+
+def _last_line_end(fh, start: int, size: int) -> int:
+    """Offset just past the last newline in [start, size), or start if there is none."""
+    pos = size
+    while pos > start:
+        lo = max(start, pos - SCAN_BYTES)
+        fh.seek(lo)
+        cut = fh.read(pos - lo).rfind(b"\n")
+        if cut >= 0:
+            return lo + cut + 1
+        pos = lo
+    return start
+
+
+def sync_csv(csv_path=RAW_CSV, store_dir=STORE_DIR, chunksize=CHUNK_ROWS) -> int:
+    """
+    Bring the store up to date with an append-only sentiment CSV, parsing
+    only the bytes added since the last sync, `chunksize` rows at a time.
+    The store is rebuilt from scratch if the header changed or the file
+    shrank. Rows merged with append_external win over CSV rows for the same
+    (date, symbol) on either path; a rebuild re-applies them.
+    Returns the number of rows ingested.
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as fh:
+        header = fh.readline()
+    meta = _read_meta(store_dir)
+    rebuild = meta is None or meta["header"] != header.decode() or size < meta["offset"]
+    if rebuild:
+        for pattern in ("????-??.npz", AGG_FILE):
+            for path in glob.glob(os.path.join(store_dir, pattern)):
+                os.remove(path)
+        meta = {"header": header.decode(), "offset": len(header)}
+    if size == meta["offset"] and not rebuild:
+        return 0
+
+    extra_path = os.path.join(store_dir, EXTRA_FILE)
+    extra = _load_partition(extra_path) if os.path.exists(extra_path) else None
+    if extra is not None:
+        extra_keys = pd.MultiIndex.from_frame(extra[["date", "symbol"]])
+
+    columns = header.decode().strip().split(",")
+    n = 0
+    with open(csv_path, "rb") as fh:
+        # Only complete lines; a row still being written is picked up next time
+        end = _last_line_end(fh, meta["offset"], size)
+        fh.seek(meta["offset"])
+        if end > meta["offset"]:
+            tail = io.BufferedReader(_Bounded(fh, end - meta["offset"]))
+            for chunk in pd.read_csv(tail, names=columns, header=None,
+                                     parse_dates=["date"], chunksize=chunksize):
+                n += len(chunk)
+                if extra is not None:
+                    keys = pd.MultiIndex.from_arrays([chunk["date"], chunk["symbol"]])
+                    chunk = chunk[~keys.isin(extra_keys)]
+                append_rows(chunk, store_dir)
+    meta["offset"] = end
+    if rebuild and extra is not None:
+        append_rows(extra, store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    _write_meta(store_dir, meta)
+    return n
+
+
+# --- Reading ---
+
+def load_rows(start=None, end=None, store_dir=STORE_DIR) -> pd.DataFrame:
+    """Raw rows between start and end (inclusive), reading only the months in range."""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(store_dir, "????-??.npz"))):
+        month = pd.Period(os.path.basename(path)[:7], "M")
+        if start is not None and month.end_time < pd.Timestamp(start):
+            continue
+        if end is not None and month.start_time > pd.Timestamp(end):
+            continue
+        frames.append(_load_partition(path))
+    if not frames:
+        return pd.DataFrame(columns=["date", "symbol", *METRICS])
+    rows = pd.concat(frames, ignore_index=True)
+    if start is not None:
+        rows = rows[rows["date"] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[rows["date"] <= pd.Timestamp(end)]
+    return rows.reset_index(drop=True)
+
+
+def _load_aggregates(store_dir):
+    agg = load_checkpoint(os.path.join(store_dir, AGG_FILE))
+    if agg is None:
+        raise FileNotFoundError(f"No sentiment store at {store_dir}; run sync_csv first")
+    index = pd.MultiIndex.from_arrays([pd.DatetimeIndex(agg["month"]), agg["symbol"]],
+                                      names=["Month", "Ticker"])
+    return agg, index
+
+
+def monthly_engagement(store_dir=STORE_DIR) -> pd.Series:
+    """Mean daily engagement per (MonthEnd, Ticker), from the stored aggregates."""
+    agg, index = _load_aggregates(store_dir)
+    return pd.Series(agg["engagement"] / agg["rows"], index=index, name="engagement")
+
+
+def monthly_metrics(store_dir=STORE_DIR) -> pd.DataFrame:
+    """Monthly mean of every raw metric (NaNs skipped) plus engagement, per (MonthEnd, Ticker)."""
+    agg, index = _load_aggregates(store_dir)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        data = {m: np.where(agg[f"cnt_{m}"] > 0, agg[f"sum_{m}"] / agg[f"cnt_{m}"], np.nan)
+                for m in METRICS}
+    data["engagement"] = agg["engagement"] / agg["rows"]
+    return pd.DataFrame(data, index=index)
+
+
+# --- Shared datasets (see context.DataContext) ---
+
+@dataset("sentiment_store")
+def _synced_store(ctx):
+    # Only rows added to the CSV since the last run are parsed and aggregated
+    print(f"Synced {sync_csv(find_csv())} new sentiment rows")
+    return STORE_DIR
+
+
+@dataset("sentiment_monthly")
+def _monthly_engagement(ctx):
+    return monthly_engagement(ctx.get("sentiment_store"))
+
+
+@dataset("sentiment_metrics")
+def _monthly_metrics(ctx):
+    return monthly_metrics(ctx.get("sentiment_store"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the sentiment store with new CSV rows.")
+    parser.add_argument("--csv", help="append-only sentiment CSV to sync from (default: RAW_CSV)")
+    parser.add_argument("--append", metavar="CSV",
+                        help="merge a standalone file of rows (e.g. one day) into the store")
+    args = parser.parse_args()
+    if args.append:
+        months = append_external(pd.read_csv(args.append, parse_dates=["date"]))
+        print(f"Appended {args.append} into months {', '.join(months) or '(none)'}")
+    else:
+        path = args.csv or find_csv()
+        print(f"Synced {sync_csv(path)} new rows from {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# src/strategies.py
+
+import os
+import time
+import argparse
+import importlib
+from context import DataContext
+
+# Modules that register strategies (and the datasets they add) on import.
+# A new strategy is a module with a @register'ed function, listed here.
+PLUGINS = ["backtest", "twitter_sentiment", "intraday"]
+
+# Strategy name -> {"run": fn(ctx, **params) -> daily DataFrame,
+#                   "requires": dataset names or fn(**params) -> names,
+#                   "output": CSV path or None}
+STRATEGIES = {}
+
+
+def register(name: str, requires=(), output=None):
+    """
+    Register `fn(ctx, **params)` as strategy `name`, declaring the datasets it
+    needs. When they depend on the parameters, `requires` is a function of
+    them returning the names.
+    """
+    def wrap(fn):
+        STRATEGIES[name] = {"run": fn, "requires": requires if callable(requires) else tuple(requires),
+                            "output": output}
+        return fn
+    return wrap
+
+
+def requirements(name: str, params=None) -> tuple:
+    """Datasets strategy `name` needs when run with `params`."""
+    requires = STRATEGIES[name]["requires"]
+    return tuple(requires(**(params or {}))) if callable(requires) else requires
+
+
+def load_plugins(plugins=PLUGINS) -> dict:
+    for module in plugins:
+        importlib.import_module(module)
+    return STRATEGIES
+
+
+def run_strategies(names=None, ctx=None, params=None) -> dict:
+    """
+    Run the named strategies (default: all registered) against one shared
+    DataContext and save each result to its declared output.
+    params: {strategy: {param: value}}. Returns {strategy: daily DataFrame}.
+
+    A strategy that fails is reported and skipped so the others still run
+    and save; a RuntimeError naming the failed ones is raised at the end.
+    """
+    load_plugins()
+    ctx = DataContext() if ctx is None else ctx
+    params = params or {}
+    results, failed = {}, {}
+    for name in names or list(STRATEGIES):
+        spec = STRATEGIES[name]
+        start = time.perf_counter()
+        try:
+            ctx.load(requirements(name, params.get(name)))
+            df = spec["run"](ctx, **params.get(name, {}))
+            if spec["output"] is not None:
+                os.makedirs(os.path.dirname(spec["output"]), exist_ok=True)
+                df.to_csv(spec["output"])
+                print(f"[{name}] saved {len(df)} rows to {spec['output']}")
+        except Exception as exc:
+            print(f"[{name}] FAILED after {time.perf_counter() - start:.1f}s: {type(exc).__name__}: {exc}")
+            failed[name] = exc
+            continue
+        print(f"[{name}] done in {time.perf_counter() - start:.1f}s")
+        results[name] = df
+    if failed:
+        raise RuntimeError(f"{len(failed)} strategies failed: {', '.join(failed)}") from next(iter(failed.values()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run strategies against one shared data load.")
+    parser.add_argument("names", nargs="*", help="strategies to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="list strategies and their inputs")
+    args = parser.parse_args()
+    load_plugins()
+    if args.list:
+        for name in STRATEGIES:
+            print(f"{name:<12} needs {', '.join(requirements(name)) or '-'}")
+        return
+    ctx = DataContext()
+    try:
+        run_strategies(args.names or None, ctx)
+    finally:
+        print("Datasets loaded (once each): " +
+              ", ".join(f"{k} {ctx.timings[k]:.1f}s" for k in ctx.timings))
+
+
+if __name__ == "__main__":
+    # Plugins register into the importable `strategies` module, not this __main__ copy
+    from strategies import main
+    main()
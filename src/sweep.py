@@ -0,0 +1,129 @@
+# src/sweep.py
+
+import os
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from analytics import performance
+from clustering import INPUT_CSV, assign_clusters
+from engine import run_backtest
+from membership import load_membership
+from optimizer import optimize_weights
+from price_store import available_fields, load_wide
+
+BASE_DIR   = os.path.dirname(__file__)
+OUT_DIR    = os.path.join(BASE_DIR, os.pardir, "data", "processed")
+K_VALUES   = [2, 3, 4, 5, 6]            # numbers of clusters to try
+ESTIMATORS = ["sample", "ledoit_wolf"]  # covariance estimators to try
+N_JOBS     = None                       # worker processes (None = all cores)
+
+
+# --- Shared inputs ---
+#
+# Returns and features are parsed once in the parent and placed in shared
+# memory; workers map them without copying or reparsing.
+
+def _share(array: np.ndarray):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+_DATA = {}
+
+
+def _init_worker(rets_spec, rets_index, rets_columns, feats_spec, feats_index, feats_columns):
+    shm_r, rets = _attach(rets_spec)
+    shm_f, feats = _attach(feats_spec)
+    _DATA["shm"] = (shm_r, shm_f)  # keep the mappings alive
+    _DATA["rets"] = pd.DataFrame(rets, index=rets_index, columns=rets_columns, copy=False)
+    _DATA["feats"] = pd.DataFrame(feats, index=feats_index, columns=feats_columns, copy=False)
+
+
+def _cluster_task(k):
+    # Matched labels, so "cluster c" is the same regime in every month of a backtest
+    return k, assign_clusters(_DATA["feats"], n_clusters=k, verbose=False, warm_start=True)
+
+
+def _backtest_task(k, cluster_id, estimator, universe):
+    rets = _DATA["rets"]
+    weights = optimize_weights(rets, universe, estimator=estimator)
+    daily = run_backtest(weights, rets, horizon=pd.offsets.MonthEnd(1))
+    return (k, cluster_id, estimator), daily[["return", "turnover"]]
+
+
+def run_sweep(k_values=K_VALUES, estimators=ESTIMATORS, n_jobs=N_JOBS):
+    """
+    Backtest every (K, cluster, estimator) combination.
+    Returns (summary table, daily results with columns ('return' | 'turnover', combination)).
+    """
+    print("Loading prices and features…")
+    price_col = 'adj close' if 'adj close' in available_fields() else 'close'
+    rets = load_wide(price_col).pct_change().dropna(how='all')
+    feats = pd.read_csv(INPUT_CSV, index_col=["Date","Ticker"], parse_dates=["Date"])
+    feats = feats.sort_index(level="Date", sort_remaining=False)
+    members = load_membership()
+    if members is not None:
+        # Only index members are clustered and eligible at each rebalance;
+        # returns stay unmasked so P&L and covariances use every listed day
+        feats = members.mask_long(feats)
+
+    shm_r, rets_spec = _share(rets.to_numpy(dtype=np.float64))
+    shm_f, feats_spec = _share(feats.to_numpy(dtype=np.float64))
+    init = (rets_spec, rets.index, rets.columns, feats_spec, feats.index, feats.columns)
+    dates = feats.index.get_level_values("Date")
+    tickers = feats.index.get_level_values("Ticker")
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init) as pool:
+            print(f"Clustering for K in {list(k_values)}…")
+            labels = dict(pool.map(_cluster_task, k_values))
+
+            futures = []
+            for k, estimator in itertools.product(k_values, estimators):
+                for c in range(k):
+                    members = pd.Series(tickers[labels[k] == c], index=dates[labels[k] == c])
+                    universe = members.groupby(level=0).agg(list).to_dict()
+                    futures.append(pool.submit(_backtest_task, k, c, estimator, universe))
+            print(f"Backtesting {len(futures)} (K, cluster, estimator) combinations…")
+            runs = dict(sorted(f.result() for f in futures))
+    finally:
+        for shm in (shm_r, shm_f):
+            shm.close()
+            shm.unlink()
+
+    # All combinations summarised in one vectorized pass
+    names = [f"k{k}_c{c}_{e}" for k, c, e in runs]
+    daily = pd.concat({
+        "return":   pd.concat([d["return"] for d in runs.values()], axis=1, keys=names),
+        "turnover": pd.concat([d["turnover"] for d in runs.values()], axis=1, keys=names),
+    }, axis=1)
+    perf = performance(daily["return"], daily["turnover"])
+    keys = pd.DataFrame(list(runs), columns=["k", "cluster", "estimator"])
+    results = pd.concat([keys, perf[["sharpe", "ann_return", "max_drawdown", "avg_turnover", "days"]]
+                         .reset_index(drop=True)], axis=1)
+    return results, daily
+
+
+def main(n_jobs=N_JOBS):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    results, daily = run_sweep(n_jobs=n_jobs)
+    out_file = os.path.join(OUT_DIR, "sweep_results.csv")
+    results.to_csv(out_file, index=False)
+    daily.to_csv(os.path.join(OUT_DIR, "sweep_daily.csv"))
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"Saved sweep results to {out_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=N_JOBS, help="worker processes")
+    main(parser.parse_args().jobs)
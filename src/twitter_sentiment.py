@@ -1,33 +1,30 @@
 # src/twitter_sentiment.py
 
 import os
+import argparse
 import pandas as pd
 import numpy as np
+from context import DataContext
+from engine import run_backtest
+from instrument import timed
+from sentiment_signals import VARIANTS, signal_returns, top_n_mask
+from sentiment_store import find_csv
+from strategies import register, run_strategies
 
 # === Paths ===
 BASE_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
-# Primary location for your custom CSV
-RAW_CSV = os.path.join(PROJECT_ROOT, "data", "raw", "sentiment_data.csv")
-# Fallback if file lives under /mnt/data
-if not os.path.exists(RAW_CSV):
-    alt = "/mnt/data/sentiment_data.csv"
-    if os.path.exists(alt):
-        RAW_CSV = alt
-    else:
-        raise FileNotFoundError(f"Could not find sentiment_data.csv at {RAW_CSV} or {alt}")
-
-PRICE_CSV = os.path.join(PROJECT_ROOT, "data", "raw", "sp500_prices.csv")
 OUT_DIR   = os.path.join(PROJECT_ROOT, "data", "processed")
+OUT_CSV   = os.path.join(OUT_DIR, 'backtest_sentiment_daily.csv')
 
 
-def load_sentiment_data(path=RAW_CSV) -> pd.DataFrame:
+def load_sentiment_data(path=None) -> pd.DataFrame:
     """
     Load the custom Twitter dataset with columns:
       date, symbol, twitterPosts, twitterComments, twitterLikes, twitterImpressions, etc.
     Renames to Date, Ticker, and maps interactions to engagement.
     """
-    df = pd.read_csv(path, parse_dates=["date"])
+    df = pd.read_csv(path or find_csv(), parse_dates=["date"])
     # Rename columns
     df = df.rename(columns={
         'date': 'Date',
@@ -47,70 +44,81 @@ def compute_monthly_engagement(df: pd.DataFrame) -> pd.Series:
     Aggregate engagement to month-end by ticker.
     Returns a Series indexed by (MonthEnd, Ticker).
     """
-    df['Month'] = df['Date'].dt.to_period('M').dt.to_timestamp('M')
+    month = df['Date'].dt.to_period('M').dt.to_timestamp('M').rename('Month')
     monthly = (
         df
-        .groupby(['Month', 'Ticker'])['engagement']
+        .groupby([month, df['Ticker']])['engagement']
         .mean()
         .rename('engagement')
     )
     return monthly
 
 
-def backtest_sentiment(monthly: pd.Series):
+def sentiment_returns(monthly: pd.Series, rets: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
+    """
+    Daily returns of holding, for each month, the top N tickers by average
+    engagement in equal weights over the next month.
+    """
+    # Top N by engagement per month, then keep those with price data
+    matrix = monthly.unstack(level=1)
+    chosen = top_n_mask(matrix.to_numpy(dtype=np.float64), top_n)
+    chosen &= matrix.columns.isin(rets.columns)[None, :]
+    for month in matrix.index[~chosen.any(axis=1)]:
+        print(f"[WARN] No valid tickers for {month.date()} after filtering vs price data.")
+
+    # Equal weights; months and tickers never chosen are left out
+    counts = chosen.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = pd.DataFrame(np.where(chosen, 1 / counts, np.nan),
+                               index=matrix.index, columns=matrix.columns)
+    weights = weights.dropna(how='all').dropna(axis=1, how='all')
+
+    res = run_backtest(weights, rets, horizon=pd.offsets.MonthEnd(1))
+    allr = res[['return', 'turnover']].rename(columns={'return': 'sentiment_return'})
+    allr.index.name = 'Date'
+    print(f"Sentiment backtest: {len(weights)} months → {len(allr)} days")
+    return allr
+
+
+def _inputs(signal: str | None = None, **params) -> tuple:
+    # Raw engagement ranks the monthly aggregate; a signal reads the store directly
+    return ("close_returns", "sentiment_metrics" if signal else "sentiment_monthly")
+
+
+@register("sentiment", requires=_inputs, output=OUT_CSV)
+@timed("backtest_sentiment", rows=len)
+def sentiment_strategy(ctx, top_n: int = 20, signal: str | None = None, long_short: bool = False):
     """
     For each month:
-      - Select top 20 tickers by average engagement
-      - Form equal-weight portfolio
+      - Select top N tickers by average engagement, or with `signal` (a
+        sentiment_signals.VARIANTS name) by that weighted z-score signal
+      - Form equal-weight portfolio (plus a bottom-N short leg if long_short)
       - Compute daily returns for next month
-    Save all daily returns to CSV.
     """
-    # Load price returns
-    px = pd.read_csv(
-        PRICE_CSV,
-        index_col=['Date', 'Ticker'],
-        parse_dates=['Date']
-    )
-    prices = px['close'].unstack('Ticker')
-    rets = prices.pct_change().dropna(how='all')
-
-    results = []
-    for month, grp in monthly.groupby(level=0):
-        # Top 20 by engagement (MultiIndex: Month, Ticker)
-        sorted_ = grp.sort_values(ascending=False)
-        # Extract tickers and filter to available price columns
-        cand = sorted_.head(20).index.get_level_values(1).tolist()
-        longs = [t for t in cand if t in rets.columns]
-        if not longs:
-            print(f"[WARN] No valid tickers for {month.date()} after filtering vs price data.")
-            continue
-
-        # Next-month date range
-        start = month + pd.offsets.MonthBegin(1)
-        end   = month + pd.offsets.MonthEnd(1)
-        mask  = (rets.index >= start) & (rets.index <= end)
-        rets_m = rets.loc[mask, longs]
-
-        # Equal weights
-        w = np.repeat(1/len(longs), len(longs))
-        port_ret = rets_m.dot(w)
-
-        dfm = pd.DataFrame({'Date': port_ret.index, 'sentiment_return': port_ret.values})
-        results.append(dfm)
-        print(f"Sentiment backtest {month.date()}: {len(longs)} tickers → {port_ret.shape[0]} days")
-
-    allr = pd.concat(results).set_index('Date')
-    os.makedirs(OUT_DIR, exist_ok=True)
-    out_csv = os.path.join(OUT_DIR, 'backtest_sentiment_daily.csv')
-    allr.to_csv(out_csv)
-    print(f"Saved sentiment backtest to {out_csv}")
-
-
-def main():
-    df = load_sentiment_data()
-    monthly = compute_monthly_engagement(df)
-    backtest_sentiment(monthly)
+    rets = ctx.get("close_returns")
+    if signal is None:
+        return sentiment_returns(ctx.get("sentiment_monthly"), rets, top_n)
+    allr = signal_returns(ctx.get("sentiment_metrics"), rets, VARIANTS[signal], top_n, long_short)
+    print(f"Sentiment backtest ({signal}{', long-short' if long_short else ''}): {len(allr)} days")
+    return allr
+
+
+def backtest_sentiment(monthly: pd.Series, top_n: int = 20, signal: str | None = None,
+                       long_short: bool = False):
+    """Run the sentiment strategy on a given monthly engagement series and save it to CSV."""
+    run_strategies(["sentiment"], DataContext(sentiment_monthly=monthly),
+                   {"sentiment": {"top_n": top_n, "signal": signal, "long_short": long_short}})
+
+
+def main(signal: str | None = None, long_short: bool = False):
+    run_strategies(["sentiment"], params={"sentiment": {"signal": signal, "long_short": long_short}})
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--signal', choices=list(VARIANTS),
+                        help='rank by a weighted z-score signal instead of raw engagement')
+    parser.add_argument('--long-short', action='store_true',
+                        help='also short the bottom N (needs --signal)')
+    args = parser.parse_args()
+    main(args.signal, args.long_short)
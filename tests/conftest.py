@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Stage modules import each other as top-level modules, as when run from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
@@ -0,0 +1,57 @@
+# tests/test_analytics.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import PERIODS, factor_attribution
+
+T = 250
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(4)
+    days = pd.bdate_range("2021-01-01", periods=T)
+    factors = pd.DataFrame(rng.normal(0, 0.01, (T, 2)), index=days, columns=["MKT", "SMB"])
+    factors["RF"] = 0.0001
+    loadings = rng.normal(1, 0.3, (2, 4))
+    returns = pd.DataFrame(factors[["MKT", "SMB"]].to_numpy() @ loadings
+                           + rng.normal(0.0002, 0.005, (T, 4)) + 0.0001,
+                           index=days, columns=["s0", "s1", "s2", "s3"])
+    returns.iloc[:100, 1] = np.nan  # starts late
+    return returns, factors
+
+
+def _lstsq(y, factors):
+    ok = y.notna()
+    X = np.column_stack([np.ones(ok.sum()), factors.loc[ok, ["MKT", "SMB"]]])
+    b, *_ = np.linalg.lstsq(X, (y - factors["RF"])[ok], rcond=None)
+    return b
+
+
+def test_matches_lstsq_per_strategy(data):
+    returns, factors = data
+    out = factor_attribution(returns, factors)
+    for name in returns:
+        b = _lstsq(returns[name], factors)
+        assert out.loc[name, "alpha"] == pytest.approx(b[0] * PERIODS)
+        assert out.loc[name, ["beta_MKT", "beta_SMB"]].tolist() == pytest.approx(b[1:].tolist())
+
+
+def test_unidentified_strategy_gets_nan_row(data):
+    returns, factors = data
+    factors.iloc[:20, 1] = 0.0
+    returns["s2"] = np.where(np.arange(T) < 20, returns["s2"], np.nan)  # only sees a flat SMB
+    returns["s3"] = np.nan
+    returns.iloc[:3, 3] = 0.01                                           # three dates, three coefficients
+    out = factor_attribution(returns, factors)
+    assert out.loc[["s2", "s3"]].isna().all().all()
+    assert out.loc[["s0", "s1"]].notna().all().all()
+
+
+def test_constant_factor_does_not_fail_the_batch(data):
+    returns, factors = data
+    out = factor_attribution(returns, factors.assign(SMB=0.002))
+    assert out.isna().all().all()
+    assert len(out) == returns.shape[1]
@@ -0,0 +1,34 @@
+# tests/test_data.py
+
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+from data import download_price_data
+
+START, END = "2020-01-01", "2020-02-01"
+
+
+@pytest.fixture
+def offline_cache(tmp_path, monkeypatch):
+    """Offline mode over an empty cache in tmp_path, with AAA cached."""
+    days = pd.bdate_range(START, END, inclusive="left", name="Date")
+    frame = pd.DataFrame({"close": np.arange(len(days), dtype=float)}, index=days)
+    cache.store("yfinance", "AAA", frame, START, END, cache_dir=str(tmp_path))
+    monkeypatch.setattr(cache, "OFFLINE", True)
+    monkeypatch.setattr(cache, "load", functools.partial(cache.load, cache_dir=str(tmp_path)))
+    return frame
+
+
+def test_offline_serves_cached_symbols(offline_cache):
+    prices = download_price_data(["AAA", "BBB"], START, END)
+    assert prices.index.get_level_values("Ticker").unique().tolist() == ["AAA"]
+    assert len(prices) == len(offline_cache)
+
+
+def test_offline_with_nothing_cached_names_the_symbols(offline_cache):
+    with pytest.raises(cache.CacheMissError, match="BBB, CCC"):
+        download_price_data(["BBB", "CCC"], START, END)
@@ -0,0 +1,78 @@
+# tests/test_downloader.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from downloader import download_chunked, local_source
+
+TICKERS = ["A", "B", "C", "D", "E", "F"]
+START, END = "2020-01-01", "2020-03-01"
+
+
+@pytest.fixture
+def prices():
+    days = pd.bdate_range(START, END, inclusive="left")
+    index = pd.MultiIndex.from_product([days, TICKERS], names=["Date", "Ticker"])
+    return pd.DataFrame({"close": np.arange(len(index), dtype=float)}, index=index)
+
+
+def _recording(fetch, calls):
+    def wrapped(tickers, start, end):
+        calls.append(list(tickers))
+        return fetch(tickers, start, end)
+    return wrapped
+
+
+def _run(fetch, sunk, manifest, **kw):
+    def sink(tickers, frame):
+        assert set(frame.index.get_level_values("Ticker")) == set(tickers)
+        sunk.update(tickers)
+    return download_chunked(TICKERS, START, END, fetch, sink, manifest,
+                            chunk_size=kw.pop("chunk_size", 2), max_workers=1,
+                            retries=kw.pop("retries", 1), backoff=0, **kw)
+
+
+def test_resumes_after_interruption(prices, tmp_path):
+    manifest = str(tmp_path / "download.json")
+    sunk = set()
+
+    def sink(tickers, frame):
+        if len(sunk) == 2:
+            raise KeyboardInterrupt
+        sunk.update(tickers)
+
+    with pytest.raises(KeyboardInterrupt):
+        download_chunked(TICKERS, START, END, local_source(prices), sink, manifest,
+                         chunk_size=2, max_workers=1, retries=1, backoff=0)
+    assert sunk == {"A", "B"}
+
+    calls = []
+    result = _run(_recording(local_source(prices), calls), sunk, manifest)
+    assert calls == [["C", "D"], ["E", "F"]]
+    assert sunk == set(TICKERS)
+    assert result == {"done": TICKERS, "failed": []}
+
+
+def test_bisects_to_the_bad_symbol(prices, tmp_path):
+    calls, sunk = [], set()
+    fetch = _recording(local_source(prices, fail=("C",)), calls)
+    result = _run(fetch, sunk, str(tmp_path / "download.json"), chunk_size=6)
+    assert result["failed"] == ["C"]
+    assert result["done"] == ["A", "B", "D", "E", "F"]
+    assert sunk == {"A", "B", "D", "E", "F"}
+    assert ["C"] in calls and len(calls) < 2 * len(TICKERS)
+
+
+def test_retries_failed_symbols_on_the_next_run(prices, tmp_path):
+    manifest = str(tmp_path / "download.json")
+    sunk = set()
+    first = _run(local_source(prices, fail=("A", "B")), sunk, manifest)
+    assert first["failed"] == ["A", "B"]
+    assert sunk == {"C", "D", "E", "F"}
+
+    calls = []
+    second = _run(_recording(local_source(prices), calls), sunk, manifest)
+    assert calls == [["A", "B"]]
+    assert second == {"done": TICKERS, "failed": []}
+    assert sunk == set(TICKERS)
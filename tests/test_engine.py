@@ -0,0 +1,84 @@
+# tests/test_engine.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import assign_periods, run_backtest
+
+DAYS = pd.to_datetime(["2020-01-30", "2020-01-31", "2020-02-03", "2020-02-04",
+                       "2020-02-28", "2020-03-02", "2020-03-03"])
+
+
+@pytest.fixture
+def returns():
+    return pd.DataFrame({"A": [0.0, 0.0, 0.10, 0.00, 0.02, -0.05, 0.01],
+                         "B": [0.0, 0.0, 0.00, 0.10, 0.04, 0.03, np.nan]}, index=DAYS)
+
+
+def _weights(rows):
+    """(rebalance date × ticker) weights from {date: {ticker: weight}}."""
+    return pd.DataFrame.from_dict(rows, orient="index").rename(index=pd.Timestamp)
+
+
+def test_periods_start_after_rebalance_and_stop_at_horizon():
+    rebal = pd.to_datetime(["2020-01-31", "2020-02-28"])
+    assert assign_periods(rebal, DAYS).tolist() == [-1, -1, 0, 0, 0, 1, 1]
+    cut = assign_periods(pd.to_datetime(["2020-01-31"]), DAYS, pd.offsets.MonthEnd(1))
+    assert cut.tolist() == [-1, -1, 0, 0, 0, -1, -1]
+
+
+def test_constant_weights_match_a_per_period_loop(returns):
+    weights = _weights({"2020-01-31": {"A": 0.5, "B": 0.5}, "2020-02-28": {"A": 0.2, "B": 0.6}})
+    res = run_backtest(weights, returns)
+    assert res.index.equals(DAYS[2:])
+
+    # The old loop: each period's weights times each held day's returns, NaN as 0
+    expected = []
+    for k, date in enumerate(weights.index):
+        stop = weights.index[k + 1] if k + 1 < len(weights) else DAYS[-1] + pd.Timedelta(days=1)
+        held = returns[(returns.index > date) & (returns.index <= stop)].fillna(0)
+        expected += (held * weights.loc[date]).sum(axis=1).tolist()
+    np.testing.assert_allclose(res["gross_return"], expected)
+    np.testing.assert_allclose(res["gross_return"], [0.05, 0.05, 0.03, 0.008, 0.002])
+
+
+def test_drift_and_turnover(returns):
+    weights = _weights({"2020-01-31": {"A": 0.5, "B": 0.5}, "2020-02-03": {"A": 1.0, "B": 0.0}})
+    res = run_backtest(weights, returns, drift=True)
+    # 0.5 * 10% on the one day held; A ends it at 0.55 / 1.05 of the book, B at 0.5 / 1.05
+    assert res.loc["2020-02-03", "gross_return"] == pytest.approx(0.05)
+    # The second rebalance is held from 2020-02-04; its turnover is measured
+    # against the drifted weights at the end of 2020-02-03
+    assert res.loc["2020-02-04", "turnover"] == pytest.approx(abs(1 - 0.55 / 1.05) + 0.5 / 1.05)
+    assert res.loc["2020-02-04", "gross_return"] == pytest.approx(0.0)
+    assert res.loc["2020-02-03", "turnover"] == pytest.approx(1.0)  # from cash
+
+
+def test_drift_within_a_period(returns):
+    weights = _weights({"2020-01-31": {"A": 0.5, "B": 0.5}})
+    res = run_backtest(weights, returns, horizon=pd.offsets.MonthEnd(1), drift=True)
+    assert res.loc["2020-02-04", "gross_return"] == pytest.approx(0.5 / 1.05 * 0.10)
+    assert res.loc["2020-02-04", "turnover"] == 0.0
+    assert res.index.max() == pd.Timestamp("2020-02-28")  # horizon cut-off
+
+
+def test_costs_and_partial_investment(returns):
+    weights = _weights({"2020-01-31": {"A": 0.25, "B": 0.25}, "2020-02-28": {"A": 0.25, "B": 0.0}})
+    res = run_backtest(weights, returns, cost_bps=10)
+    # Half the book in cash: turnover is the traded half, cost 10 bps of it
+    assert res.loc["2020-02-03", "turnover"] == pytest.approx(0.5)
+    assert res.loc["2020-02-03", "return"] == pytest.approx(0.025 - 0.5 * 0.001)
+    assert res.loc["2020-03-02", "turnover"] == pytest.approx(0.25)
+    assert res.loc["2020-03-02", "return"] == pytest.approx(0.25 * -0.05 - 0.25 * 0.001)
+    # Days that do not start a period pay nothing
+    assert res.loc["2020-02-04", "return"] == res.loc["2020-02-04", "gross_return"]
+
+
+def test_all_nan_row_means_not_invested(returns):
+    weights = _weights({"2020-01-31": {"A": 0.5, "B": 0.5}, "2020-02-28": {"A": np.nan, "B": np.nan}})
+    res = run_backtest(weights, returns)
+    assert res.index.max() == pd.Timestamp("2020-02-28")
+    # Tickers missing from the returns are ignored
+    extra = weights.assign(C=[0.3, np.nan])
+    pd.testing.assert_frame_equal(run_backtest(extra, returns), res)
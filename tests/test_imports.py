@@ -0,0 +1,19 @@
+# tests/test_imports.py
+
+from cli import HEAVY, IMPORT_BUDGET_S, import_time, measure_imports
+
+
+def test_stage_imports_are_light():
+    # Every stage module imported cold in a fresh interpreter, timed against `import pandas`
+    results = measure_imports(IMPORT_BUDGET_S)
+    assert {r["module"]: r.get("error") for r in results if "error" in r} == {}
+    assert {r["module"]: r["heavy"] for r in results if r["heavy"]} == {}
+    slow = {r["module"]: round(r["extra"], 3) for r in results if r["extra"] > IMPORT_BUDGET_S}
+    assert slow == {}, f"seconds over a bare `import pandas` (budget {IMPORT_BUDGET_S})"
+
+
+def test_probe_reports_heavy_imports():
+    # The check is only meaningful if the probe notices a heavy library
+    assert import_time("scipy.optimize", repeat=1)["heavy"] == ["scipy.optimize"]
+    assert import_time("ta", repeat=1)["heavy"] == ["ta"]
+    assert {"ta", "pypfopt"} <= set(HEAVY)
@@ -0,0 +1,72 @@
+# tests/test_incremental.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from factors import FACTORS, WINDOW, _period_closes, compute_rolling_betas
+from features import compute_features, update_features
+from incremental import load_checkpoint, save_checkpoint
+
+N_TICKERS = 60                        # more than TOP_N, so the ranking matters
+CUT       = pd.Timestamp("2020-06-30")  # first run sees prices up to this month end
+
+
+@pytest.fixture(scope="module")
+def prices():
+    """Daily OHLCV [Date, Ticker] with a late listing and a delisting."""
+    rng = np.random.default_rng(5)
+    days = pd.bdate_range("2019-01-01", "2020-12-31")
+    tickers = [f"T{i:02d}" for i in range(N_TICKERS)]
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(days), N_TICKERS)), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.005, close.shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, close.shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, close.shape))
+    volume = rng.uniform(1e5, 1e6, close.shape)
+    absent = np.zeros(close.shape, dtype=bool)
+    absent[:120, 1] = True   # lists in mid-2019
+    absent[400:, 2] = True   # delisted in 2020
+    wide = {"open": open_, "high": high, "low": low, "close": close, "volume": volume}
+    df = pd.DataFrame({k: np.where(absent, np.nan, v).ravel() for k, v in wide.items()},
+                      index=pd.MultiIndex.from_product([days, tickers], names=["Date", "Ticker"]))
+    return df.dropna()
+
+
+def _after(df, date):
+    return df[df.index.get_level_values("Date") > date]
+
+
+def test_incremental_features_match_full_run(prices, tmp_path):
+    full = compute_features(prices)
+
+    # First run on the prices up to CUT, checkpointed to disk as main() does
+    first = prices[prices.index.get_level_values("Date") <= CUT]
+    complete1, _, checkpoint = update_features(first)
+    save_checkpoint(str(tmp_path / "state.npz"), **checkpoint)
+    checkpoint = load_checkpoint(str(tmp_path / "state.npz"))
+    asof = pd.Timestamp(checkpoint["asof"])
+    assert asof == pd.Timestamp("2020-05-31")  # June is still open at CUT
+
+    # Second run gets every row after the checkpoint, like load_panel(start=asof + 1 day)
+    complete2, partial2, _ = update_features(_after(prices, asof), checkpoint)
+    incremental = pd.concat([complete1, complete2, partial2])
+    pd.testing.assert_frame_equal(incremental, full, rtol=1e-9)
+
+
+def test_incremental_betas_match_full_run(prices):
+    rng = np.random.default_rng(9)
+    months = pd.date_range("2019-01-31", "2020-12-31", freq=pd.offsets.MonthEnd())
+    factors = pd.DataFrame(rng.normal(0, 0.03, (len(months), 3)), index=months, columns=FACTORS[:3])
+    factors["RF"] = 0.001
+
+    full = compute_rolling_betas(prices, factors)
+
+    # Checkpoint as in factors.main: the last WINDOW + 1 closes up to the cut
+    first = prices[prices.index.get_level_values("Date") <= CUT]
+    history = _period_closes(first, "monthly").iloc[-(WINDOW + 1):]
+    incremental = compute_rolling_betas(_after(prices, CUT), factors, history)
+
+    new = full[full.index.get_level_values("Date") > CUT]
+    got = incremental[incremental.index.get_level_values("Date") > CUT]
+    assert new["beta"].notna().sum() > 0
+    pd.testing.assert_frame_equal(got, new, rtol=1e-9)
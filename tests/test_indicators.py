@@ -0,0 +1,69 @@
+# tests/test_indicators.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import MACD
+from ta.volatility import AverageTrueRange, BollingerBands
+
+from indicators import (ATR_WINDOW, BB_DEV, BB_WINDOW, MACD_FAST, MACD_SIGN, MACD_SLOW,
+                        RSI_WINDOW, compute_indicators)
+
+N_DAYS = 300
+SPLIT  = 170  # row where the resumed run picks up
+
+
+@pytest.fixture(scope="module")
+def prices():
+    """OHLCV for four tickers: full history, late listing, an internal gap, and both plus a delisting."""
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (N_DAYS, 4)), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.005, close.shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, close.shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, close.shape))
+    volume = rng.uniform(1e5, 1e6, close.shape)
+    absent = np.zeros(close.shape, dtype=bool)
+    absent[:40, 1] = True                               # lists on day 40
+    absent[100:116, 2] = True                           # 16-day halt
+    absent[:25, 3] = absent[150:158, 3] = absent[280:, 3] = True
+    arrays = [open_, high, low, close, volume]
+    for a in arrays:
+        a[absent] = np.nan
+    return arrays
+
+
+def _ta_reference(high, low, close) -> dict:
+    """ta indicators on one ticker's own rows (its NaN rows removed)."""
+    h, l, c = pd.Series(high), pd.Series(low), pd.Series(close)
+    bb = BollingerBands(close=c, window=BB_WINDOW, window_dev=BB_DEV)
+    return {
+        "rsi":       RSIIndicator(c, window=RSI_WINDOW).rsi(),
+        "bb_mavg":   bb.bollinger_mavg(),
+        "bb_hband":  bb.bollinger_hband(),
+        "bb_lband":  bb.bollinger_lband(),
+        "atr":       AverageTrueRange(high=h, low=l, close=c, window=ATR_WINDOW).average_true_range(),
+        "macd_diff": MACD(close=c, window_slow=MACD_SLOW, window_fast=MACD_FAST,
+                          window_sign=MACD_SIGN).macd_diff(),
+    }
+
+
+@pytest.mark.parametrize("ticker", range(4))
+def test_matches_ta_per_ticker(prices, ticker):
+    out, _ = compute_indicators(*prices)
+    _, high, low, close, _ = (a[:, ticker] for a in prices)
+    present = ~np.isnan(close)
+    ref = _ta_reference(high[present], low[present], close[present])
+    for name, expected in ref.items():
+        np.testing.assert_allclose(out[name][present, ticker], expected.to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+        assert np.isnan(out[name][~present, ticker]).all(), name
+
+
+def test_resumed_state_matches_full_run(prices):
+    full, _ = compute_indicators(*prices)
+    _, state = compute_indicators(*(a[:SPLIT] for a in prices))
+    tail, _ = compute_indicators(*(a[SPLIT:] for a in prices), state=state)
+    for name, values in tail.items():
+        np.testing.assert_allclose(values, full[name][SPLIT:], rtol=1e-9, atol=1e-9,
+                                   equal_nan=True, err_msg=name)
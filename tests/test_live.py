@@ -0,0 +1,89 @@
+# tests/test_live.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import live
+from intraday import ROLL_WINDOW, predict_volatility_panel, vol_threshold
+from live import LATENCY_BUDGET_US, LiveStrategy, latency_summary, replay
+
+N_SESSIONS = ROLL_WINDOW + 70
+BARS       = 8  # bars per session
+
+
+@pytest.fixture(scope="module")
+def bars():
+    """One symbol's 5-minute bars with volatility clustering across sessions."""
+    rng = np.random.default_rng(11)
+    days = pd.bdate_range("2019-01-02", periods=N_SESSIONS)
+    sigma = 0.01 * np.exp(np.cumsum(rng.normal(0, 0.1, N_SESSIONS)))
+    steps = rng.normal(0, 1, (N_SESSIONS, BARS)) * sigma[:, None] / np.sqrt(BARS)
+    close = 100 * np.exp(np.cumsum(steps.ravel()))
+    open_ = np.r_[100.0, close[:-1]] * (1 + rng.normal(0, 1e-4, close.size))
+    ts = (days.to_numpy()[:, None] + np.timedelta64(9 * 60 + 30, "m")
+          + np.arange(BARS) * np.timedelta64(5, "m")).ravel().view("i8")
+    return list(zip(["SIM"] * close.size, ts.tolist(), open_.tolist(), close.tolist()))
+
+
+def _session_values(bars, strategy):
+    """The forecast and threshold the strategy trades each session on."""
+    vol, threshold = {}, {}
+    for symbol, ts, open_, close in bars:
+        if strategy.session_ended(symbol, ts):
+            strategy.close_session(symbol)
+        strategy.on_bar(symbol, ts, open_, close)
+        day = pd.Timestamp(ts).normalize()
+        s = strategy.state[symbol]
+        vol[day], threshold[day] = s.vol, s.threshold
+    return pd.Series(vol), pd.Series(threshold)
+
+
+@pytest.mark.parametrize("refit_days", [None, 10])
+def test_matches_batch_forecasts_and_thresholds(bars, refit_days):
+    vol, threshold = _session_values(bars, LiveStrategy(refit_days=refit_days))
+
+    closes = pd.DataFrame({"SIM": [b[3] for b in bars[BARS - 1::BARS]]}, index=vol.index)
+    batch = predict_volatility_panel(closes, refit_every=refit_days or N_SESSIONS, n_jobs=1)["SIM"]
+    assert batch.notna().sum() == N_SESSIONS - ROLL_WINDOW - 2
+    np.testing.assert_allclose(vol.to_numpy(), batch.to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(threshold.to_numpy(), vol_threshold(batch).to_numpy(), rtol=1e-9)
+
+
+def test_no_fit_inside_a_bar_decision(bars, monkeypatch):
+    strategy = LiveStrategy(refit_days=5)
+    calls = {"bar": 0, "close": 0}
+    fit, on_bar, close_session = live.fit_garch, strategy.on_bar, strategy.close_session
+    where = ["close"]
+
+    def counting_fit(*args):
+        calls[where[-1]] += 1
+        return fit(*args)
+
+    def timed_bar(*args):
+        where.append("bar")
+        try:
+            return on_bar(*args)
+        finally:
+            where.pop()
+
+    monkeypatch.setattr(live, "fit_garch", counting_fit)
+    monkeypatch.setattr(strategy, "on_bar", timed_bar)
+    log = replay(bars, strategy)
+    assert calls["bar"] == 0
+    assert calls["close"] == (N_SESSIONS - 1 - ROLL_WINDOW - 1) // 5 + 1
+
+    stats = latency_summary(log["latency_us"])
+    assert stats["p99_us"] < LATENCY_BUDGET_US
+    assert stats["over_budget"] < 0.005
+
+
+def test_flat_over_the_session_close(bars):
+    log = replay(bars, LiveStrategy(refit_days=5))
+    assert log["pos"].sum() > 0
+    first = log["datetime"].dt.normalize().diff().ne(pd.Timedelta(0))
+    assert (log.loc[first, "bar_ret"].fillna(0) == 0).all()
+    # Within a session, bar P&L is the held position times the bar's return
+    inner = log[~first]
+    held = log["pos"].shift(1)[~first]
+    np.testing.assert_allclose(inner["bar_ret"], held * log["close"].pct_change()[~first])
@@ -0,0 +1,55 @@
+# tests/test_membership.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import context
+from backtest import cluster_strategy
+from context import DataContext
+from membership import OPEN_END, MembershipIndex, _ns
+from optimizer import optimize_weights
+
+REMOVED = pd.Timestamp("2020-02-10")  # B leaves the index
+CRASH   = pd.Timestamp("2020-02-14")  # and then loses 40% while still held
+
+
+@pytest.fixture
+def ctx(tmp_path, monkeypatch):
+    """Two tickers held from January; B is deleted from the index mid-February."""
+    rng = np.random.default_rng(3)
+    days = pd.bdate_range("2019-07-01", "2020-03-31")
+    rets = pd.DataFrame(rng.normal(0.001, 0.01, (len(days), 2)), index=days, columns=["A", "B"])
+    rets.loc[CRASH, "B"] = -0.4
+
+    feats = pd.DataFrame({
+        "Date": pd.to_datetime(["2020-01-31", "2020-01-31", "2020-02-28", "2020-02-28"]),
+        "Ticker": ["A", "B", "A", "B"],
+        "rsi": [50.0, 50.0, 50.0, 50.0],
+        "cluster": 0,
+    })
+    path = tmp_path / "features_clustered.csv"
+    feats.to_csv(path, index=False)
+    monkeypatch.setattr(context, "CLUSTERED", str(path))
+
+    members = MembershipIndex(["A", "B"], _ns(["2015-01-01", "2015-01-01"]),
+                              np.array([OPEN_END, _ns([REMOVED])[0]]))
+    return DataContext(returns=rets, membership=members)
+
+
+def test_universe_drops_deleted_member(ctx):
+    clustered = ctx.get("clustered")
+    assert clustered.loc["2020-01-31"].index.tolist() == ["A", "B"]
+    assert clustered.loc["2020-02-28"].index.tolist() == ["A"]
+
+
+def test_deleted_member_books_returns_until_rebalance(ctx):
+    rets = ctx.get("returns")
+    assert rets.loc[CRASH, "B"] == -0.4  # P&L panel is never masked
+
+    result = cluster_strategy(ctx, cluster_id=0)
+    jan = optimize_weights(rets, {pd.Timestamp("2020-01-31"): ["A", "B"]}).iloc[0]
+    assert jan["B"] > 0
+    expected = jan["A"] * rets.loc[CRASH, "A"] + jan["B"] * -0.4
+    assert result.loc[CRASH, "return"] == pytest.approx(expected)
+    assert result.loc[CRASH, "return"] < -0.05
@@ -0,0 +1,77 @@
+# tests/test_optimizer.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import ledoit_wolf
+
+from optimizer import empty_moments, estimate, max_sharpe, update_moments
+
+N = 6
+
+
+@pytest.fixture(scope="module")
+def returns():
+    """Daily returns with a common factor, so shrinkage is neither 0 nor 1."""
+    rng = np.random.default_rng(0)
+    return rng.normal(0.0005, 0.02, (300, N)) + rng.normal(0, 0.01, (300, 1))
+
+
+def _moments(rows):
+    state = empty_moments(rows.shape[1])
+    update_moments(state, rows)
+    return state
+
+
+def test_ledoit_wolf_matches_sklearn(returns):
+    _, cov = estimate(_moments(returns), np.arange(N), "ledoit_wolf", frequency=1)
+    np.testing.assert_allclose(cov, ledoit_wolf(returns)[0], rtol=1e-10)
+
+    # Rolling window: rows removed from the running sums leave the same estimate
+    state = _moments(returns)
+    update_moments(state, returns[:100], sign=-1.0)
+    _, cov = estimate(state, np.arange(N), "ledoit_wolf", frequency=1)
+    np.testing.assert_allclose(cov, ledoit_wolf(returns[100:])[0], rtol=1e-8)
+
+    # On a subset of columns it is sklearn's estimate for those columns
+    cols = np.array([1, 3, 4])
+    _, cov = estimate(_moments(returns), cols, "ledoit_wolf", frequency=1)
+    np.testing.assert_allclose(cov, ledoit_wolf(returns[:, cols])[0], rtol=1e-10)
+
+
+def test_sample_moments_match_pandas_with_gaps(returns):
+    rets = returns.copy()
+    rets[:50, 1] = np.nan
+    rets[120:140, 4] = np.nan
+    mu, cov = estimate(_moments(rets), np.arange(N), "sample", frequency=252)
+    frame = pd.DataFrame(rets)
+    np.testing.assert_allclose(cov, frame.cov().to_numpy() * 252, rtol=1e-10)
+    # pypfopt's mean_historical_return: compounded growth, annualised
+    compounded = (1 + frame).prod() ** (252 / frame.count()) - 1
+    np.testing.assert_allclose(mu, compounded.to_numpy(), rtol=1e-10)
+
+
+def _sharpe(w, mu, cov):
+    return w @ mu / np.sqrt(w @ cov @ w)
+
+
+def test_max_sharpe_matches_tangency_portfolio():
+    # With every tangency weight positive the long-only optimum is Σ⁻¹μ, normalised
+    cov = np.array([[0.04, 0.01, 0.00], [0.01, 0.09, 0.02], [0.00, 0.02, 0.16]])
+    mu = np.array([0.08, 0.10, 0.14])
+    tangency = np.linalg.solve(cov, mu)
+    assert (tangency > 0).all()
+    np.testing.assert_allclose(max_sharpe(mu, cov), tangency / tangency.sum(), atol=1e-6)
+
+
+def test_max_sharpe_long_only_beats_every_sampled_portfolio(returns):
+    mu, cov = estimate(_moments(returns), np.arange(N), "ledoit_wolf")
+    mu = mu + np.linspace(-0.1, 0.1, N)  # some assets below the risk-free rate
+    w = max_sharpe(mu, cov, risk_free_rate=0.02)
+    assert w.min() >= 0 and w.sum() == pytest.approx(1)
+    samples = np.random.default_rng(1).dirichlet(np.ones(N) * 0.3, 20_000)
+    best = max(_sharpe(s, mu - 0.02, cov) for s in samples)
+    assert _sharpe(w, mu - 0.02, cov) >= best - 1e-9
+    # Warm-starting from another portfolio lands on the same optimum
+    np.testing.assert_allclose(max_sharpe(mu, cov, 0.02, x0=np.full(N, 1 / N)), w, atol=1e-5)
+    assert max_sharpe(mu - 1, cov) is None  # nothing beats the risk-free rate
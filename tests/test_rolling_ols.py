@@ -0,0 +1,59 @@
+# tests/test_rolling_ols.py
+
+import numpy as np
+import pytest
+
+from rolling_ols import rolling_ols
+
+T, N, K = 60, 5, 3
+
+
+@pytest.fixture(scope="module")
+def data():
+    """Returns loading on three factors; one late-starting column and one with a gap."""
+    rng = np.random.default_rng(2)
+    X = rng.normal(0, 0.04, (T, K))
+    y = 0.002 + X @ rng.normal(1, 0.5, (K, N)) + rng.normal(0, 0.02, (T, N))
+    y[:15, 1] = np.nan
+    y[30:34, 2] = np.nan
+    y[:, 4] = np.nan
+    y[20:, 4] = rng.normal(0, 0.02, T - 20)
+    return y, X
+
+
+def _reference(y, X, window):
+    """np.linalg.lstsq on every fully observed window, NaN elsewhere."""
+    alpha, r2 = np.full((T, N), np.nan), np.full((T, N), np.nan)
+    coef = np.full((T, K, N), np.nan)
+    for t in range(window - 1, T):
+        rows = slice(t - window + 1, t + 1)
+        Z = np.column_stack([np.ones(window), X[rows]])
+        for n in range(N):
+            yw = y[rows, n]
+            if np.isnan(yw).any():
+                continue
+            b, *_ = np.linalg.lstsq(Z, yw, rcond=None)
+            resid = yw - Z @ b
+            alpha[t, n], coef[t, :, n] = b[0], b[1:]
+            r2[t, n] = 1 - resid @ resid / ((yw - yw.mean()) @ (yw - yw.mean()))
+    return {"alpha": alpha, "coef": coef, "r2": r2}
+
+
+@pytest.mark.parametrize("window", [K + 2, 12, 36])
+def test_matches_lstsq_per_window(data, window):
+    y, X = data
+    got, ref = rolling_ols(y, X, window), _reference(y, X, window)
+    for key in ("alpha", "coef", "r2"):
+        np.testing.assert_array_equal(np.isnan(got[key]), np.isnan(ref[key]), err_msg=key)
+        np.testing.assert_allclose(got[key], ref[key], rtol=1e-6, atol=1e-9, err_msg=key)
+    # Windows covering a gap get nothing; estimates resume once it has rolled out
+    assert np.isnan(got["alpha"][33, 2])
+    if 33 + window < T:
+        assert not np.isnan(got["alpha"][33 + window, 2])
+
+
+def test_fewer_rows_than_window(data):
+    y, X = data
+    got = rolling_ols(y[:10], X[:10], 12)
+    assert np.isnan(got["alpha"]).all() and np.isnan(got["coef"]).all() and np.isnan(got["r2"]).all()
+    assert got["coef"].shape == (10, K, N)
@@ -0,0 +1,62 @@
+# tests/test_sentiment_store.py
+
+import pandas as pd
+import pytest
+
+import sentiment_store
+from sentiment_store import METRICS, append_external, load_rows, sync_csv
+
+HEADER = "date,symbol," + ",".join(METRICS) + "\n"
+
+
+def _line(date, symbol, posts):
+    return f"{date},{symbol},{posts},1.0,2.0,3.0,0.5\n"
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "sentiment_data.csv"
+    lines = [_line(f"2021-01-{d:02d}", s, d) for d in range(1, 29) for s in ("AAA", "BBB")]
+    path.write_text(HEADER + "".join(lines))
+    return path
+
+
+def _posts(store, date, symbol):
+    rows = load_rows(date, date, store)
+    return rows.loc[rows["symbol"] == symbol, "twitterPosts"].tolist()
+
+
+def _external(posts):
+    return pd.DataFrame({"date": [pd.Timestamp("2021-02-01")], "symbol": ["AAA"],
+                         **{m: [float(posts)] for m in METRICS}})
+
+
+@pytest.mark.parametrize("rebuild", [False, True])
+def test_appended_rows_win_on_both_paths(csv, tmp_path, rebuild):
+    store = str(tmp_path / "store")
+    assert sync_csv(str(csv), store, chunksize=10) == 56
+    append_external(_external(99), store)
+
+    # The CSV later gains a row for the same (date, symbol), and another one
+    with open(csv, "a") as fh:
+        fh.write(_line("2021-02-01", "AAA", 7) + _line("2021-02-01", "BBB", 8))
+    if rebuild:
+        # A header that no longer matches forces a rebuild from the whole CSV
+        (tmp_path / "store" / "meta.json").write_text('{"header": "stale", "offset": 0}')
+
+    sync_csv(str(csv), store, chunksize=10)
+    assert _posts(store, "2021-02-01", "AAA") == [99.0]
+    assert _posts(store, "2021-02-01", "BBB") == [8.0]
+    assert len(load_rows(store_dir=store)) == 58
+
+
+def test_partial_last_line_waits_for_the_next_sync(csv, tmp_path, monkeypatch):
+    monkeypatch.setattr(sentiment_store, "SCAN_BYTES", 16)  # scan back over several blocks
+    store = str(tmp_path / "store")
+    with open(csv, "a") as fh:
+        fh.write("2021-01-29,AAA,5")
+    assert sync_csv(str(csv), store, chunksize=7) == 56
+    with open(csv, "a") as fh:
+        fh.write(".0,1.0,2.0,3.0,0.5\n")
+    assert sync_csv(str(csv), store, chunksize=7) == 1
+    assert _posts(store, "2021-01-29", "AAA") == [5.0]
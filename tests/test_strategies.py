@@ -0,0 +1,48 @@
+# tests/test_strategies.py
+
+import pandas as pd
+import pytest
+
+import strategies
+from context import DataContext
+from strategies import register, requirements, run_strategies
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    """An empty registry with two strategies around one that fails."""
+    monkeypatch.setattr(strategies, "STRATEGIES", {})
+    monkeypatch.setattr(strategies, "load_plugins", lambda: strategies.STRATEGIES)
+
+    def ok(ctx):
+        return pd.DataFrame({"return": [ctx.get("a")]})
+
+    def broken(ctx):
+        raise FileNotFoundError("simulated_5min_data.csv")
+
+    register("first", requires=("a",), output=str(tmp_path / "first.csv"))(ok)
+    register("broken", output=str(tmp_path / "broken.csv"))(broken)
+    register("last", requires=lambda scale=1: ("a",), output=str(tmp_path / "last.csv"))(ok)
+    return tmp_path
+
+
+def test_failed_strategy_is_reported_and_the_rest_still_run(registry, capsys):
+    with pytest.raises(RuntimeError, match="1 strategies failed: broken") as err:
+        run_strategies(ctx=DataContext(a=0.01))
+    assert isinstance(err.value.__cause__, FileNotFoundError)
+    assert (registry / "first.csv").exists() and (registry / "last.csv").exists()
+    assert not (registry / "broken.csv").exists()
+    assert "[broken] FAILED" in capsys.readouterr().out
+
+
+def test_requirements_follow_params(registry):
+    assert requirements("first") == ("a",)
+    assert requirements("broken", {"x": 1}) == ()
+    assert requirements("last", {"scale": 2}) == ("a",)
+
+
+def test_sentiment_signal_run_needs_the_metrics_not_the_monthly_engagement():
+    import twitter_sentiment  # noqa: F401  registers "sentiment"
+    assert requirements("sentiment") == ("close_returns", "sentiment_monthly")
+    assert requirements("sentiment", {"signal": "blend", "long_short": True}) == \
+        ("close_returns", "sentiment_metrics")